@@ -1,6 +1,6 @@
 import os
 import json
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from google import genai
 from google.genai import types
 
@@ -25,7 +25,27 @@ class Critic:
         existing_rules: List[PolicyRule],
     ) -> CriticEvaluation:
         """Run the Critic LLM to produce an evaluation + proposed rule updates."""
+        user_prompt, config = self._build_request(plan, completion, existing_rules)
+        response = self.client.models.generate_content(model=self.model, contents=user_prompt, config=config)
+        return self._parse(response)
 
+    async def evaluate_async(
+        self,
+        plan: DailyRoutine,
+        completion: CompletionLog,
+        existing_rules: List[PolicyRule],
+    ) -> CriticEvaluation:
+        """Same as evaluate, but awaits Gemini instead of blocking the event loop."""
+        user_prompt, config = self._build_request(plan, completion, existing_rules)
+        response = await self.client.aio.models.generate_content(model=self.model, contents=user_prompt, config=config)
+        return self._parse(response)
+
+    def _build_request(
+        self,
+        plan: DailyRoutine,
+        completion: CompletionLog,
+        existing_rules: List[PolicyRule],
+    ) -> Tuple[str, types.GenerateContentConfig]:
         existing_rules_text = "\n".join(
             f"- [{r.category}] (confidence={r.confidence:.2f}) {r.rule_text}"
             for r in existing_rules
@@ -61,18 +81,16 @@ Output ONLY valid JSON matching the CriticEvaluation schema."""
 
 Evaluate the day and produce your CriticEvaluation now."""
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=user_prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=CriticEvaluation,
-                temperature=0.4,
-                max_output_tokens=4096,
-            ),
+        config = types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            response_mime_type="application/json",
+            response_schema=CriticEvaluation,
+            temperature=0.4,
+            max_output_tokens=4096,
         )
+        return user_prompt, config
 
+    def _parse(self, response) -> CriticEvaluation:
         if response.parsed is not None:
             return response.parsed
 
@@ -1,20 +1,85 @@
 import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 
 
 class HistoryManager:
+    """
+    Per-user plan/completion history as one JSONL line per entry.
+    Kept as HISTORY_BACKEND=jsonl; the default is SqliteHistoryManager.
+    """
+
+    BLOCK_SIZE = 8192
+
+    # file path -> ((st_dev, st_ino), file size, byte offset of the last `days`
+    # entries, days). Between save_completion rewrites the file is only
+    # appended to, so a cached offset stays a valid lower bound while the file
+    # only grows. Rewrites go to a new file that replaces the old one, so a
+    # changed inode tells this process another one rewrote it.
+    _tail_offsets: Dict[str, Tuple[Tuple[int, int], int, int, int]] = {}
+
     def __init__(self, user_id: str):
         self.file_path = Path(f"history_{user_id}.jsonl")
         self.file_path.touch(exist_ok=True)
 
     def get_recent_history(self, days: int = 5) -> List[Dict]:
+        """Last `days` entries, read backwards from the end of the file in blocks."""
+        if not self.file_path.exists() or days <= 0:
+            return []
+        key = str(self.file_path)
+        with open(self.file_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            identity, size = (stat.st_dev, stat.st_ino), stat.st_size
+            cached = self._tail_offsets.get(key)
+            start = 0
+            if cached and cached[0] == identity and cached[3] == days and cached[1] <= size:
+                start = cached[2]
+            lines, offset = self._read_tail(f, start, size, days)
+        self._tail_offsets[key] = (identity, size, offset, days)
+        return [json.loads(line) for line in lines]
+
+    def get_recent_history_full_scan(self, days: int = 5) -> List[Dict]:
+        """The original implementation (reads every line); kept for benchmarking."""
         if not self.file_path.exists():
             return []
         with open(self.file_path, "r") as f:
             lines = list(f)[-days:]
             return [json.loads(line.strip()) for line in lines if line.strip()]
 
+    def _read_tail(self, f, start: int, size: int, days: int) -> Tuple[List[bytes], int]:
+        """Last `days` non-empty lines between `start` and `size`, and the offset of the first."""
+        pos = size
+        buf = b""
+        while pos > start:
+            step = min(self.BLOCK_SIZE, pos - start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            # Everything after the first newline is made of complete lines
+            complete = buf.split(b"\n")[1:] if pos > start else buf.split(b"\n")
+            if sum(1 for line in complete if line.strip()) >= days:
+                break
+
+        pieces = buf.split(b"\n")
+        offset = pos
+        if pos > start:
+            # The first piece may be the tail of an earlier line
+            offset += len(pieces[0]) + 1
+            pieces = pieces[1:]
+
+        entries: List[Tuple[int, bytes]] = []
+        for piece in pieces:
+            if piece.strip():
+                entries.append((offset, piece))
+            offset += len(piece) + 1
+        entries = entries[-days:]
+        return [line for _, line in entries], (entries[0][0] if entries else size)
+
     def save_plan(self, plan: Dict, completion: Optional[Dict] = None):
         entry = {
             "date": plan["date"],
@@ -36,14 +101,19 @@ class HistoryManager:
 
         lines = self.file_path.read_text().strip().splitlines()
         updated = False
+        # Cached tail offsets no longer point at line starts
+        self._tail_offsets.pop(str(self.file_path), None)
 
-        with open(self.file_path, "w") as f:
+        # Written aside and swapped in, so other processes see a new inode
+        tmp_path = self.file_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w") as f:
             for line in lines:
                 entry = json.loads(line)
                 if entry.get("date") == date and entry.get("completion") is None:
                     entry["completion"] = completion_data
                     updated = True
                 f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.file_path)
 
         # If no matching plan was found, append a standalone completion entry
         if not updated:
@@ -66,4 +136,161 @@ class HistoryManager:
                 entry = json.loads(line.strip())
                 if entry.get("date") == date:
                     return entry
-        return None
\ No newline at end of file
+        return None
+
+
+class SqliteHistoryManager:
+    """
+    Same interface as HistoryManager, backed by one SQLite database for all
+    users. Date lookups use the (user_id, date) index, completions are merged
+    with a single UPDATE, and every write is its own transaction.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            generated_plan TEXT,
+            completion TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_user_date ON history (user_id, date, id);
+        CREATE INDEX IF NOT EXISTS idx_history_user_id ON history (user_id, id);
+    """
+
+    # Per process: db paths whose schema is in place, (db path, user) pairs already checked for a JSONL import
+    _ready_paths: set = set()
+    _import_checked: set = set()
+    _init_lock = threading.Lock()
+
+    def __init__(self, user_id: str, db_path: Optional[str] = None):
+        self.user_id = user_id
+        self.db_path = db_path or os.getenv("HISTORY_DB_PATH", "history.sqlite3")
+        with self._init_lock:
+            if self.db_path not in self._ready_paths:
+                with closing(self._connect()) as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(self.SCHEMA)
+                self._ready_paths.add(self.db_path)
+
+            # First use of a user who still has a legacy history file: bring it over
+            if (self.db_path, user_id) not in self._import_checked:
+                legacy = Path(f"history_{user_id}.jsonl")
+                if legacy.exists():
+                    imported = self.import_jsonl(legacy)
+                    if imported:
+                        print(f"📥 Imported {imported} history entries for {user_id} from {legacy}")
+                self._import_checked.add((self.db_path, user_id))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @staticmethod
+    def _to_entry(row) -> Dict:
+        date, plan, completion = row
+        return {
+            "date": date,
+            "generated_plan": json.loads(plan) if plan is not None else None,
+            "completion": json.loads(completion) if completion is not None else None,
+        }
+
+    @staticmethod
+    def _dump(value: Optional[Dict]) -> Optional[str]:
+        return json.dumps(value) if value is not None else None
+
+    def get_recent_history(self, days: int = 5) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT date, generated_plan, completion FROM history "
+                "WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (self.user_id, days),
+            ).fetchall()
+        return [self._to_entry(row) for row in reversed(rows)]
+
+    def save_plan(self, plan: Dict, completion: Optional[Dict] = None):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO history (user_id, date, generated_plan, completion) VALUES (?, ?, ?, ?)",
+                (self.user_id, plan["date"], self._dump(plan), self._dump(completion)),
+            )
+
+    def save_completion(self, date: str, completion_data: Dict) -> bool:
+        """
+        Merge completion data into the open plan(s) for `date`, or store it
+        standalone. Returns True if a plan was found and updated.
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE history SET completion = ? "
+                "WHERE user_id = ? AND date = ? AND completion IS NULL",
+                (self._dump(completion_data), self.user_id, date),
+            )
+            updated = cursor.rowcount > 0
+            if not updated:
+                conn.execute(
+                    "INSERT INTO history (user_id, date, generated_plan, completion) VALUES (?, ?, NULL, ?)",
+                    (self.user_id, date, self._dump(completion_data)),
+                )
+        return updated
+
+    def get_entry_for_date(self, date: str) -> Optional[Dict]:
+        """Return the full history entry (plan + completion) for a specific date."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT date, generated_plan, completion FROM history "
+                "WHERE user_id = ? AND date = ? ORDER BY id LIMIT 1",
+                (self.user_id, date),
+            ).fetchone()
+        return self._to_entry(row) if row else None
+
+    # ── One-time JSONL import ────────────────────────────────────────
+
+    def import_jsonl(self, jsonl_path: Path) -> int:
+        """
+        Copy a legacy history_{user_id}.jsonl into the database, preserving
+        order. Skipped (returns 0) if this user already has rows.
+        """
+        with closing(self._connect()) as conn, conn:
+            # Hold the write lock across the check so two processes can't both import
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM history WHERE user_id = ? LIMIT 1", (self.user_id,)).fetchone():
+                return 0
+            rows = []
+            with open(jsonl_path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    rows.append((
+                        self.user_id,
+                        entry["date"],
+                        self._dump(entry.get("generated_plan")),
+                        self._dump(entry.get("completion")),
+                    ))
+            conn.executemany(
+                "INSERT INTO history (user_id, date, generated_plan, completion) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+
+def get_history_manager(user_id: str) -> Union[HistoryManager, "SqliteHistoryManager"]:
+    """History store selected by HISTORY_BACKEND ("sqlite" default, or "jsonl")."""
+    backend = os.getenv("HISTORY_BACKEND", "sqlite").strip().lower()
+    if backend == "jsonl":
+        return HistoryManager(user_id)
+    if backend == "sqlite":
+        return SqliteHistoryManager(user_id)
+    raise RuntimeError("HISTORY_BACKEND must be one of: sqlite, jsonl")
+
+
+if __name__ == "__main__":
+    # python history_manager.py import [history_<user>.jsonl ...]
+    if len(sys.argv) < 2 or sys.argv[1] != "import":
+        sys.exit("usage: python history_manager.py import [history_<user>.jsonl ...]")
+    paths = [Path(p) for p in sys.argv[2:]] or sorted(Path(".").glob("history_*.jsonl"))
+    for path in paths:
+        user_id = path.stem[len("history_"):]
+        imported = SqliteHistoryManager(user_id).import_jsonl(path)
+        status = f"{imported} entries" if imported else "nothing to import"
+        print(f"📥 {path} → {user_id}: {status}")
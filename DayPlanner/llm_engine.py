@@ -1,6 +1,6 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from google import genai
 from google.genai import types
 from models import DailyInput, DailyRoutine 
@@ -16,6 +16,17 @@ class LLMScheduler:
         self.model = model
 
     def generate_routine(self, input_data: DailyInput, history: List[Dict[str, Any]], policy_block: str = "") -> DailyRoutine:
+        user_prompt, config = self._build_request(input_data, history, policy_block)
+        response = self.client.models.generate_content(model=self.model, contents=user_prompt, config=config)
+        return self._parse(response)
+
+    async def generate_routine_async(self, input_data: DailyInput, history: List[Dict[str, Any]], policy_block: str = "") -> DailyRoutine:
+        """Same as generate_routine, but awaits Gemini instead of blocking the event loop."""
+        user_prompt, config = self._build_request(input_data, history, policy_block)
+        response = await self.client.aio.models.generate_content(model=self.model, contents=user_prompt, config=config)
+        return self._parse(response)
+
+    def _build_request(self, input_data: DailyInput, history: List[Dict[str, Any]], policy_block: str) -> Tuple[str, types.GenerateContentConfig]:
         system_prompt = """You are ChronoForge — the ruthless AI Attention Operating System for Indian college students.
 You generate a single, opinionated, attendance-aware daily routine that:
 - Respects 75% attendance rule (show safe skips with exact impact)
@@ -46,18 +57,16 @@ Recent History (use to calibrate estimates):
 
 Generate today's optimised routine now."""
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=user_prompt, # Can be passed directly as a string
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=DailyRoutine,
-                temperature=0.3,
-                max_output_tokens=8192,
-            )
+        config = types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            response_mime_type="application/json",
+            response_schema=DailyRoutine,
+            temperature=0.3,
+            max_output_tokens=8192,
         )
+        return user_prompt, config
 
+    def _parse(self, response) -> DailyRoutine:
         # In the new SDK, response.parsed contains the populated Pydantic object
         if response.parsed is not None:
             return response.parsed
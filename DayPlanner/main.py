@@ -2,13 +2,15 @@ import os
 from dotenv import load_dotenv
 load_dotenv()  # Load .env before anything else
 
+import asyncio
+import weakref
 from fastapi import FastAPI, HTTPException
 from typing import Dict, Any
 
 from models import DailyInput, DailyRoutine
 from rl_models import CompletionLog, CriticEvaluation
 from llm_engine import LLMScheduler
-from history_manager import HistoryManager
+from history_manager import get_history_manager
 from policy_store import PolicyStore
 from critic import Critic
 
@@ -17,24 +19,53 @@ app = FastAPI(title="ChronoForge Direction Engine")
 llm = LLMScheduler()
 critic = Critic()
 
+# At most this many Gemini calls in flight per worker; the rest wait their turn
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# History / policy files are read and written in threads; serialise each user's updates.
+# Weak values: a user's lock disappears once nobody holds or waits on it.
+user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def user_lock(user_id: str) -> asyncio.Lock:
+    lock = user_locks.get(user_id)
+    if lock is None:
+        lock = user_locks[user_id] = asyncio.Lock()
+    return lock
+
 
 # ── Actor endpoint ───────────────────────────────────────────────────
 
 @app.post("/generate_daily_routine", response_model=DailyRoutine)
 async def generate_daily_routine(input_data: DailyInput):
-    history_mgr = HistoryManager(input_data.user_id)
-    recent_history = history_mgr.get_recent_history(days=5)
+    async with user_lock(input_data.user_id):
+        history_mgr, recent_history, policy_block = await asyncio.to_thread(load_actor_context, input_data.user_id)
+
+    async with llm_slots:
+        routine = await llm.generate_routine_async(input_data, recent_history, policy_block=policy_block)
+
+    # Save generated plan (completion will be added later via /log_completion),
+    # but only if the history and policy the Actor saw haven't changed meanwhile
+    async with user_lock(input_data.user_id):
+        history_mgr, history_now, policy_now = await asyncio.to_thread(load_actor_context, input_data.user_id)
+        if history_now != recent_history or policy_now != policy_block:
+            raise HTTPException(
+                status_code=409,
+                detail=f"History or policy for {input_data.user_id} changed while generating the routine; retry.",
+            )
+        await asyncio.to_thread(history_mgr.save_plan, routine.model_dump())
 
-    # Load learned policy rules and inject into the Actor's prompt
-    policy = PolicyStore(input_data.user_id)
-    policy_block = policy.get_policy_prompt_block()
+    return routine
 
-    routine = llm.generate_routine(input_data, recent_history, policy_block=policy_block)
 
-    # Save generated plan (completion will be added later via /log_completion)
-    history_mgr.save_plan(routine.model_dump())
+def load_actor_context(user_id: str):
+    history_mgr = get_history_manager(user_id)
+    recent_history = history_mgr.get_recent_history(days=5)
 
-    return routine
+    # Load learned policy rules and inject into the Actor's prompt
+    policy = PolicyStore(user_id)
+    return history_mgr, recent_history, policy.get_policy_prompt_block()
 
 
 # ── Completion logging ───────────────────────────────────────────────
@@ -42,8 +73,9 @@ async def generate_daily_routine(input_data: DailyInput):
 @app.post("/log_completion")
 async def log_completion(completion: CompletionLog):
     """Accept a structured CompletionLog and merge it into the user's history."""
-    history_mgr = HistoryManager(completion.user_id)
-    found = history_mgr.save_completion(completion.date, completion.model_dump())
+    async with user_lock(completion.user_id):
+        history_mgr = await asyncio.to_thread(get_history_manager, completion.user_id)
+        found = await asyncio.to_thread(history_mgr.save_completion, completion.date, completion.model_dump())
 
     status = "merged_with_plan" if found else "saved_standalone"
     print(f"✅ Completion logged for {completion.date} by {completion.user_id} ({status})")
@@ -59,38 +91,51 @@ async def trigger_reflection(user_id: str, date: str):
     Run the Critic on a specific day's plan + completion.
     Updates the user's policy store with the proposed rules.
     """
-    history_mgr = HistoryManager(user_id)
-    entry = history_mgr.get_entry_for_date(date)
+    # Read under the user lock, but run the Critic outside it so a slow (or
+    # queued) LLM call doesn't hold up /log_completion for this user
+    async with user_lock(user_id):
+        entry, policy = await asyncio.to_thread(load_reflection_context, user_id, date)
+    policy_before = policy.to_dict()
 
-    if entry is None:
-        raise HTTPException(status_code=404, detail=f"No history entry found for {date}")
-    if entry.get("completion") is None:
-        raise HTTPException(status_code=400, detail=f"No completion data for {date}. Log completion first.")
-    if entry.get("generated_plan") is None:
-        raise HTTPException(status_code=400, detail=f"No generated plan for {date}. Cannot reflect without a plan.")
-
-    # Reconstruct models
     plan = DailyRoutine.model_validate(entry["generated_plan"])
     completion = CompletionLog.model_validate(entry["completion"])
-
-    # Load existing policy
-    policy = PolicyStore(user_id)
     existing_rules = policy.get_all_rules()
 
-    # Run the Critic
-    evaluation = critic.evaluate(plan, completion, existing_rules)
+    async with llm_slots:
+        evaluation = await critic.evaluate_async(plan, completion, existing_rules)
 
-    # Update policy store with proposed rules
-    policy.update_rules(evaluation.proposed_rules)
+    async with user_lock(user_id):
+        # Only apply the rules if nothing the Critic saw has changed meanwhile
+        entry_now, policy = await asyncio.to_thread(load_reflection_context, user_id, date)
+        if entry_now != entry or policy.to_dict() != policy_before:
+            raise HTTPException(
+                status_code=409,
+                detail=f"History or policy for {user_id} changed during reflection on {date}; retry.",
+            )
+        await asyncio.to_thread(policy.update_rules, evaluation.proposed_rules)
 
     print(f"🧠 Reflection complete for {date} by {user_id}: score={evaluation.performance_score}")
     return evaluation
 
 
+def load_reflection_context(user_id: str, date: str):
+    """The history entry for `date` (checked to have a plan and a completion) and the user's policy."""
+    entry = get_history_manager(user_id).get_entry_for_date(date)
+
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No history entry found for {date}")
+    if entry.get("completion") is None:
+        raise HTTPException(status_code=400, detail=f"No completion data for {date}. Log completion first.")
+    if entry.get("generated_plan") is None:
+        raise HTTPException(status_code=400, detail=f"No generated plan for {date}. Cannot reflect without a plan.")
+
+    return entry, PolicyStore(user_id)
+
+
 # ── Policy inspection ────────────────────────────────────────────────
 
 @app.get("/view_policy/{user_id}")
 async def view_policy(user_id: str):
     """Return the current learned scheduling policy for a user."""
-    policy = PolicyStore(user_id)
+    policy = await asyncio.to_thread(PolicyStore, user_id)
     return policy.to_dict()
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Token-bucket admission control for notification ingest.
+
+Each (user, ``packageName``) pair and each user gets a bucket, so one
+user's noisy app cannot use up that app's budget for everyone else. A
+notification is admitted to the normal embedding path only if both
+buckets have a token; otherwise the caller downgrades it to the deferred
+path instead of rejecting it.
+
+Metrics are aggregate: counts per package (bounded) plus how many users
+are currently throttled, never a per-user breakdown.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Hashable
+
+# Idle buckets are dropped once the table grows past this many keys.
+MAX_TRACKED_KEYS = 10_000
+# Packages past this many are counted together under OTHER_PACKAGES.
+MAX_COUNTED_PACKAGES = 500
+OTHER_PACKAGES = "(other)"
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        app_rate: float,
+        app_burst: int,
+        user_rate: float,
+        user_burst: int,
+        exempt_packages: tuple[str, ...] = (),
+    ):
+        self.app_rate = app_rate
+        self.app_burst = app_burst
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.exempt_packages = frozenset(exempt_packages)
+        self._app_buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._user_buckets: dict[str, TokenBucket] = {}
+        self._package_counters: dict[str, dict[str, int]] = defaultdict(_new_counter)
+        self._lock = threading.Lock()
+
+    def _bucket(self, table: dict[Any, TokenBucket], key: Hashable, rate: float, burst: int, now: float) -> TokenBucket:
+        bucket = table.get(key)
+        if bucket is None:
+            if len(table) >= MAX_TRACKED_KEYS:
+                self._prune(table, now)
+            bucket = table[key] = TokenBucket(rate, burst)
+        bucket.refill(now)
+        return bucket
+
+    @staticmethod
+    def _prune(table: dict[Any, TokenBucket], now: float) -> None:
+        """Forget buckets that have refilled completely; they would be recreated identical."""
+        idle = []
+        for key, bucket in table.items():
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                idle.append(key)
+        for key in idle:
+            del table[key]
+
+    def admit(self, package_name: str, user_id: str | None) -> bool:
+        """Take one token from the app and user buckets; ``False`` means downgrade."""
+        user_key = user_id or "default"
+        now = time.monotonic()
+        with self._lock:
+            if package_name in self.exempt_packages:
+                admitted = True
+            else:
+                app_bucket = self._bucket(
+                    self._app_buckets, (user_key, package_name), self.app_rate, self.app_burst, now
+                )
+                user_bucket = self._bucket(self._user_buckets, user_key, self.user_rate, self.user_burst, now)
+                admitted = app_bucket.tokens >= 1 and user_bucket.tokens >= 1
+                if admitted:
+                    app_bucket.tokens -= 1
+                    user_bucket.tokens -= 1
+
+            counted = package_name
+            if counted not in self._package_counters and len(self._package_counters) >= MAX_COUNTED_PACKAGES:
+                counted = OTHER_PACKAGES
+            self._package_counters[counted]["admitted" if admitted else "deferred"] += 1
+        return admitted
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            by_package = {k: dict(v) for k, v in self._package_counters.items()}
+            tracked_users = len(self._user_buckets)
+            throttled_users = 0
+            for bucket in self._user_buckets.values():
+                bucket.refill(now)
+                throttled_users += bucket.tokens < 1
+        return {
+            "admitted": sum(v["admitted"] for v in by_package.values()),
+            "deferred": sum(v["deferred"] for v in by_package.values()),
+            "byPackage": by_package,
+            "trackedUsers": tracked_users,
+            "throttledUsers": throttled_users,
+        }
+
+
+def _new_counter() -> dict[str, int]:
+    return {"admitted": 0, "deferred": 0}
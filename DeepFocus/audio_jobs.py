@@ -0,0 +1,182 @@
+"""
+Asynchronous TTS jobs.
+
+Lets a request hand back the response text immediately while Pocket TTS
+renders the ``.wav`` in the background; clients fetch the audio later
+via ``GET /api/v1/audio/{job_id}``. Finished files are kept for a short
+TTL so a client can retry the download, then removed by a reaper timer.
+
+Job status and the rendered files live in ``AUDIO_OUTPUT_DIR`` (a small
+SQLite table next to the ``.wav`` files), so any worker can answer for a
+job another worker is rendering.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+# How often a worker polls for a job rendered by another worker
+POLL_INTERVAL_S = 0.1
+
+
+@dataclass
+class AudioJob:
+    job_id: str
+    text: str
+    created_at: float
+    status: str = "pending"  # pending | ready | failed
+    path: str = ""  # rendered file; empty unless ready
+
+
+class AudioJobStore:
+    def __init__(
+        self,
+        synthesize: Callable[[str, str], str],
+        *,
+        output_dir: str,
+        workers: int = 1,
+        ttl_s: float = 300.0,
+    ):
+        # synthesize(text, output_path) -> output_path, or "" on failure
+        self._synthesize = synthesize
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-job")
+        self._futures: dict[str, Future] = {}  # jobs rendering in this process
+        self._lock = threading.Lock()
+        self.ttl_s = ttl_s
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            str(self.output_dir / "audio_jobs.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audio_jobs (
+                job_id TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL,
+                path TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, name="audio-job-reaper", daemon=True)
+        self._reaper.start()
+
+    def submit(self, text: str) -> AudioJob:
+        job = AudioJob(job_id=uuid.uuid4().hex, text=text, created_at=time.time())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO audio_jobs (job_id, text, status, created_at) VALUES (?, ?, 'pending', ?)",
+                (job.job_id, job.text, job.created_at),
+            )
+            self._futures[job.job_id] = self._executor.submit(self._render, job)
+        return job
+
+    def _render(self, job: AudioJob) -> None:
+        path = ""
+        try:
+            path = self._synthesize(job.text, str(self.output_dir / f"{job.job_id}.wav"))
+        except Exception:
+            logger.exception("Audio job %s failed", job.job_id)
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE audio_jobs SET status = ?, path = ? WHERE job_id = ?",
+                ("ready" if path else "failed", path, job.job_id),
+            ).rowcount
+            self._futures.pop(job.job_id, None)
+        if not updated and path:
+            # Reaped while still rendering (TTL shorter than synthesis)
+            self._remove_file(path)
+
+    def get(self, job_id: str) -> AudioJob | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, text, created_at, status, path FROM audio_jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return AudioJob(*row) if row else None
+
+    def wait(self, job_id: str, timeout_s: float) -> AudioJob | None:
+        """The job once it has finished, or still pending after *timeout_s*; None if unknown."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout_s)
+            except Exception:
+                pass  # timeouts and failures are reported via the stored status
+            return self.get(job_id)
+
+        # Rendering in another worker: poll the shared table
+        deadline = time.monotonic() + timeout_s
+        while True:
+            job = self.get(job_id)
+            if job is None or job.status != "pending" or time.monotonic() >= deadline:
+                return job
+            time.sleep(POLL_INTERVAL_S)
+
+    def _reap_loop(self) -> None:
+        interval_s = min(60.0, max(1.0, self.ttl_s / 4))
+        while not self._stop.wait(interval_s):
+            try:
+                self._reap()
+            except Exception:
+                logger.exception("Audio job reaper failed")
+
+    def _reap(self) -> None:
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            in_flight = list(self._futures)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._conn.execute(
+                    "SELECT job_id, path FROM audio_jobs WHERE created_at < ?",
+                    (cutoff,),
+                ).fetchall()
+                # Jobs still rendering here are reaped once they finish
+                expired = [(job_id, path) for job_id, path in expired if job_id not in in_flight]
+                self._conn.executemany("DELETE FROM audio_jobs WHERE job_id = ?", [(j,) for j, _ in expired])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for _, path in expired:
+            if path:
+                self._remove_file(path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def pending_count(self) -> int:
+        """Jobs rendering in this process."""
+        with self._lock:
+            return len(self._futures)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
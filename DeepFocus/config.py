@@ -31,6 +31,54 @@ If nothing urgent, reply exactly: "Nothing urgent right now. Keep focusing."
 Do not hallucinate; only use retrieved context.
 """.strip()
 
+# Default IMPORTANCE_KEYWORDS: words that make a notification worth interrupting for.
+DEFAULT_URGENT_KEYWORDS = (
+    "urgent", "asap", "emergency", "immediately", "deadline", "due today",
+    "exam", "quiz", "call me", "call back", "important", "hospital", "otp",
+)
+
+# Default THREAD_PACKAGES: chat apps whose notifications are one message of a conversation.
+DEFAULT_THREAD_PACKAGES = (
+    "com.whatsapp", "com.whatsapp.w4b", "org.telegram.messenger", "org.thoughtcrime.securesms",
+    "com.facebook.orca", "com.google.android.apps.messaging", "com.samsung.android.messaging",
+    "com.discord", "com.Slack", "com.microsoft.teams", "com.instagram.android",
+)
+
+# Agent-query generation tiers: "light" answers small / simple contexts, "full" the rest.
+LLM_TIERS = ("light", "full")
+
+# Wake queries that only ask whether anything arrived; a light model handles these well.
+SIMPLE_INTENT_PATTERN = re.compile(
+    r"\b(anything|any)\b.*\b(new|urgent|important|messages?|missed)\b|\bwhat did i miss\b",
+    re.IGNORECASE,
+)
+
+# Questions that need reasoning across notifications go to the full model.
+COMPLEX_INTENT_PATTERN = re.compile(
+    r"\b(why|compare|explain|summari[sz]e (all|everything)|which (one|of)|plan|prioriti[sz]e)\b",
+    re.IGNORECASE,
+)
+
+# "local" loads Pocket TTS in-process; "remote" uses the shared tts_server.py process.
+TTS_MODES = ("local", "remote")
+
+# "blocking" warms Gemini + TTS before serving; "background" warms after startup (see /readyz).
+WARMUP_MODES = ("off", "blocking", "background")
+
+# "sync" embeds + upserts inside the request; "write_behind" queues durably and returns 202.
+INGEST_MODES = ("sync", "write_behind")
+
+# "full" echoes storedDocument on ingest; "minimal" returns only status + notificationId.
+INGEST_RESPONSE_MODES = ("full", "minimal")
+
+# "persistent" writes every upsert through Chroma's SQLite store; "snapshot" serves from
+# memory and periodically dumps the collection to CHROMA_PERSIST_DIR (see vector_snapshot.py);
+# "server" talks to a shared Chroma server so API replicas hold no local state.
+VECTOR_STORE_MODES = ("persistent", "snapshot", "server")
+
+# Storage for the hot tier's embedding matrix (the encodings in embedding_codec.py)
+HOT_TIER_DTYPES = ("float32", "float16", "int8")
+
 
 # ---------------------------------------------------------------------------
 # Settings
@@ -40,11 +88,79 @@ class Settings:
     gemini_api_key: str
     gemini_embedding_model: str
     gemini_llm_model: str
+    gemini_llm_light_model: str
+    llm_light_max_rows: int
+    llm_max_output_tokens: int
+    llm_thinking_budget: int | None
+    embedding_dimensionality: int | None
     chroma_persist_dir: str
     chroma_collection_name: str
+    vector_store_mode: str
+    chroma_host: str
+    chroma_port: int
+    chroma_ssl: bool
+    chroma_shard_by_user: bool
+    collection_alias_refresh_s: float
+    snapshot_every_writes: int
+    snapshot_interval_s: float
     default_top_k: int
+    hnsw_m: int
+    hnsw_construction_ef: int
+    hnsw_search_ef: int
+    hot_tier_capacity: int
+    hot_tier_preload_minutes: int
+    hot_tier_dtype: str
+    context_packing: bool
+    context_token_budget: int
+    context_dedup_similarity: float
+    context_mmr_lambda: float
     cors_origins: tuple[str, ...]
     tts_voice: str
+    tts_mode: str
+    tts_socket_path: str
+    tts_torch_threads: int
+    tts_interop_threads: int
+    tts_inference_mode: bool
+    tts_quantize: bool
+    audio_output_dir: str
+    audio_job_ttl_s: float
+    audio_job_wait_s: float
+    warmup_mode: str
+    warmup_timeout_s: float
+    gemini_timeout_s: float
+    gemini_max_retries: int
+    gemini_hedge_enabled: bool
+    gemini_hedge_min_delay_s: float
+    gemini_breaker_failure_threshold: int
+    gemini_breaker_reset_s: float
+    ingest_stream_window: int
+    ingest_mode: str
+    ingest_queue_path: str
+    ingest_batch_size: int
+    admission_control: bool
+    admission_app_rate: float
+    admission_app_burst: int
+    admission_user_rate: float
+    admission_user_burst: int
+    admission_exempt_packages: tuple[str, ...]
+    deferred_queue_path: str
+    scheduler_interactive_weight: float
+    scheduler_ingest_weight: float
+    scheduler_max_wait_s: float
+    thread_coalescing: bool
+    thread_packages: tuple[str, ...]
+    thread_window: int
+    thread_debounce_s: float
+    thread_max_delay_s: float
+    thread_journal_path: str
+    importance_scoring: bool
+    importance_vip_senders: tuple[str, ...]
+    importance_keywords: tuple[str, ...]
+    importance_model_path: str
+    importance_min: float
+    importance_boost: float
+    watermark_db_path: str
+    ingest_response_mode: str
 
 
 def parse_cors_origins(raw: str) -> tuple[str, ...]:
@@ -54,6 +170,10 @@ def parse_cors_origins(raw: str) -> tuple[str, ...]:
     return tuple(part.strip() for part in raw.split(",") if part.strip())
 
 
+def parse_csv(raw: str) -> tuple[str, ...]:
+    return tuple(part.strip() for part in (raw or "").split(",") if part.strip())
+
+
 def normalize_model_name(model_name: str) -> str:
     """Accept both ``models/xyz`` and ``xyz``."""
     if model_name.startswith("models/"):
@@ -61,23 +181,157 @@ def normalize_model_name(model_name: str) -> str:
     return model_name
 
 
-def load_settings() -> Settings:
-    top_k_raw = os.getenv("TOP_K", "8").strip()
+def env_int(name: str, default: int, low: int, high: int) -> int:
+    raw = os.getenv(name, str(default)).strip()
     try:
-        top_k = int(top_k_raw)
+        value = int(raw)
     except ValueError as exc:
-        raise RuntimeError("TOP_K must be an integer") from exc
+        raise RuntimeError(f"{name} must be an integer") from exc
+    if not (low <= value <= high):
+        raise RuntimeError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def env_float(name: str, default: float, low: float, high: float) -> float:
+    raw = os.getenv(name, str(default)).strip()
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be a number") from exc
+    if not (low <= value <= high):
+        raise RuntimeError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    if raw in ("1", "true", "yes", "on"):
+        return True
+    if raw in ("0", "false", "no", "off"):
+        return False
+    raise RuntimeError(f"{name} must be a boolean")
+
+
+def load_settings() -> Settings:
+    top_k = env_int("TOP_K", 8, 1, 50)
+
+    tts_mode = os.getenv("TTS_MODE", "local").strip().lower()
+    if tts_mode not in TTS_MODES:
+        raise RuntimeError(f"TTS_MODE must be one of: {', '.join(TTS_MODES)}")
+
+    warmup_mode = os.getenv("WARMUP_MODE", "off").strip().lower()
+    if warmup_mode not in WARMUP_MODES:
+        raise RuntimeError(f"WARMUP_MODE must be one of: {', '.join(WARMUP_MODES)}")
+
+    ingest_mode = os.getenv("INGEST_MODE", "sync").strip().lower()
+    if ingest_mode not in INGEST_MODES:
+        raise RuntimeError(f"INGEST_MODE must be one of: {', '.join(INGEST_MODES)}")
+
+    vector_store_mode = os.getenv("VECTOR_STORE_MODE", "persistent").strip().lower()
+    if vector_store_mode not in VECTOR_STORE_MODES:
+        raise RuntimeError(f"VECTOR_STORE_MODE must be one of: {', '.join(VECTOR_STORE_MODES)}")
+
+    chroma_shard_by_user = env_bool("CHROMA_SHARD_BY_USER", False)
+    if chroma_shard_by_user and vector_store_mode == "snapshot":
+        raise RuntimeError("CHROMA_SHARD_BY_USER is not supported with VECTOR_STORE_MODE=snapshot")
+
+    hot_tier_dtype = os.getenv("HOT_TIER_DTYPE", "float32").strip().lower()
+    if hot_tier_dtype not in HOT_TIER_DTYPES:
+        raise RuntimeError(f"HOT_TIER_DTYPE must be one of: {', '.join(HOT_TIER_DTYPES)}")
 
-    if not (1 <= top_k <= 50):
-        raise RuntimeError("TOP_K must be between 1 and 50")
+    ingest_response_mode = os.getenv("INGEST_RESPONSE_MODE", "full").strip().lower()
+    if ingest_response_mode not in INGEST_RESPONSE_MODES:
+        raise RuntimeError(f"INGEST_RESPONSE_MODE must be one of: {', '.join(INGEST_RESPONSE_MODES)}")
 
     return Settings(
         gemini_api_key=os.getenv("GEMINI_API_KEY", "").strip(),
         gemini_embedding_model=os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001").strip(),
         gemini_llm_model=os.getenv("GEMINI_LLM_MODEL", "gemini-2.5-flash").strip(),
+        gemini_llm_light_model=os.getenv("GEMINI_LLM_LIGHT_MODEL", "gemini-2.5-flash-lite").strip(),
+        llm_light_max_rows=env_int("LLM_LIGHT_MAX_ROWS", 3, 0, 50),
+        llm_max_output_tokens=env_int("LLM_MAX_OUTPUT_TOKENS", 160, 16, 8192),
+        llm_thinking_budget=(
+            env_int("LLM_THINKING_BUDGET", 0, -1, 24576)
+            if os.getenv("LLM_THINKING_BUDGET", "").strip()
+            else None
+        ),
+        embedding_dimensionality=(
+            env_int("EMBEDDING_DIMENSIONALITY", 3072, 128, 3072)
+            if os.getenv("EMBEDDING_DIMENSIONALITY", "").strip()
+            else None
+        ),
         chroma_persist_dir=os.getenv("CHROMA_PERSIST_DIR", "./data/chroma").strip(),
         chroma_collection_name=os.getenv("CHROMA_COLLECTION_NAME", "chronoforge_notifications").strip(),
+        vector_store_mode=vector_store_mode,
+        chroma_host=os.getenv("CHROMA_HOST", "localhost").strip(),
+        chroma_port=env_int("CHROMA_PORT", 8002, 1, 65535),
+        chroma_ssl=env_bool("CHROMA_SSL", False),
+        chroma_shard_by_user=chroma_shard_by_user,
+        collection_alias_refresh_s=env_float("COLLECTION_ALIAS_REFRESH_SECONDS", 30.0, 0.0, 3600.0),
+        snapshot_every_writes=env_int("SNAPSHOT_EVERY_WRITES", 500, 1, 1_000_000),
+        snapshot_interval_s=env_float("SNAPSHOT_INTERVAL_SECONDS", 10.0, 0.5, 3600.0),
         default_top_k=top_k,
+        hnsw_m=env_int("HNSW_M", 16, 4, 128),
+        hnsw_construction_ef=env_int("HNSW_CONSTRUCTION_EF", 100, 10, 2000),
+        hnsw_search_ef=env_int("HNSW_SEARCH_EF", 10, 1, 2000),
+        hot_tier_capacity=env_int("HOT_TIER_CAPACITY", 0, 0, 1_000_000),
+        hot_tier_preload_minutes=env_int("HOT_TIER_PRELOAD_MINUTES", 60, 0, 7 * 24 * 60),
+        hot_tier_dtype=hot_tier_dtype,
+        context_packing=env_bool("CONTEXT_PACKING", False),
+        context_token_budget=env_int("CONTEXT_TOKEN_BUDGET", 600, 50, 8000),
+        context_dedup_similarity=env_float("CONTEXT_DEDUP_SIMILARITY", 0.95, 0.5, 1.0),
+        context_mmr_lambda=env_float("CONTEXT_MMR_LAMBDA", 0.7, 0.0, 1.0),
         cors_origins=parse_cors_origins(os.getenv("CORS_ORIGINS", "*")),
         tts_voice=os.getenv("TTS_VOICE", "alba").strip(),
+        tts_mode=tts_mode,
+        tts_socket_path=os.getenv("TTS_SOCKET_PATH", "/tmp/deepfocus-tts.sock").strip(),
+        tts_torch_threads=env_int("TTS_TORCH_THREADS", 0, 0, 256),
+        tts_interop_threads=env_int("TTS_INTEROP_THREADS", 0, 0, 256),
+        tts_inference_mode=env_bool("TTS_INFERENCE_MODE", True),
+        tts_quantize=env_bool("TTS_QUANTIZE", False),
+        audio_output_dir=os.getenv("AUDIO_OUTPUT_DIR", "./data/audio").strip(),
+        audio_job_ttl_s=env_float("AUDIO_JOB_TTL_SECONDS", 300.0, 10.0, 86400.0),
+        audio_job_wait_s=env_float("AUDIO_JOB_WAIT_SECONDS", 30.0, 0.0, 300.0),
+        warmup_mode=warmup_mode,
+        warmup_timeout_s=env_float("WARMUP_TIMEOUT_SECONDS", 60.0, 1.0, 600.0),
+        gemini_timeout_s=env_float("GEMINI_TIMEOUT_SECONDS", 10.0, 0.5, 120.0),
+        gemini_max_retries=env_int("GEMINI_MAX_RETRIES", 2, 0, 5),
+        gemini_hedge_enabled=env_bool("GEMINI_HEDGE_ENABLED", True),
+        gemini_hedge_min_delay_s=env_float("GEMINI_HEDGE_MIN_DELAY_MS", 250, 0, 60000) / 1000,
+        gemini_breaker_failure_threshold=env_int("GEMINI_BREAKER_FAILURE_THRESHOLD", 5, 1, 100),
+        gemini_breaker_reset_s=env_float("GEMINI_BREAKER_RESET_SECONDS", 30.0, 1.0, 600.0),
+        ingest_stream_window=env_int("INGEST_STREAM_WINDOW", 32, 1, 1024),
+        ingest_mode=ingest_mode,
+        ingest_queue_path=os.getenv("INGEST_QUEUE_PATH", "./data/ingest_queue.sqlite3").strip(),
+        ingest_batch_size=env_int("INGEST_BATCH_SIZE", 32, 1, 100),
+        admission_control=env_bool("ADMISSION_CONTROL", False),
+        admission_app_rate=env_float("ADMISSION_APP_RATE_PER_SEC", 1.0, 0.01, 1000.0),
+        admission_app_burst=env_int("ADMISSION_APP_BURST", 20, 1, 10000),
+        admission_user_rate=env_float("ADMISSION_USER_RATE_PER_SEC", 5.0, 0.01, 1000.0),
+        admission_user_burst=env_int("ADMISSION_USER_BURST", 60, 1, 10000),
+        admission_exempt_packages=parse_csv(
+            os.getenv("ADMISSION_EXEMPT_PACKAGES", "com.android.phone,com.google.android.dialer")
+        ),
+        deferred_queue_path=os.getenv("DEFERRED_QUEUE_PATH", "./data/deferred_queue.sqlite3").strip(),
+        scheduler_interactive_weight=env_float("SCHEDULER_INTERACTIVE_WEIGHT", 8.0, 0.1, 1000.0),
+        scheduler_ingest_weight=env_float("SCHEDULER_INGEST_WEIGHT", 1.0, 0.1, 1000.0),
+        scheduler_max_wait_s=env_float("SCHEDULER_MAX_WAIT_MS", 2000, 10, 600000) / 1000,
+        thread_coalescing=env_bool("THREAD_COALESCING", False),
+        thread_packages=parse_csv(os.getenv("THREAD_PACKAGES", "")) or DEFAULT_THREAD_PACKAGES,
+        thread_window=env_int("THREAD_WINDOW", 20, 1, 200),
+        thread_debounce_s=env_float("THREAD_DEBOUNCE_SECONDS", 5.0, 0.1, 600.0),
+        thread_max_delay_s=env_float("THREAD_MAX_DELAY_SECONDS", 30.0, 0.1, 3600.0),
+        thread_journal_path=os.getenv("THREAD_JOURNAL_PATH", "./data/thread_journal.sqlite3").strip(),
+        importance_scoring=env_bool("IMPORTANCE_SCORING", True),
+        importance_vip_senders=parse_csv(os.getenv("IMPORTANCE_VIP_SENDERS", "")),
+        importance_keywords=(
+            parse_csv(os.getenv("IMPORTANCE_KEYWORDS", "")) or DEFAULT_URGENT_KEYWORDS
+        ),
+        importance_model_path=os.getenv("IMPORTANCE_MODEL_PATH", "").strip(),
+        importance_min=env_float("IMPORTANCE_MIN", 0.0, 0.0, 1.0),
+        importance_boost=env_float("IMPORTANCE_BOOST", 0.2, 0.0, 1.0),
+        watermark_db_path=os.getenv("WATERMARK_DB_PATH", "./data/watermarks.sqlite3").strip(),
+        ingest_response_mode=ingest_response_mode,
     )
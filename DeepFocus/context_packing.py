@@ -0,0 +1,218 @@
+"""
+Context packing between retrieval and the LLM.
+
+Collapses near-duplicate rows with an MMR pass over the embeddings Chroma
+already returned, groups what is left by (app, sender), and trims the
+result to a token budget so the prompt stays small.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+# Rough chars-per-token ratio for English prompt text.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class RetrievedRow:
+    document: str
+    metadata: dict[str, Any]
+    relevance: float
+    embedding: np.ndarray | None = None
+    duplicates: int = 0
+    folded: list[RetrievedRow] = field(default_factory=list)  # the near-duplicates counted above
+
+
+@dataclass
+class ContextGroup:
+    app_name: str
+    sender: str
+    rows: list[RetrievedRow] = field(default_factory=list)
+
+    @property
+    def relevance(self) -> float:
+        return max(r.relevance for r in self.rows)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def rows_from_query_result(result: dict[str, Any]) -> list[RetrievedRow]:
+    """Flatten a single-query Chroma result into ``RetrievedRow`` objects."""
+    def first(key: str) -> list:
+        outer = result.get(key)
+        return list(outer[0]) if outer is not None and len(outer) > 0 else []
+
+    docs, metas, distances, embeddings = (
+        first("documents"), first("metadatas"), first("distances"), first("embeddings")
+    )
+    rows: list[RetrievedRow] = []
+    for i, doc in enumerate(docs):
+        if not doc:
+            continue
+        rows.append(RetrievedRow(
+            document=doc,
+            metadata=metas[i] if i < len(metas) and metas[i] else {},
+            # cosine distance → similarity
+            relevance=1.0 - float(distances[i]) if i < len(distances) else 0.0,
+            embedding=np.asarray(embeddings[i], dtype=np.float32) if i < len(embeddings) else None,
+        ))
+    return rows
+
+
+def rows_from_get_result(result: dict[str, Any]) -> list[RetrievedRow]:
+    """Same for a Chroma ``get`` result (no distances, so relevance is 0)."""
+    return rows_from_query_result({
+        key: [result[key]]
+        for key in ("documents", "metadatas", "embeddings")
+        if result.get(key) is not None
+    })
+
+
+def boost_by_importance(rows: list[RetrievedRow], weight: float) -> list[RetrievedRow]:
+    """Add ``weight * importance`` to each row's relevance and re-rank."""
+    for row in rows:
+        row.relevance += weight * float(row.metadata.get("importance", 0.0))
+    return sorted(rows, key=lambda r: r.relevance, reverse=True)
+
+
+def row_time(row: RetrievedRow) -> int:
+    return int(row.metadata.get("time", 0))
+
+
+def document_body(row: RetrievedRow) -> str:
+    """Recover the message text from a stored ``format_notification_document`` string."""
+    meta = row.metadata
+    sender = str(meta.get("title", "")).strip() or "Unknown sender"
+    prefix = f"{meta.get('appName', '')} message from {sender}: "
+    suffix = f" at {meta.get('timeUtc', '')}."
+    doc = row.document
+    if doc.startswith(prefix) and doc.endswith(suffix):
+        return doc[len(prefix):-len(suffix)]
+    return doc
+
+
+def collapse_near_duplicates(
+    rows: list[RetrievedRow],
+    similarity_threshold: float,
+    mmr_lambda: float,
+) -> list[RetrievedRow]:
+    """
+    MMR ordering that folds near-duplicates into one row: the newest of the
+    group is kept, carrying the group's best relevance, and counts the rest
+    in ``duplicates``.
+    """
+    if len(rows) < 2 or any(r.embedding is None for r in rows):
+        return rows
+
+    matrix = np.stack([r.embedding for r in rows])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    unit = matrix / norms
+    sim = unit @ unit.T
+    relevance = np.array([r.relevance for r in rows], dtype=np.float32)
+
+    selected: list[int] = []
+    remaining = list(range(len(rows)))
+    while remaining:
+        if selected:
+            redundancy = sim[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        scores = mmr_lambda * relevance[remaining] - (1.0 - mmr_lambda) * redundancy
+        pick = remaining.pop(int(np.argmax(scores)))
+
+        if selected:
+            slot = int(np.argmax(sim[pick, selected]))
+            closest = selected[slot]
+            if sim[pick, closest] >= similarity_threshold:
+                # The group speaks with its newest row, ranked by its best one
+                keep, drop = pick, closest
+                if row_time(rows[pick]) <= row_time(rows[closest]):
+                    keep, drop = closest, pick
+                rows[keep].duplicates += 1 + rows[drop].duplicates
+                rows[keep].folded += [rows[drop], *rows[drop].folded]
+                rows[keep].relevance = max(rows[keep].relevance, rows[drop].relevance)
+                rows[drop].duplicates, rows[drop].folded = 0, []
+                selected[slot] = keep
+                continue
+        selected.append(pick)
+
+    return [rows[i] for i in selected]
+
+
+def group_by_sender(rows: list[RetrievedRow]) -> list[ContextGroup]:
+    groups: dict[tuple[str, str], ContextGroup] = {}
+    for row in rows:
+        app_name = str(row.metadata.get("appName", "Unknown App"))
+        sender = str(row.metadata.get("title", "")).strip()
+        key = (app_name, sender)
+        if key not in groups:
+            groups[key] = ContextGroup(app_name=app_name, sender=sender)
+        groups[key].rows.append(row)
+    return sorted(groups.values(), key=lambda g: g.relevance, reverse=True)
+
+
+def format_row(row: RetrievedRow) -> str:
+    """One prompt line per notification (the unpacked format)."""
+    app_name = str(row.metadata.get("appName", "Unknown App"))
+    title = str(row.metadata.get("title", "")).strip()
+    time_utc = str(row.metadata.get("timeUtc", "Unknown time"))
+    sender_part = f" from {title}" if title else ""
+    return f"{app_name}{sender_part} at {time_utc}: {row.document}"
+
+
+def format_group(group: ContextGroup) -> str:
+    rows = sorted(group.rows, key=lambda r: r.metadata.get("time", 0), reverse=True)
+    if len(rows) == 1 and not rows[0].duplicates:
+        return format_row(rows[0])
+
+    sender_part = f" from {group.sender}" if group.sender else ""
+    latest = str(rows[0].metadata.get("timeUtc", "Unknown time"))
+
+    bodies = []
+    for row in rows:
+        body = document_body(row)
+        if row.duplicates:
+            body += f" (repeated {row.duplicates + 1}x)"
+        bodies.append(body)
+    total = sum(1 + r.duplicates for r in rows)
+    return f"{group.app_name}{sender_part} ({total} messages, latest at {latest}): " + " | ".join(bodies)
+
+
+def pack_context(
+    rows: list[RetrievedRow],
+    *,
+    token_budget: int,
+    similarity_threshold: float = 0.95,
+    mmr_lambda: float = 0.7,
+) -> tuple[list[str], list[RetrievedRow]]:
+    """
+    Dedupe, group and budget *rows* into prompt lines, most relevant first.
+
+    Also returns the input rows that made it in uncut: those of every group
+    that fit, plus the near-duplicates folded into them.
+    """
+    kept = collapse_near_duplicates(rows, similarity_threshold, mmr_lambda)
+
+    lines: list[str] = []
+    included: list[RetrievedRow] = []
+    used = 0
+    for group in group_by_sender(kept):
+        line = format_group(group)
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            if lines:
+                break
+            # Always keep something: trim the single most relevant group to fit.
+            lines.append(line[: token_budget * CHARS_PER_TOKEN].rstrip() + "…")
+            break
+        lines.append(line)
+        included += [r for row in group.rows for r in (row, *row.folded)]
+        used += cost
+    return lines, included
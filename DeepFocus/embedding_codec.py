@@ -0,0 +1,55 @@
+"""
+Compact encodings for embedding matrices.
+
+Gemini embeddings are Matryoshka-trained, so a prefix of the vector is a
+valid lower-dimensional embedding once re-normalised. On top of that,
+rows can be stored as float16 or as int8 with a per-row scale. Used for
+the in-process vector stores DeepFocus owns; Chroma's HNSW index always
+keeps float32 internally.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+@dataclass
+class EncodedMatrix:
+    codes: np.ndarray
+    scales: np.ndarray | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+
+def truncate(matrix: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the first *dim* components and re-normalise each row."""
+    head = np.ascontiguousarray(matrix[:, :dim], dtype=np.float32)
+    norms = np.linalg.norm(head, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    return head / norms
+
+
+def encode(matrix: np.ndarray, dtype: str) -> EncodedMatrix:
+    if dtype == "float32":
+        return EncodedMatrix(np.asarray(matrix, dtype=np.float32))
+    if dtype == "float16":
+        return EncodedMatrix(matrix.astype(np.float16))
+    if dtype == "int8":
+        # Symmetric per-row quantisation: q = round(x / s), s = max|x| / 127
+        scales = np.abs(matrix).max(axis=1, keepdims=True).astype(np.float32) / 127.0
+        np.maximum(scales, 1e-12, out=scales)
+        codes = np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+        return EncodedMatrix(codes, scales)
+    raise ValueError(f"Unsupported storage dtype: {dtype}")
+
+
+def decode(encoded: EncodedMatrix) -> np.ndarray:
+    if encoded.scales is None:
+        return encoded.codes.astype(np.float32, copy=False)
+    return encoded.codes.astype(np.float32) * encoded.scales
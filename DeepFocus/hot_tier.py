@@ -0,0 +1,273 @@
+"""
+In-memory hot tier for recent notifications.
+
+Most agent queries are about the last hour, so the newest notifications
+are also kept in a fixed-capacity ring buffer: embeddings in one
+contiguous matrix (float32, or float16 / per-row-scaled int8 via
+``embedding_codec`` with ``HOT_TIER_DTYPE``), with ``time`` / ``importance`` / ``userId``
+as parallel arrays so filtering and similarity search are a handful of
+vectorised NumPy operations. Chroma stays the cold tier. The hot tier
+only answers queries with a time window (``withinMinutes`` /
+``sinceLastAsked``) that starts no earlier than the oldest notification
+the buffer is guaranteed to hold; unbounded queries always go to Chroma,
+since the best matches may be older than anything buffered.
+
+The buffer is per process and only sees what this process ingests, so it
+is opt-in (``HOT_TIER_CAPACITY``) and only answers while this process can
+show it is the sole writer to the vector store (see ``SoleWriterLock``).
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from embedding_codec import STORAGE_DTYPES, EncodedMatrix, decode, encode
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+# ``user_id`` default: don't filter by user (the unsharded collection is shared)
+ALL_USERS: Any = object()
+
+
+class SoleWriterLock:
+    """
+    Every DeepFocus process sharing a persist directory holds a shared
+    ``flock`` on one file; only a process that can briefly upgrade it to
+    exclusive is the sole writer. Catches ``uvicorn --workers N`` and
+    side-by-side deployments that ``WORKERS`` doesn't describe.
+    """
+
+    def __init__(self, directory: str):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(os.path.join(directory, ".writers.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+
+    def is_sole(self) -> bool:
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # A failed upgrade has already dropped our shared hold (flock
+            # conversions aren't atomic); take it back or peers think they're alone
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            return False
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        return True
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class HotTier:
+    def __init__(self, capacity: int, dtype: str = "float32", writers: SoleWriterLock | None = None):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype: {dtype}")
+        self.capacity = capacity
+        self.dtype = dtype
+        # None: the caller vouches that nothing else writes the collection
+        self._writers = writers
+        self.disabled = False
+        self._lock = threading.Lock()
+        self._vectors: np.ndarray | None = None  # codes; allocated on first write, once the width is known
+        self._scales: np.ndarray | None = None  # per-row int8 scales
+        self._times = np.zeros(capacity, dtype=np.int64)
+        self._importance = np.full(capacity, np.nan, dtype=np.float32)
+        self._users = np.full(capacity, None, dtype=object)
+        self._filled = np.zeros(capacity, dtype=bool)
+        self._ids: list[str | None] = [None] * capacity
+        self._documents: list[str | None] = [None] * capacity
+        self._metadatas: list[dict[str, Any] | None] = [None] * capacity
+        self._slots: dict[str, int] = {}
+        self._next = 0
+        # Everything ingested at or after this instant is (still) in the buffer
+        self._complete_since_ms = int(time.time() * 1000)
+
+        # Metrics
+        self._served_hot = 0
+        self._fell_back = 0
+
+    # Writes
+    def add(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict[str, Any]],
+        embeddings: np.ndarray,
+    ) -> None:
+        """Upsert rows: an existing ID is updated in place, new IDs evict the oldest slot."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.maximum(norms, 1e-12, out=norms)
+        encoded = encode(vectors / norms, self.dtype)
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != encoded.codes.shape[1]:
+                self._reset(encoded.codes.shape[1])
+            for i, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+                slot = self._slots.get(doc_id)
+                if slot is None:
+                    slot = self._next
+                    self._next = (self._next + 1) % self.capacity
+                    evicted = self._ids[slot]
+                    if evicted is not None:
+                        del self._slots[evicted]
+                        self._complete_since_ms = max(self._complete_since_ms, int(self._times[slot]) + 1)
+                    self._slots[doc_id] = slot
+                    self._ids[slot] = doc_id
+
+                self._vectors[slot] = encoded.codes[i]
+                if self._scales is not None:
+                    self._scales[slot] = encoded.scales[i]
+                self._documents[slot] = document
+                self._metadatas[slot] = metadata
+                self._times[slot] = int(metadata.get("time", 0))
+                self._importance[slot] = metadata.get("importance", np.nan)
+                self._users[slot] = metadata.get("userId")
+                self._filled[slot] = True
+
+    def preload(self, rows: dict[str, Any], since_ms: int) -> None:
+        """
+        Seed the buffer from a Chroma ``get`` of everything newer than *since_ms*.
+
+        If all of it fit, the hot tier is complete back to *since_ms*;
+        otherwise only the newest rows were kept and completeness starts
+        at the oldest of them.
+        """
+        if not rows["ids"]:
+            return
+        order = sorted(range(len(rows["ids"])), key=lambda i: rows["metadatas"][i].get("time", 0))
+        order = order[-self.capacity:]
+        self.add(
+            [rows["ids"][i] for i in order],
+            [rows["documents"][i] for i in order],
+            [rows["metadatas"][i] for i in order],
+            np.asarray([rows["embeddings"][i] for i in order], dtype=np.float32),
+        )
+        with self._lock:
+            if len(rows["ids"]) <= self.capacity:
+                self._complete_since_ms = since_ms
+            else:
+                self._complete_since_ms = int(rows["metadatas"][order[0]].get("time", 0))
+        logger.info("Hot tier preloaded with %d notifications", len(order))
+
+    def clear(self) -> None:
+        """Drop every row, e.g. when the collection moves to a new embedding space."""
+        with self._lock:
+            if self._vectors is not None:
+                dim, self._vectors = self._vectors.shape[1], None
+                self._reset(dim)
+
+    def _reset(self, dim: int) -> None:
+        if self._vectors is not None:
+            logger.warning("Embedding width changed to %d; clearing the hot tier", dim)
+        self._vectors = np.zeros((self.capacity, dim), dtype=self.dtype)
+        self._scales = np.ones((self.capacity, 1), dtype=np.float32) if self.dtype == "int8" else None
+        self._filled[:] = False
+        self._ids = [None] * self.capacity
+        self._documents = [None] * self.capacity
+        self._metadatas = [None] * self.capacity
+        self._slots.clear()
+        self._next = 0
+        self._complete_since_ms = int(time.time() * 1000)
+
+    # Reads
+    def _mask(self, user_id: Any, min_time_ms: int | None, min_importance: float | None) -> np.ndarray:
+        mask = self._filled.copy()
+        if user_id is not ALL_USERS:
+            mask &= self._users == user_id
+        if min_time_ms is not None:
+            mask &= self._times >= min_time_ms
+        if min_importance is not None:
+            # NaN (unscored) compares False, matching Chroma's $gte on a missing key
+            mask &= self._importance >= min_importance
+        return mask
+
+    def _check_writers(self) -> bool:
+        if not self.disabled and self._writers is not None and not self._writers.is_sole():
+            # Whatever the other process wrote is missing here, even after it exits
+            logger.warning("Another DeepFocus process writes the vector store; hot tier disabled")
+            self.disabled = True
+        return not self.disabled
+
+    def covers(self, since_ms: int | None) -> bool:
+        """True when every notification newer than *since_ms* is in the buffer."""
+        return since_ms is not None and since_ms >= self._complete_since_ms and self._check_writers()
+
+    def has_matches(
+        self,
+        *,
+        user_id: Any = ALL_USERS,
+        min_time_ms: int | None = None,
+        min_importance: float | None = None,
+    ) -> bool:
+        with self._lock:
+            return bool(self._mask(user_id, min_time_ms, min_importance).any())
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        *,
+        user_id: Any = ALL_USERS,
+        min_time_ms: int | None = None,
+        min_importance: float | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Chroma-shaped query result (cosine distances), or None when the cold
+        tier has to be consulted.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self._fell_back += 1
+                return None
+            if not self.covers(min_time_ms):
+                self._fell_back += 1
+                return None
+            candidates = np.flatnonzero(self._mask(user_id, min_time_ms, min_importance))
+
+            matrix = self._decode(candidates)
+            scores = matrix @ query
+            if len(candidates) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                best = np.arange(len(candidates))
+            best = best[np.argsort(-scores[best])]
+            slots = candidates[best]
+            result = {
+                "ids": [[self._ids[s] for s in slots]],
+                "documents": [[self._documents[s] for s in slots]],
+                "metadatas": [[self._metadatas[s] for s in slots]],
+                "distances": [(1.0 - scores[best]).tolist()],
+                "embeddings": [matrix[best]],
+            }
+            self._served_hot += 1
+        return result
+
+    def _decode(self, slots: np.ndarray) -> np.ndarray:
+        scales = self._scales[slots] if self._scales is not None else None
+        return decode(EncodedMatrix(self._vectors[slots], scales))
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "dtype": self.dtype,
+                "disabled": self.disabled,
+                "vectorBytes": 0 if self._vectors is None else int(
+                    self._vectors.nbytes + (0 if self._scales is None else self._scales.nbytes)
+                ),
+                "size": int(self._filled.sum()),
+                "completeSinceMs": self._complete_since_ms,
+                "servedHot": self._served_hot,
+                "fellBackToCold": self._fell_back,
+            }
@@ -0,0 +1,142 @@
+"""
+Local notification importance scoring.
+
+Scores each notification at ingest time from cheap features (VIP sender,
+urgent keywords, app category, ongoing/status notifications) so urgency
+is decided once, locally, instead of by the LLM on every query. The
+score is ``sigmoid(bias + w·x)``: the built-in weights encode the rules,
+and a logistic model trained on labelled feedback can replace them::
+
+    python importance.py train feedback.jsonl importance_model.json
+
+where each feedback line is an ingest payload plus ``"important": true|false``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import sys
+from typing import Any
+
+from config import DEFAULT_URGENT_KEYWORDS, load_settings
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+# Calls / SMS are people trying to reach the user; shopping and social feeds rarely are.
+PRIORITY_PACKAGES = (
+    "com.android.phone", "com.google.android.dialer", "com.google.android.apps.messaging",
+    "com.android.mms", "com.google.android.apps.classroom",
+)
+LOW_PRIORITY_PACKAGES = (
+    "com.amazon.mShop.android.shopping", "com.flipkart.android", "com.instagram.android",
+    "com.google.android.youtube", "com.spotify.music", "com.twitter.android",
+)
+
+DEFAULT_WEIGHTS = {
+    "bias": -1.5,
+    "vip_sender": 3.0,
+    "urgent_keyword": 2.0,
+    "priority_package": 1.5,
+    "low_priority_package": -1.5,
+    "ongoing": -2.5,
+    "question": 0.5,
+    "shouting": 0.5,
+}
+
+_WORD = re.compile(r"[A-Za-z]{3,}")
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, x))))
+
+
+class ImportanceScorer:
+    def __init__(
+        self,
+        *,
+        vip_senders: tuple[str, ...] = (),
+        urgent_keywords: tuple[str, ...] = DEFAULT_URGENT_KEYWORDS,
+        weights: dict[str, float] | None = None,
+    ):
+        self.vip_senders = tuple(s.lower() for s in vip_senders)
+        self._keywords = re.compile(
+            r"\b(" + "|".join(re.escape(k.lower()) for k in urgent_keywords) + r")\b"
+        ) if urgent_keywords else None
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+    @classmethod
+    def from_model_file(cls, path: str, **kwargs: Any) -> "ImportanceScorer":
+        with open(path, encoding="utf-8") as f:
+            weights = json.load(f)
+        logger.info("Loaded importance model from %s", path)
+        return cls(weights=weights, **kwargs)
+
+    def features(self, package_name: str, title: str, text: str, is_ongoing: bool = False) -> dict[str, float]:
+        title_l = title.lower()
+        body = f"{title} {text}"
+        words = _WORD.findall(text)
+        return {
+            "vip_sender": float(any(vip in title_l for vip in self.vip_senders)),
+            "urgent_keyword": float(bool(self._keywords and self._keywords.search(body.lower()))),
+            "priority_package": float(package_name in PRIORITY_PACKAGES),
+            "low_priority_package": float(package_name in LOW_PRIORITY_PACKAGES),
+            "ongoing": float(is_ongoing),
+            "question": float("?" in text),
+            "shouting": float(len(words) >= 2 and sum(w.isupper() for w in words) / len(words) > 0.5),
+        }
+
+    def score(self, package_name: str, title: str, text: str, is_ongoing: bool = False) -> float:
+        x = self.features(package_name, title, text, is_ongoing)
+        logit = self.weights["bias"] + sum(self.weights.get(k, 0.0) * v for k, v in x.items())
+        return round(_sigmoid(logit), 3)
+
+
+# ---------------------------------------------------------------------------
+# Training
+# ---------------------------------------------------------------------------
+def fit_logistic(
+    scorer: ImportanceScorer,
+    samples: list[dict[str, Any]],
+    *,
+    epochs: int = 500,
+    learning_rate: float = 0.1,
+    l2: float = 0.01,
+) -> dict[str, float]:
+    """Batch gradient descent on labelled payloads; returns a weights dict."""
+    rows = [
+        (scorer.features(s["packageName"], s.get("title", ""), s.get("text", ""), s.get("isOngoing", False)),
+         1.0 if s["important"] else 0.0)
+        for s in samples
+    ]
+    weights = dict(scorer.weights)
+    names = list(rows[0][0]) if rows else []
+    for _ in range(epochs):
+        grad = {name: 0.0 for name in ["bias", *names]}
+        for x, y in rows:
+            error = _sigmoid(weights["bias"] + sum(weights[n] * x[n] for n in names)) - y
+            grad["bias"] += error
+            for n in names:
+                grad[n] += error * x[n]
+        for name, g in grad.items():
+            penalty = 0.0 if name == "bias" else l2 * weights[name]
+            weights[name] -= learning_rate * (g / len(rows) + penalty)
+    return {k: round(v, 4) for k, v in weights.items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "train":
+        sys.exit("usage: python importance.py train FEEDBACK.jsonl MODEL.json")
+    settings = load_settings()
+    with open(sys.argv[2], encoding="utf-8") as f:
+        feedback = [json.loads(line) for line in f if line.strip()]
+    scorer = ImportanceScorer(
+        vip_senders=settings.importance_vip_senders,
+        urgent_keywords=settings.importance_keywords,
+    )
+    model = fit_logistic(scorer, feedback)
+    with open(sys.argv[3], "w", encoding="utf-8") as f:
+        json.dump(model, f, indent=2)
+    print(f"Trained on {len(feedback)} samples -> {sys.argv[3]}: {model}")
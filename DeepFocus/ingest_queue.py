@@ -0,0 +1,266 @@
+"""
+Durable write-behind queue for notification ingest.
+
+Validated payloads are appended to a local SQLite write-ahead table and
+acknowledged immediately; ``IngestWorker`` drains the table in batches
+into the embedding + vector pipeline. Anything still queued when the
+process dies is replayed on the next start.
+
+Outages (open breaker, timeouts, 503/504) are retried indefinitely with
+capped backoff and never count against a row. Other failures bisect the
+batch; a row that fails on its own while the rest of its batch goes
+through is charged an attempt, and after ``max_attempts`` it is moved
+to the ``dead_letter`` table rather than deleted.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from models import NotificationIngestRequest
+from resilience import CircuitOpenError
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+
+# (seq, attempts, payload) as returned by ``IngestQueue.peek_batch``
+QueuedItem = tuple[int, int, NotificationIngestRequest]
+
+TRANSIENT_STATUS_CODES = (503, 504)
+
+
+def is_transient(exc: BaseException | None) -> bool:
+    """
+    Failures that say nothing about the payload: open breaker, timeouts,
+    unavailable upstream — also when wrapped in an ``HTTPException``.
+    """
+    while exc is not None:
+        if isinstance(exc, (CircuitOpenError, TimeoutError, ConnectionError)):
+            return True
+        if getattr(exc, "status_code", None) in TRANSIENT_STATUS_CODES:
+            return True
+        exc = exc.__cause__
+    return False
+
+
+class IngestQueue:
+    """Append-only SQLite queue; rows are deleted once they are persisted downstream."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL + NORMAL survives a process crash without an fsync per append.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                seq INTEGER PRIMARY KEY,
+                enqueued_at REAL NOT NULL,
+                failed_at REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def append(self, payload: NotificationIngestRequest) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO pending (enqueued_at, payload) VALUES (?, ?)",
+                (time.time(), payload.model_dump_json()),
+            )
+        self.notify()
+        return int(cur.lastrowid)
+
+    def peek_batch(self, limit: int) -> list[QueuedItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, attempts, payload FROM pending ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            (seq, attempts, NotificationIngestRequest.model_validate_json(payload))
+            for seq, attempts, payload in rows
+        ]
+
+    def ack(self, seqs: list[int]) -> None:
+        if not seqs:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE seq = ?", [(s,) for s in seqs])
+
+    def mark_failed(self, seqs: list[int]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE pending SET attempts = attempts + 1 WHERE seq = ?",
+                [(s,) for s in seqs],
+            )
+
+    def dead_letter(self, seq: int, error: str) -> None:
+        """Move a row that keeps failing on its own out of the queue, keeping its payload."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO dead_letter (seq, enqueued_at, failed_at, attempts, error, payload)
+                SELECT seq, enqueued_at, ?, attempts, ?, payload FROM pending WHERE seq = ?
+                """,
+                (time.time(), error, seq),
+            )
+            self._conn.execute("DELETE FROM pending WHERE seq = ?", (seq,))
+            self._conn.execute("COMMIT")
+
+    def dead_letter_depth(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0])
+
+    def depth(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0])
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest queued item (0 when empty)."""
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(enqueued_at) FROM pending").fetchone()[0]
+        return 0.0 if oldest is None else max(0.0, time.time() - oldest)
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def wait_for_items(self, timeout: float) -> None:
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class IngestWorker:
+    """Background thread that drains an ``IngestQueue`` through *store_batch*."""
+
+    def __init__(
+        self,
+        name: str,
+        queue: IngestQueue,
+        store_batch: Callable[[list[NotificationIngestRequest]], Any],
+        *,
+        batch_size: int = 32,
+        idle_poll_s: float = 1.0,
+        max_attempts: int = 5,
+        pace_s: float = 0.0,
+    ):
+        self.name = name
+        self.queue = queue
+        self.store_batch = store_batch
+        self.batch_size = batch_size
+        self.idle_poll_s = idle_poll_s
+        self.max_attempts = max_attempts
+        self.pace_s = pace_s
+        self.processed = 0
+        self.failed_batches = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> None:
+        backlog = self.queue.depth()
+        if backlog:
+            logger.info("%s: replaying %d queued notifications from previous run", self.name, backlog)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self.queue.notify()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._stop.is_set():
+            batch = self.queue.peek_batch(self.batch_size)
+            if not batch:
+                self.queue.wait_for_items(self.idle_poll_s)
+                continue
+
+            stored, isolated, transient = self._store(batch)
+            if stored:
+                self.queue.ack(stored)
+                self.processed += len(stored)
+
+            # Charge attempts only when the pipeline demonstrably works for other
+            # rows; if every row fails on its own, it's an outage, not bad data.
+            if isolated and (stored or len(batch) == 1):
+                for (seq, attempts, payload), exc in isolated:
+                    self.queue.mark_failed([seq])
+                    if attempts + 1 >= self.max_attempts:
+                        logger.error(
+                            "Dead-lettering %s after %d failed attempts: %s",
+                            payload.notificationId, attempts + 1, exc,
+                        )
+                        self.queue.dead_letter(seq, repr(exc))
+
+            if transient is not None or isolated:
+                if transient is not None:
+                    logger.warning("%s: downstream unavailable (%s); retrying", self.name, transient)
+                self.failed_batches += 1
+                failures += 1
+                self._stop.wait(min(30.0, 0.5 * (2 ** min(failures, 6))))
+                continue
+
+            failures = 0
+            if self.pace_s:
+                self._stop.wait(self.pace_s)
+
+    def _store(self, batch: list[QueuedItem]) -> tuple[list[int], list[tuple[QueuedItem, Exception]], Exception | None]:
+        """
+        Persist *batch*, bisecting it on failure to isolate bad rows.
+
+        Returns the stored seqs, the rows that failed on their own, and the
+        transient error that stopped the attempt (None if it ran to the end).
+        """
+        stored: list[int] = []
+        isolated: list[tuple[QueuedItem, Exception]] = []
+        parts = [batch]
+        while parts:
+            part = parts.pop(0)
+            try:
+                self.store_batch([payload for _, _, payload in part])
+            except Exception as exc:
+                if is_transient(exc):
+                    return stored, isolated, exc
+                if len(part) == 1:
+                    isolated.append((part[0], exc))
+                else:
+                    logger.warning("Write-behind batch of %d failed (%s); bisecting", len(part), exc)
+                    middle = len(part) // 2
+                    parts[:0] = [part[:middle], part[middle:]]
+                continue
+            stored.extend(seq for seq, _, _ in part)
+        return stored, isolated, None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "depth": self.queue.depth(),
+            "lagMs": round(self.queue.lag_seconds() * 1000, 1),
+            "processed": self.processed,
+            "failedBatches": self.failed_batches,
+            "deadLettered": self.queue.dead_letter_depth(),
+        }
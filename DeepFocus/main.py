@@ -7,22 +7,48 @@ routes, CORS, and global error handlers, then exposes the ASGI app.
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-import chromadb
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from google import genai
-from pocket_tts import TTSModel
+from google.genai import types
 
+from admission import AdmissionController
+from audio_jobs import AudioJobStore
 from config import load_settings, parse_cors_origins
+from hot_tier import HotTier, SoleWriterLock
+from importance import ImportanceScorer
+from ingest_queue import IngestQueue, IngestWorker
+from resilience import CircuitBreaker, ResilientCaller
 from routes import router
-from services import AppServices
+from scheduler import INGEST, INTERACTIVE, PriorityScheduler
+from services import (
+    AppServices,
+    collection_metadata,
+    create_chroma_client,
+    embedding_fingerprint,
+    follow_collection_alias,
+    generate_and_save_wav,
+    load_thread_history,
+    preload_hot_tier,
+    read_collection_alias,
+    settings_for_fingerprint,
+    stamp_embedding_fingerprint,
+    store_notifications,
+    store_threads,
+)
+from thread_coalescing import ThreadCoalescer, ThreadJournal
+from tts_server import TTSClient, load_tts_model
+from vector_snapshot import SnapshottingCollection
+from warmup import run_warmup
+from watermarks import WatermarkStore
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -46,38 +72,234 @@ async def lifespan(app: FastAPI):
     persist_dir = Path(settings.chroma_persist_dir)
     persist_dir.mkdir(parents=True, exist_ok=True)
 
-    genai_client = genai.Client(api_key=settings.gemini_api_key)
-    chroma_client = chromadb.PersistentClient(path=str(persist_dir))
+    genai_client = genai.Client(
+        api_key=settings.gemini_api_key,
+        # Bounds the HTTP request itself, so a hedged or timed-out attempt frees its worker
+        http_options=types.HttpOptions(timeout=int(settings.gemini_timeout_s * 1000)),
+    )
+    chroma_client = create_chroma_client(settings)
+    # Follow the migration alias, if any, to the collection that is currently live,
+    # and embed the way it was built even if this environment predates the switch
+    alias = read_collection_alias(chroma_client, settings.chroma_collection_name)
+    collection_name = str(alias.get("active") or settings.chroma_collection_name)
+    settings = settings_for_fingerprint(settings, alias.get("embedding"))
     collection = chroma_client.get_or_create_collection(
-        name=settings.chroma_collection_name,
-        metadata={"hnsw:space": "cosine"},
+        name=collection_name,
+        metadata=collection_metadata(settings),
     )
+    built_with = collection.metadata or {}
+    if built_with.get("hnsw:M", settings.hnsw_m) != settings.hnsw_m:
+        logger.warning(
+            "Collection %s was built with hnsw:M=%s; HNSW_M=%d only applies to new collections",
+            collection_name, built_with.get("hnsw:M"), settings.hnsw_m,
+        )
+
+    # Snapshot mode: restore the last dump (and the fingerprint it was taken with)
+    # before checking it, then re-dump every N writes / T seconds
+    if settings.vector_store_mode == "snapshot":
+        collection = SnapshottingCollection(
+            collection,
+            str(persist_dir / f"{settings.chroma_collection_name}.snapshot.npz"),
+            every_writes=settings.snapshot_every_writes,
+            every_seconds=settings.snapshot_interval_s,
+        )
+        collection.restore()
+        collection.start()
 
-    # Pocket TTS initialisation (runs once at startup)
-    logger.info("Loading Pocket TTS model into memory... (This happens only once)")
-    tts_model = TTSModel.load_model()
+    fingerprint = embedding_fingerprint(settings)
+    built_fingerprint = stamp_embedding_fingerprint(collection, settings)
+    if built_fingerprint != fingerprint:
+        logger.warning(
+            "Collection %s holds %s vectors but settings embed with %s; run migrate_embeddings.py",
+            collection_name, built_fingerprint, fingerprint,
+        )
 
-    logger.info("Loading Pocket TTS voice profile: %s...", settings.tts_voice)
-    tts_voice_state = tts_model.get_state_for_audio_prompt("azelma")
+    # Pocket TTS initialisation (runs once at startup, or once per box in remote mode)
+    tts_model = tts_voice_state = tts_client = None
+    if settings.tts_mode == "remote":
+        logger.info("Using shared TTS model server at %s", settings.tts_socket_path)
+        tts_client = TTSClient(settings.tts_socket_path)
+    else:
+        tts_model, tts_voice_state = load_tts_model(settings)
+
+    # Shared resilience layer for every outbound Gemini call
+    # Agent queries are dispatched ahead of ingest on both Gemini and Chroma
+    scheduler_options = dict(
+        weights={
+            INTERACTIVE: settings.scheduler_interactive_weight,
+            INGEST: settings.scheduler_ingest_weight,
+        },
+        max_wait_s=settings.scheduler_max_wait_s,
+    )
+    gemini_scheduler = PriorityScheduler("gemini", workers=16, **scheduler_options)
+    vector_scheduler = PriorityScheduler("chroma", workers=4, **scheduler_options)
+    gemini_breaker = CircuitBreaker(
+        failure_threshold=settings.gemini_breaker_failure_threshold,
+        reset_timeout_s=settings.gemini_breaker_reset_s,
+    )
+    caller_options = dict(
+        timeout_s=settings.gemini_timeout_s,
+        max_retries=settings.gemini_max_retries,
+        hedge_enabled=settings.gemini_hedge_enabled,
+        hedge_min_delay_s=settings.gemini_hedge_min_delay_s,
+    )
 
-    app.state.services = AppServices(
+    services = AppServices(
         settings=settings,
         genai_client=genai_client,
         chroma_client=chroma_client,
         collection=collection,
         tts_model=tts_model,
         tts_voice_state=tts_voice_state,
+        tts_client=tts_client,
+        embed_caller=ResilientCaller("gemini-embed", gemini_breaker, gemini_scheduler, **caller_options),
+        llm_caller=ResilientCaller("gemini-llm", gemini_breaker, gemini_scheduler, **caller_options),
+        llm_light_caller=(
+            ResilientCaller("gemini-llm-light", gemini_breaker, gemini_scheduler, **caller_options)
+            if settings.gemini_llm_light_model
+            else None
+        ),
+        gemini_scheduler=gemini_scheduler,
+        vector_scheduler=vector_scheduler,
+    )
+    app.state.services = services
+
+    # "Since last asked" watermarks, persisted so they survive restarts
+    services.watermarks = WatermarkStore(settings.watermark_db_path)
+
+    # Every process on this persist dir registers, so a hot tier can tell it isn't alone
+    writers = SoleWriterLock(settings.chroma_persist_dir) if settings.vector_store_mode != "server" else None
+
+    # Hot tier: recent notifications in memory, Chroma only for older windows
+    workers = int(os.getenv("WORKERS", "1"))
+    if settings.hot_tier_capacity and settings.vector_store_mode == "server":
+        logger.warning("Hot tier disabled with VECTOR_STORE_MODE=server: other clients write the collection")
+    elif settings.hot_tier_capacity and workers > 1:
+        logger.warning("Hot tier disabled with WORKERS=%d: each worker would only see its own ingest", workers)
+    elif settings.hot_tier_capacity:
+        services.hot_tier = HotTier(settings.hot_tier_capacity, settings.hot_tier_dtype, writers)
+        # Shards would each need a scan; with sharding the tier fills from startup instead
+        if settings.hot_tier_preload_minutes and not settings.chroma_shard_by_user:
+            await asyncio.to_thread(preload_hot_tier, services)
+
+    # Background TTS so text can be returned before the audio is ready
+    services.audio_jobs = AudioJobStore(
+        lambda text, path: generate_and_save_wav(text, services, path),
+        output_dir=settings.audio_output_dir,
+        ttl_s=settings.audio_job_ttl_s,
     )
 
+    # Local importance scoring at ingest; agent queries filter / boost on it
+    if settings.importance_scoring:
+        scorer_options = dict(
+            vip_senders=settings.importance_vip_senders,
+            urgent_keywords=settings.importance_keywords,
+        )
+        if settings.importance_model_path:
+            services.importance = ImportanceScorer.from_model_file(settings.importance_model_path, **scorer_options)
+        else:
+            services.importance = ImportanceScorer(**scorer_options)
+
+    # Thread coalescing: one rolling, debounced document per conversation
+    if settings.thread_coalescing:
+        services.threads = ThreadCoalescer(
+            lambda threads: load_thread_history(services, threads),
+            lambda threads: store_threads(services, threads),
+            journal=ThreadJournal(settings.thread_journal_path),
+            packages=settings.thread_packages,
+            window=settings.thread_window,
+            debounce_s=settings.thread_debounce_s,
+            max_delay_s=settings.thread_max_delay_s,
+        )
+        services.threads.start()
+
+    # Write-behind ingest: drain (and replay) the durable queue in the background
+    if settings.ingest_mode == "write_behind":
+        services.ingest_worker = IngestWorker(
+            "ingest-worker",
+            IngestQueue(settings.ingest_queue_path),
+            lambda batch: store_notifications(services, batch),
+            batch_size=settings.ingest_batch_size,
+        )
+        services.ingest_worker.start()
+
+    # Admission control: over-quota notifications are embedded later, slowly
+    if settings.admission_control:
+        services.admission = AdmissionController(
+            app_rate=settings.admission_app_rate,
+            app_burst=settings.admission_app_burst,
+            user_rate=settings.admission_user_rate,
+            user_burst=settings.admission_user_burst,
+            exempt_packages=settings.admission_exempt_packages,
+        )
+        services.deferred_worker = IngestWorker(
+            "deferred-ingest-worker",
+            IngestQueue(settings.deferred_queue_path),
+            lambda batch: store_notifications(services, batch),
+            batch_size=8,
+            pace_s=2.0,
+        )
+        services.deferred_worker.start()
+
+    # Warm-up: absorb TLS / lazy-init / first-inference cost before real traffic
+    async def warm_up() -> None:
+        try:
+            services.warmup_report = await asyncio.wait_for(
+                asyncio.to_thread(run_warmup, services),
+                timeout=settings.warmup_timeout_s,
+            )
+        except asyncio.TimeoutError:
+            # Don't hold readiness hostage; the first requests pay the cold cost instead
+            logger.warning("Warm-up did not finish within %.0fs; continuing", settings.warmup_timeout_s)
+            services.warmup_report = {"error": "timed out"}
+
+    if settings.warmup_mode == "blocking":
+        await warm_up()
+    elif settings.warmup_mode == "background":
+        app.state.warmup_task = asyncio.create_task(warm_up())
+
+    # Pick up a migration's alias switch without a restart (snapshot mode is never migrated live)
+    async def follow_alias() -> None:
+        while True:
+            await asyncio.sleep(settings.collection_alias_refresh_s)
+            try:
+                await asyncio.to_thread(follow_collection_alias, services)
+            except Exception:
+                logger.exception("Collection alias refresh failed")
+
+    if settings.vector_store_mode != "snapshot" and settings.collection_alias_refresh_s > 0:
+        app.state.alias_task = asyncio.create_task(follow_alias())
+
     logger.info(
-        "Startup complete | collection=%s | persist_dir=%s",
-        settings.chroma_collection_name,
+        "Startup complete | collection=%s | persist_dir=%s | vector_store=%s | ingest_mode=%s",
+        collection_name,
         settings.chroma_persist_dir,
+        settings.vector_store_mode,
+        settings.ingest_mode,
     )
 
     try:
         yield
     finally:
+        for name in ("warmup_task", "alias_task"):
+            task = getattr(app.state, name, None)
+            if task is not None and not task.done():
+                task.cancel()
+        for worker in (services.ingest_worker, services.deferred_worker):
+            if worker is not None:
+                worker.stop()
+                worker.queue.close()
+        if services.threads is not None:
+            services.threads.stop()
+        # After the workers so their final upserts land in the last snapshot
+        if isinstance(collection, SnapshottingCollection):
+            collection.stop()
+        services.audio_jobs.shutdown()
+        if writers is not None:
+            writers.close()
+        services.watermarks.close()
+        gemini_scheduler.shutdown(wait=False, cancel_futures=True)
+        vector_scheduler.shutdown(wait=False, cancel_futures=True)
         close_fn = getattr(genai_client, "close", None)
         if callable(close_fn):
             close_fn()
@@ -90,6 +312,7 @@ app = FastAPI(
     title="ChronoForge Screenless Deep Focus API",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -134,9 +357,12 @@ async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONR
 if __name__ == "__main__":
     import uvicorn
 
+    # WORKERS > 1 pairs with TTS_MODE=remote so the model is loaded once per box
+    workers = int(os.getenv("WORKERS", "1"))
     uvicorn.run(
         "main:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=int(os.getenv("PORT", "8000")),
-        reload=True,
+        reload=workers == 1,
+        workers=workers,
     )
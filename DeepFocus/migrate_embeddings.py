@@ -0,0 +1,504 @@
+"""
+Resumable re-embedding migration for the DeepFocus notification collection.
+
+Run it with the *new* ``GEMINI_EMBEDDING_MODEL`` / ``EMBEDDING_DIMENSIONALITY``
+in the environment. Stored documents are paged out of the live collection,
+re-embedded in rate-limited batches and upserted into a shadow collection
+named after the new model; progress is checkpointed so an interrupted run
+picks up where it stopped. Once every shadow has caught up, the collection
+aliases are repointed in one metadata write each — per-user shards first,
+the shared collection last — and the workers follow within
+``COLLECTION_ALIAS_REFRESH_SECONDS`` (see ``services.follow_collection_alias``),
+switching their query embeddings to the fingerprint stored on the alias.
+No restart is needed; the old collection keeps serving until then.
+
+    python migrate_embeddings.py                 # migrate and switch over
+    python migrate_embeddings.py --all-shards    # plus every per-user shard (implied by CHROMA_SHARD_BY_USER)
+    python migrate_embeddings.py --finalize      # once workers switched: copy stragglers, drop the old index
+
+Collections record the fingerprint they were embedded with; ones that
+predate it are stamped by the server on its first start, assuming the
+settings it runs with. Restart once on this version *before* changing
+the model, or the stamp will claim the new model for old vectors.
+
+With ``VECTOR_STORE_MODE=server`` the tool talks to the Chroma server
+directly. In persistent mode a second ``PersistentClient`` on a directory
+the server holds open can corrupt the index, so the tool hands the job to
+the running server (``POST /api/v1/admin/embedding-migration``), which
+migrates through its own client; ``--offline`` opens the directory
+directly and is only for when DeepFocus is stopped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+from google import genai
+from google.genai import types
+
+from config import Settings, load_settings, normalize_model_name
+from resilience import CircuitBreaker, ResilientCaller
+from services import (
+    collection_metadata,
+    create_chroma_client,
+    embedding_config,
+    embedding_fingerprint,
+    extract_embedding_vectors,
+    normalize_rows,
+    resolve_collection_name,
+    set_collection_alias,
+)
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+# Gemini accepts at most 100 contents per embed_content call
+MAX_BATCH = 100
+
+Embedder = Callable[[list[str], str], np.ndarray]
+
+
+def shadow_collection_name(name: str, settings: Settings) -> str:
+    digest = hashlib.sha1(embedding_fingerprint(settings).encode("utf-8")).hexdigest()[:8]
+    return f"{name}__v{digest}"
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval_s = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval_s
+        if delay > 0:
+            time.sleep(delay)
+
+
+def make_embedder(settings: Settings, rate: float) -> Embedder:
+    """``embed(texts, title)`` with the same config ``services.embed_texts`` uses at ingest."""
+    client = genai.Client(
+        api_key=settings.gemini_api_key,
+        # Bounds the HTTP request itself, so a hedged or timed-out attempt frees its worker
+        http_options=types.HttpOptions(timeout=int(settings.gemini_timeout_s * 1000)),
+    )
+    caller = ResilientCaller(
+        "gemini-embed-migration",
+        CircuitBreaker(
+            failure_threshold=settings.gemini_breaker_failure_threshold,
+            reset_timeout_s=settings.gemini_breaker_reset_s,
+        ),
+        ThreadPoolExecutor(max_workers=2, thread_name_prefix="migrate"),
+        timeout_s=settings.gemini_timeout_s,
+        max_retries=settings.gemini_max_retries,
+        hedge_enabled=False,
+    )
+    limiter = RateLimiter(rate)
+    model = normalize_model_name(settings.gemini_embedding_model)
+
+    def embed(texts: list[str], title: str) -> np.ndarray:
+        limiter.wait()
+        response = caller.call(
+            client.models.embed_content,
+            model=model,
+            contents=texts,
+            config=embedding_config(settings, "RETRIEVAL_DOCUMENT", title),
+        )
+        vectors = extract_embedding_vectors(response)
+        if len(vectors) != len(texts):
+            raise RuntimeError(f"expected {len(texts)} vectors, got {len(vectors)}")
+        if settings.embedding_dimensionality is not None:
+            vectors = normalize_rows(vectors)
+        return vectors
+
+    return embed
+
+
+# ---------------------------------------------------------------------------
+# Checkpoints
+# ---------------------------------------------------------------------------
+def load_checkpoint(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: Path, state: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ---------------------------------------------------------------------------
+# Copying
+# ---------------------------------------------------------------------------
+def reembed_into(
+    shadow: Any,
+    embed: Embedder,
+    ids: list[str],
+    documents: list[str],
+    metadatas: list[dict[str, Any]],
+    batch_size: int,
+) -> None:
+    """Re-embed one page, grouped by app like ingest does, and upsert it into *shadow*."""
+    by_app: dict[str, list[int]] = {}
+    for i, metadata in enumerate(metadatas):
+        by_app.setdefault((metadata or {}).get("appName", ""), []).append(i)
+
+    for app_name, indices in by_app.items():
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            vectors = embed([documents[i] for i in chunk], app_name)
+            shadow.upsert(
+                ids=[ids[i] for i in chunk],
+                documents=[documents[i] for i in chunk],
+                metadatas=[metadatas[i] for i in chunk],
+                embeddings=vectors.tolist(),
+            )
+
+
+def copy_pages(
+    source: Any,
+    shadow: Any,
+    embed: Embedder,
+    state: dict[str, Any],
+    checkpoint_path: Path,
+    *,
+    page_size: int,
+    batch_size: int,
+) -> None:
+    """Bulk pass: page through *source* from the checkpointed offset."""
+    while True:
+        page = source.get(
+            include=["documents", "metadatas"],
+            limit=page_size,
+            offset=state["offset"],
+        )
+        if not page["ids"]:
+            return
+        reembed_into(shadow, embed, page["ids"], page["documents"], page["metadatas"], batch_size)
+        state["offset"] += len(page["ids"])
+        state["copied"] += len(page["ids"])
+        save_checkpoint(checkpoint_path, state)
+        logger.info("%s: %d documents re-embedded", state["shadow"], state["copied"])
+
+
+def catch_up(source: Any, shadow: Any, embed: Embedder, *, page_size: int, batch_size: int) -> int:
+    """
+    Copy documents the shadow is missing or holds a different version of.
+
+    Covers writes that landed behind the bulk pass's offset, notifications
+    Android re-posted under the same ID and threads that gained messages
+    after being copied. Rows are compared by document and metadata, not by
+    ``time`` alone: a re-posted notification can keep its timestamp.
+    """
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return copied
+        offset += len(page["ids"])
+
+        existing = shadow.get(ids=page["ids"], include=["documents", "metadatas"])
+        shadow_rows = {
+            doc_id: (document, metadata or {})
+            for doc_id, document, metadata in zip(existing["ids"], existing["documents"], existing["metadatas"])
+        }
+        stale = [
+            i for i, (doc_id, document, metadata) in enumerate(zip(page["ids"], page["documents"], page["metadatas"]))
+            if shadow_rows.get(doc_id) != (document, metadata or {})
+        ]
+        if stale:
+            reembed_into(
+                shadow,
+                embed,
+                [page["ids"][i] for i in stale],
+                [page["documents"][i] for i in stale],
+                [page["metadatas"][i] for i in stale],
+                batch_size,
+            )
+            copied += len(stale)
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+def migrate(
+    chroma_client: Any,
+    name: str,
+    settings: Settings,
+    embed: Embedder,
+    checkpoint_dir: Path,
+    *,
+    page_size: int,
+    batch_size: int,
+) -> dict[str, Any] | None:
+    """Fill (or resume) *name*'s shadow collection; the checkpoint state once it is ready to serve."""
+    source_name = resolve_collection_name(chroma_client, name)
+    shadow_name = shadow_collection_name(name, settings)
+    fingerprint = embedding_fingerprint(settings)
+    source = chroma_client.get_collection(source_name)
+    # A missing fingerprint proves nothing here: the environment already has the new model
+    if source_name == shadow_name or (source.metadata or {}).get("embedding") == fingerprint:
+        print(f"✅ {name} already serves {fingerprint} ({source_name})")
+        return None
+
+    checkpoint_path = checkpoint_dir / f"{shadow_name}.json"
+    state = load_checkpoint(checkpoint_path)
+    if state is None or state["source"] != source_name:
+        state = {
+            "collection": name,
+            "source": source_name,
+            "shadow": shadow_name,
+            "embedding": fingerprint,
+            "offset": 0,
+            "copied": 0,
+            "switched": False,
+        }
+    elif state["offset"]:
+        print(f"↪️  Resuming {name} at document {state['offset']}")
+
+    shadow = chroma_client.get_or_create_collection(name=shadow_name, metadata=collection_metadata(settings))
+
+    started = time.perf_counter()
+    copy_pages(source, shadow, embed, state, checkpoint_path, page_size=page_size, batch_size=batch_size)
+    caught_up = catch_up(source, shadow, embed, page_size=page_size, batch_size=batch_size)
+    print(
+        f"✅ {name}: {state['copied'] + caught_up} documents re-embedded into {shadow_name} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return state
+
+
+def switch_over(chroma_client: Any, state: dict[str, Any], checkpoint_dir: Path) -> None:
+    """Repoint the alias; workers move to the shadow on their next alias refresh."""
+    set_collection_alias(chroma_client, state["collection"], state["shadow"], state["embedding"])
+    state["switched"] = True
+    state["switched_at"] = time.time()
+    save_checkpoint(checkpoint_dir / f"{state['shadow']}.json", state)
+    print(f"🔀 {state['collection']} now served by {state['shadow']} ({state['embedding']})")
+
+
+def finalize(
+    chroma_client: Any,
+    name: str,
+    settings: Settings,
+    embed: Embedder,
+    checkpoint_dir: Path,
+    *,
+    page_size: int,
+    batch_size: int,
+    force: bool = False,
+) -> None:
+    """Copy writes that workers made before following the switch, then drop the old collection."""
+    shadow_name = shadow_collection_name(name, settings)
+    checkpoint_path = checkpoint_dir / f"{shadow_name}.json"
+    state = load_checkpoint(checkpoint_path)
+    if state is None or not state["switched"]:
+        print(f"⚠️  {name}: no completed migration to {shadow_name}; run without --finalize first")
+        return
+    # Every worker must have followed the alias, or it keeps writing to the collection dropped here
+    settle_s = 2 * settings.collection_alias_refresh_s
+    waited_s = time.time() - state.get("switched_at", 0)
+    if not force and (settings.collection_alias_refresh_s <= 0 or waited_s < settle_s):
+        print(
+            f"⚠️  {name}: switched {waited_s:.0f}s ago; wait {settle_s:.0f}s for every worker to follow "
+            "the alias (or, with COLLECTION_ALIAS_REFRESH_SECONDS=0, restart them and pass --force)"
+        )
+        return
+
+    source = chroma_client.get_collection(state["source"])
+    shadow = chroma_client.get_collection(shadow_name)
+    caught_up = catch_up(source, shadow, embed, page_size=page_size, batch_size=batch_size)
+    chroma_client.delete_collection(state["source"])
+    checkpoint_path.unlink()
+    print(f"✅ {name}: {caught_up} late documents copied; dropped {state['source']}")
+
+
+def run_migration(
+    chroma_client: Any,
+    settings: Settings,
+    embed: Embedder,
+    checkpoint_dir: Path,
+    *,
+    all_shards: bool,
+    finalize_only: bool = False,
+    force: bool = False,
+    page_size: int = 500,
+    batch_size: int = MAX_BATCH,
+) -> None:
+    """
+    Migrate (or finalize) the shared collection and, when sharded, every shard.
+
+    Every shadow is filled before any alias moves, and the shared collection
+    is switched last, so a worker never embeds queries for the new space
+    while a collection it reads is still in the old one for long.
+    """
+    base_name = settings.chroma_collection_name
+    shards = shard_names(chroma_client, base_name) if all_shards or settings.chroma_shard_by_user else []
+    names = [*shards, base_name]
+    options = dict(page_size=page_size, batch_size=min(batch_size, MAX_BATCH))
+
+    if finalize_only:
+        for name in names:
+            finalize(chroma_client, name, settings, embed, checkpoint_dir, force=force, **options)
+        return
+
+    ready = [migrate(chroma_client, name, settings, embed, checkpoint_dir, **options) for name in names]
+    ready = [state for state in ready if state is not None]
+    for state in ready:
+        # Rows written since this shadow caught up, e.g. while later shards were copied
+        catch_up(
+            chroma_client.get_collection(state["source"]),
+            chroma_client.get_collection(state["shadow"]),
+            embed,
+            **options,
+        )
+        switch_over(chroma_client, state, checkpoint_dir)
+    if ready:
+        print(
+            f"   Workers follow within {settings.collection_alias_refresh_s:.0f}s "
+            "(COLLECTION_ALIAS_REFRESH_SECONDS); then run with --finalize"
+        )
+
+
+class EmbeddingMigrationJob:
+    """``run_migration`` on a background thread of the server (persistent mode)."""
+
+    def __init__(self):
+        self.status = "idle"
+        self.error: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self, work: Callable[[], None]) -> bool:
+        """Run *work* unless a migration is already running."""
+        with self._lock:
+            if self.status == "running":
+                return False
+            self.status, self.error = "running", None
+            self.started_at, self.finished_at = time.time(), None
+            self._thread = threading.Thread(target=self._run, args=(work,), name="embedding-migration", daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, work: Callable[[], None]) -> None:
+        try:
+            work()
+        except Exception as exc:
+            logger.exception("Embedding migration failed")
+            status, error = "failed", str(exc)
+        else:
+            status, error = "done", None
+        with self._lock:
+            self.status, self.error, self.finished_at = status, error, time.time()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "error": self.error,
+                "startedAt": self.started_at,
+                "finishedAt": self.finished_at,
+            }
+
+
+def shard_names(chroma_client: Any, base_name: str) -> list[str]:
+    """
+    Logical per-user shard names. A migrated shard may only exist as its
+    ``__alias`` and ``__v…`` shadow (the original is dropped by --finalize),
+    so names are reduced to the part before ``__``; ``migrate`` then
+    resolves each alias to decide whether the shard is already current.
+    """
+    names = [getattr(c, "name", c) for c in chroma_client.list_collections()]
+    return sorted({n.split("__", 1)[0] for n in names if n.startswith(f"{base_name}_u_")})
+
+
+def hand_to_server(server: str, settings: Settings, args: argparse.Namespace) -> None:
+    """Persistent mode: ask the running DeepFocus server to migrate through its own client."""
+    body = {
+        "model": settings.gemini_embedding_model,
+        "dimensionality": settings.embedding_dimensionality,
+        "allShards": args.all_shards,
+        "finalize": args.finalize,
+        "force": args.force,
+        "rate": args.rate,
+    }
+    request = urllib.request.Request(
+        f"{server.rstrip('/')}/api/v1/admin/embedding-migration",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        print(f"📨 {server}: {response.read().decode('utf-8')}")
+    print(f"   Follow progress with GET {server.rstrip('/')}/api/v1/admin/embedding-migration")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", help="logical collection name (default: CHROMA_COLLECTION_NAME)")
+    parser.add_argument("--all-shards", action="store_true", help="also migrate every per-user shard")
+    parser.add_argument("--finalize", action="store_true", help="after workers switched: copy stragglers, drop old")
+    parser.add_argument("--force", action="store_true", help="finalize without waiting for workers to follow")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH)
+    parser.add_argument("--rate", type=float, default=2.0, help="max embed calls per second (0 = unlimited)")
+    parser.add_argument("--checkpoint-dir", help="default: CHROMA_PERSIST_DIR/migrations")
+    parser.add_argument(
+        "--server",
+        default=f"http://127.0.0.1:{os.getenv('PORT', '8000')}",
+        help="persistent mode: the DeepFocus server to hand the migration to",
+    )
+    parser.add_argument("--offline", action="store_true", help="persistent mode with DeepFocus stopped: open the dir")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    settings = load_settings()
+    if args.collection:
+        settings = replace(settings, chroma_collection_name=args.collection)
+    if not settings.gemini_api_key:
+        raise RuntimeError("GEMINI_API_KEY is required")
+    if settings.vector_store_mode == "snapshot":
+        raise RuntimeError("Snapshot mode keeps vectors in-process; stop the server and migrate in persistent mode")
+    if settings.vector_store_mode == "persistent" and not args.offline:
+        hand_to_server(args.server, settings, args)
+        return
+
+    run_migration(
+        create_chroma_client(settings),
+        settings,
+        make_embedder(settings, args.rate),
+        Path(args.checkpoint_dir or Path(settings.chroma_persist_dir) / "migrations"),
+        all_shards=args.all_shards,
+        finalize_only=args.finalize,
+        force=args.force,
+        page_size=args.page_size,
+        batch_size=args.batch_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
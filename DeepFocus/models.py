@@ -2,6 +2,8 @@
 Pydantic request / response models for the DeepFocus API.
 """
 
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
@@ -15,6 +17,7 @@ class NotificationIngestRequest(BaseModel):
     time: int = Field(..., description="Unix epoch time in milliseconds")
     notificationId: str = Field(..., min_length=1, max_length=256)
     isOngoing: bool = Field(default=False)
+    userId: str | None = Field(default=None, min_length=1, max_length=256)
 
     @field_validator("time")
     @classmethod
@@ -29,8 +32,33 @@ class AgentQueryRequest(BaseModel):
 
     query: str = Field(..., min_length=1, max_length=2000)
     topK: int | None = Field(default=None, ge=1, le=20)
+    # Selects the user's shard when CHROMA_SHARD_BY_USER is on
+    userId: str | None = Field(default=None, min_length=1, max_length=256)
+    # Only consider notifications scored at least this important (defaults to IMPORTANCE_MIN)
+    minImportance: float | None = Field(default=None, ge=0.0, le=1.0)
+    # Only notifications newer than the last successful answer for this userId
+    sinceLastAsked: bool = Field(default=False)
+    # Only notifications from the last N minutes (answered from the hot tier when it reaches back that far)
+    withinMinutes: int | None = Field(default=None, ge=1, le=7 * 24 * 60)
+    # "audio" streams the .wav back; "json" returns text now and an audio job to fetch
+    responseMode: Literal["audio", "json"] = Field(default="audio")
 
 
 class AgentQueryResponse(BaseModel):
     response: str
     matchedNotifications: int
+    audioJobId: str | None = None
+    audioUrl: str | None = None
+
+
+class EmbeddingMigrationRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # The embedding settings to migrate to (GEMINI_EMBEDDING_MODEL / EMBEDDING_DIMENSIONALITY)
+    model: str = Field(..., min_length=1, max_length=256)
+    dimensionality: int | None = Field(default=None, ge=128, le=3072)
+    allShards: bool = Field(default=False)
+    # Drop the old collections once every worker has followed the switch
+    finalize: bool = Field(default=False)
+    force: bool = Field(default=False)
+    rate: float = Field(default=2.0, ge=0.0, le=100.0)
@@ -0,0 +1,272 @@
+"""
+Resilience primitives for outbound Gemini calls.
+
+Provides a rolling latency tracker, a circuit breaker, and a
+``ResilientCaller`` that wraps a blocking call with per-attempt
+deadlines, a hedged second request, and jittered retries.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is short-circuited because the upstream is unhealthy."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when an attempt does not finish within its deadline."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Client-side errors (4xx other than 429) will not succeed on retry."""
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and 400 <= code < 500 and code != 429:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Latency Tracking
+# ---------------------------------------------------------------------------
+class LatencyTracker:
+    """Fixed-size window of recent successful call latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+# ---------------------------------------------------------------------------
+# Circuit Breaker
+# ---------------------------------------------------------------------------
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    Opens after ``failure_threshold`` consecutive failures and lets a single
+    probe through once ``reset_timeout_s`` has elapsed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout_s:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened after %d failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict[str, Any]:
+        state = self.state
+        with self._lock:
+            failures = self._failures
+        return {"state": state, "consecutiveFailures": failures}
+
+
+# ---------------------------------------------------------------------------
+# Resilient Caller
+# ---------------------------------------------------------------------------
+class ResilientCaller:
+    """
+    Runs a blocking callable with deadlines, hedging, retries and a breaker.
+
+    Each attempt gets ``timeout_s`` to finish, counted from when the executor
+    starts running it rather than from when it was queued. If hedging is enabled and the
+    first request has not returned after the observed p95 latency (floored at
+    ``hedge_min_delay_s``), a duplicate request is fired and whichever
+    finishes first wins. Failed attempts are retried up to ``max_retries``
+    times with full-jitter exponential backoff.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        executor: Executor,
+        *,
+        timeout_s: float = 10.0,
+        max_retries: int = 2,
+        hedge_enabled: bool = True,
+        hedge_min_delay_s: float = 0.25,
+        hedge_quantile: float = 0.95,
+        backoff_base_s: float = 0.2,
+        backoff_max_s: float = 2.0,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.executor = executor
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self.hedge_quantile = hedge_quantile
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.latency = LatencyTracker()
+        self.hedges_fired = 0
+        self._lock = threading.Lock()  # guards the counters above
+
+    def hedge_delay(self) -> float:
+        observed = self.latency.quantile(self.hedge_quantile)
+        if observed is None:
+            return max(self.hedge_min_delay_s, self.timeout_s / 2)
+        return max(self.hedge_min_delay_s, observed)
+
+    def _attempt(self, fn: Callable[[], Any]) -> Any:
+        started_at: list[float] = []
+        started = threading.Event()
+
+        def run() -> Any:
+            started_at.append(time.monotonic())
+            started.set()
+            return fn()
+
+        first = self.executor.submit(run)
+        pending: set[Future] = {first}
+        try:
+            # The deadline covers the call, not its wait in the executor's queue
+            while not started.wait(0.05):
+                if first.done():
+                    break
+            began = started_at[0] if started_at else time.monotonic()
+            deadline = began + self.timeout_s
+
+            if self.hedge_enabled:
+                hedge_at = began + min(self.hedge_delay(), self.timeout_s)
+                done, _ = wait(pending, timeout=max(0.0, hedge_at - time.monotonic()))
+                if not done:
+                    with self._lock:
+                        self.hedges_fired += 1
+                    logger.debug("%s: firing hedged request", self.name)
+                    pending.add(self.executor.submit(run))
+
+            last_exc: BaseException | None = None
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    exc = future.exception()
+                    if exc is None:
+                        self.latency.record(time.monotonic() - began)
+                        return future.result()
+                    last_exc = exc
+        finally:
+            # Drop the loser / timed-out request if it is still queued; one already
+            # running is bounded by the client's own HTTP timeout
+            for future in pending:
+                future.cancel()
+
+        if pending:
+            raise DeadlineExceededError(f"{self.name} exceeded {self.timeout_s:.1f}s deadline")
+        assert last_exc is not None
+        raise last_exc
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.name} short-circuited: upstream unhealthy")
+
+        bound = lambda: fn(*args, **kwargs)  # noqa: E731
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self._attempt(bound)
+            except Exception as exc:
+                if not is_retryable(exc):
+                    # The upstream answered; it is healthy even if our request was bad.
+                    self.breaker.record_success()
+                    raise
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                backoff = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+                logger.warning(
+                    "%s attempt %d failed (%s); retrying in %.2fs",
+                    self.name, attempt + 1, exc, backoff,
+                )
+                time.sleep(backoff)
+            else:
+                self.breaker.record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            hedges_fired = self.hedges_fired
+        return {
+            "p50Ms": _to_ms(self.latency.quantile(0.5)),
+            "p95Ms": _to_ms(self.latency.quantile(0.95)),
+            "samples": len(self.latency),
+            "hedgesFired": hedges_fired,
+            "breaker": self.breaker.snapshot(),
+        }
+
+
+def _to_ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
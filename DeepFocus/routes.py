@@ -4,27 +4,54 @@ FastAPI route handlers for the DeepFocus API.
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
 
-from fastapi import APIRouter, HTTPException, Request, status
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+import orjson
 from fastapi.responses import FileResponse
+from pydantic import ValidationError
 from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-from config import MISSED_CALL_PATTERN
-from models import NotificationIngestRequest, AgentQueryRequest
+from config import FALLBACK_RESPONSE
+from context_packing import (
+    RetrievedRow,
+    boost_by_importance,
+    format_row,
+    pack_context,
+    row_time,
+    rows_from_get_result,
+    rows_from_query_result,
+)
+from hot_tier import ALL_USERS
+from migrate_embeddings import EmbeddingMigrationJob, make_embedder, run_migration
+from models import NotificationIngestRequest, AgentQueryRequest, AgentQueryResponse, EmbeddingMigrationRequest
+from scheduler import INTERACTIVE, priority_class
 from services import (
     AppServices,
-    epoch_ms_to_utc_string,
-    format_notification_document,
+    collection_for,
     embed_text,
+    enqueue_notification,
+    follow_collection_alias,
+    gemini_available,
     generate_voice_response,
     generate_and_save_wav,
+    llm_tier_stats_snapshot,
+    missed_call_announcement,
+    store_notification,
 )
+from wire import NegotiatedResponse, NegotiatedRoute, prefers_minimal
+from vector_snapshot import SnapshottingCollection
 
 logger = logging.getLogger("chronoforge-screenless-focus")
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 # ---------------------------------------------------------------------------
@@ -35,160 +62,509 @@ def healthz() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@router.get("/readyz")
+def readyz(request: Request):
+    services: AppServices = request.app.state.services
+    if services.settings.warmup_mode != "off" and services.warmup_report is None:
+        return NegotiatedResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming_up"},
+        )
+    return {"status": "ready"}
+
+
 # ---------------------------------------------------------------------------
-# Notification Ingest
+# Metrics
 # ---------------------------------------------------------------------------
-@router.post("/api/v1/notifications/ingest", status_code=status.HTTP_201_CREATED)
-def ingest_notification(payload: NotificationIngestRequest, request: Request):
+@router.get("/api/v1/metrics")
+def metrics(request: Request) -> dict:
     services: AppServices = request.app.state.services
+    snapshot: dict = {
+        "gemini": {
+            "embed": services.embed_caller.snapshot(),
+            "llm": services.llm_caller.snapshot(),
+            "llmTiers": llm_tier_stats_snapshot(services),
+        },
+    }
+    if services.llm_light_caller is not None:
+        snapshot["gemini"]["llmLight"] = services.llm_light_caller.snapshot()
+    if services.warmup_report is not None:
+        snapshot["warmup"] = services.warmup_report
+    if services.ingest_worker is not None:
+        snapshot["ingestQueue"] = services.ingest_worker.snapshot()
+    if services.admission is not None:
+        snapshot["admission"] = services.admission.snapshot()
+        snapshot["deferredQueue"] = services.deferred_worker.snapshot()
+    if services.threads is not None:
+        snapshot["threads"] = services.threads.snapshot()
+    if services.hot_tier is not None:
+        snapshot["hotTier"] = services.hot_tier.snapshot()
+    if isinstance(services.collection, SnapshottingCollection):
+        snapshot["vectorSnapshot"] = services.collection.stats()
+    snapshot["scheduler"] = {
+        "gemini": services.gemini_scheduler.snapshot(),
+        "chroma": services.vector_scheduler.snapshot(),
+    }
+    return snapshot
 
-    # --- Missed-call interception: generate TTS audio, skip DB ---
-    if MISSED_CALL_PATTERN.search(payload.title):
-        caller = payload.text.strip() or "an unknown caller"
-        tts_text = f"You received a missed call from {caller}"
-        logger.info(
-            "Missed call detected — generating TTS instead of ingesting. Caller: %s",
-            caller,
-        )
 
-        wav_filepath = generate_and_save_wav(tts_text, services)
-        if not wav_filepath or not os.path.exists(wav_filepath):
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate missed-call audio",
-            )
+# ---------------------------------------------------------------------------
+# Embedding Migration (runs inside the server, through its own Chroma client)
+# ---------------------------------------------------------------------------
+@router.post("/api/v1/admin/embedding-migration", status_code=status.HTTP_202_ACCEPTED)
+def start_embedding_migration(payload: EmbeddingMigrationRequest, request: Request):
+    services: AppServices = request.app.state.services
+    settings = services.settings
+    if settings.vector_store_mode == "snapshot":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Snapshot mode keeps vectors in-process; stop the server and migrate in persistent mode",
+        )
+    target = replace(
+        settings,
+        gemini_embedding_model=payload.model,
+        embedding_dimensionality=payload.dimensionality,
+    )
 
-        return FileResponse(
-            path=wav_filepath,
-            media_type="audio/wav",
-            filename="missed_call.wav",
-            background=BackgroundTask(os.remove, wav_filepath),
-            headers={
-                "X-Response-Text": tts_text,
-                "X-Missed-Call": "true",
-            },
+    def work() -> None:
+        run_migration(
+            services.chroma_client,
+            target,
+            make_embedder(target, payload.rate),
+            Path(settings.chroma_persist_dir) / "migrations",
+            all_shards=payload.allShards,
+            finalize_only=payload.finalize,
+            force=payload.force,
         )
+        # This worker moves now; the others on their next alias refresh
+        follow_collection_alias(services)
 
-    # --- Missed-call interception from WhatsApp: generate TTS audio, skip DB ---
-    if MISSED_CALL_PATTERN.search(payload.text):
-        caller = payload.title.strip() or "an unknown caller"
-        tts_text = f"You received a missed call from {caller}"
-        logger.info(
-            "Missed call detected — generating TTS instead of ingesting. Caller: %s",
-            caller,
+    if services.embedding_migration is None:
+        services.embedding_migration = EmbeddingMigrationJob()
+    if not services.embedding_migration.start(work):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An embedding migration is already running",
         )
+    return services.embedding_migration.snapshot()
+
+
+@router.get("/api/v1/admin/embedding-migration")
+def embedding_migration_status(request: Request) -> dict:
+    """Status of the migration started on *this* worker."""
+    services: AppServices = request.app.state.services
+    if services.embedding_migration is None:
+        return {"status": "idle"}
+    return services.embedding_migration.snapshot()
 
-        wav_filepath = generate_and_save_wav(tts_text, services)
-        if not wav_filepath or not os.path.exists(wav_filepath):
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate missed-call audio",
-            )
 
-        return FileResponse(
-            path=wav_filepath,
-            media_type="audio/wav",
-            filename="missed_call.wav",
-            background=BackgroundTask(os.remove, wav_filepath),
-            headers={
-                "X-Response-Text": tts_text,
-                "X-Missed-Call": "true",
-            },
+# ---------------------------------------------------------------------------
+# Notification Ingest
+# ---------------------------------------------------------------------------
+@router.post("/api/v1/notifications/ingest", status_code=status.HTTP_201_CREATED)
+def ingest_notification(payload: NotificationIngestRequest, request: Request):
+    services: AppServices = request.app.state.services
+
+    # --- Missed-call interception: queue TTS audio, skip DB ---
+    tts_text = missed_call_announcement(payload)
+    if tts_text is not None:
+        job = services.audio_jobs.submit(tts_text)
+        return NegotiatedResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=missed_call_ack(payload, tts_text, job.job_id),
+            headers={"X-Missed-Call": "true"},
+        )
+
+    # --- Over-quota (deferred) or write-behind: durably queue and acknowledge ---
+    queued_as = enqueue_notification(services, payload)
+    if queued_as is not None:
+        return NegotiatedResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": queued_as, "notificationId": payload.notificationId},
         )
 
     # --- Standard notification ingestion ---
-    formatted_document = format_notification_document(payload)
-    embedding = embed_text(
-        services=services,
-        text=formatted_document,
-        task_type="RETRIEVAL_DOCUMENT",
-        title=payload.appName,
-    )
+    formatted_document = store_notification(services, payload)
 
-    metadata = {
+    if services.settings.ingest_response_mode == "minimal" or prefers_minimal(request):
+        return NegotiatedResponse(
+            status_code=status.HTTP_201_CREATED,
+            content={"status": "ingested", "notificationId": payload.notificationId},
+            headers={"Preference-Applied": "return=minimal"},
+        )
+    return {
+        "status": "ingested",
         "notificationId": payload.notificationId,
-        "packageName": payload.packageName,
-        "appName": payload.appName,
-        "title": payload.title,
-        "time": payload.time,
-        "timeUtc": epoch_ms_to_utc_string(payload.time),
-        "isOngoing": payload.isOngoing,
+        "storedDocument": formatted_document,
     }
 
-    try:
-        services.collection.upsert(
-            ids=[payload.notificationId],
-            embeddings=[embedding],
-            documents=[formatted_document],
-            metadatas=[metadata],
-        )
-    except Exception as exc:
-        logger.exception("Vector DB upsert failed")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to persist notification: {exc}",
-        ) from exc
 
+# ---------------------------------------------------------------------------
+# Notification Stream (persistent ingest channel)
+# ---------------------------------------------------------------------------
+def missed_call_ack(payload: NotificationIngestRequest, tts_text: str, job_id: str) -> dict:
     return {
-        "status": "ingested",
+        "status": "missed_call",
         "notificationId": payload.notificationId,
-        "storedDocument": formatted_document,
+        "responseText": tts_text,
+        "audioJobId": job_id,
+        "audioUrl": f"/api/v1/audio/{job_id}",
     }
 
 
+def process_stream_notification(services: AppServices, payload: NotificationIngestRequest) -> dict:
+    """Blocking ingest for one streamed notification; returns the ack message."""
+    tts_text = missed_call_announcement(payload)
+    if tts_text is not None:
+        job = services.audio_jobs.submit(tts_text)
+        return {"type": "ack", **missed_call_ack(payload, tts_text, job.job_id)}
+
+    queued_as = enqueue_notification(services, payload)
+    if queued_as is not None:
+        return {"type": "ack", "notificationId": payload.notificationId, "status": queued_as}
+
+    store_notification(services, payload)
+    return {"type": "ack", "notificationId": payload.notificationId, "status": "ingested"}
+
+
+def raw_notification_id(line: str) -> str | None:
+    """Best-effort ``notificationId`` from a line that failed validation."""
+    try:
+        value = orjson.loads(line).get("notificationId")
+    except (orjson.JSONDecodeError, AttributeError):
+        return None
+    return str(value) if value is not None else None
+
+
+async def send_frame(websocket: WebSocket, message: dict) -> None:
+    await websocket.send_text(orjson.dumps(message).decode("utf-8"))
+
+
+@router.websocket("/api/v1/notifications/stream")
+async def ingest_stream(websocket: WebSocket):
+    """
+    Long-lived ingest channel. Each text frame carries one or more
+    newline-delimited notification objects (same schema as ``/ingest``).
+
+    The server opens with ``{"type": "ready", "credits": N}``; every ack or
+    nack hands one credit back. When a client runs out of credits the
+    server stops reading, so TCP backpressure throttles the sender. A
+    ``missed_call`` ack carries an ``audioJobId`` for ``/api/v1/audio/{id}``.
+    """
+    services: AppServices = websocket.app.state.services
+    window = services.settings.ingest_stream_window
+    credits = asyncio.Semaphore(window)
+    send_lock = asyncio.Lock()
+    in_flight: set[asyncio.Task] = set()
+
+    async def handle(payload: NotificationIngestRequest) -> None:
+        try:
+            ack = await run_in_threadpool(process_stream_notification, services, payload)
+        except HTTPException as exc:
+            ack = {
+                "type": "nack",
+                "notificationId": payload.notificationId,
+                "status": exc.status_code,
+                "error": exc.detail,
+            }
+        except Exception:
+            logger.exception("Streamed ingest failed for %s", payload.notificationId)
+            ack = {
+                "type": "nack",
+                "notificationId": payload.notificationId,
+                "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "error": "Internal server error",
+            }
+        finally:
+            credits.release()
+
+        ack["credits"] = 1
+        async with send_lock:
+            await send_frame(websocket, ack)
+
+    await websocket.accept()
+    await send_frame(websocket, {"type": "ready", "credits": window})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+            frame = message.get("text")
+            if frame is None:
+                logger.warning("Binary frame on the ingest stream; closing")
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                break
+            for line in frame.splitlines():
+                if not line.strip():
+                    continue
+                await credits.acquire()
+                try:
+                    payload = NotificationIngestRequest.model_validate_json(line)
+                except ValidationError as exc:
+                    credits.release()
+                    nack = {
+                        "type": "nack",
+                        "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        "error": exc.errors(include_url=False, include_context=False),
+                        "credits": 1,
+                    }
+                    # So the client can resolve the waiter for this notification
+                    notification_id = raw_notification_id(line)
+                    if notification_id is not None:
+                        nack["notificationId"] = notification_id
+                    async with send_lock:
+                        await send_frame(websocket, nack)
+                    continue
+
+                task = asyncio.create_task(handle(payload))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+    except WebSocketDisconnect:
+        logger.info("Ingest stream closed by client")
+    finally:
+        # Let accepted notifications finish persisting even if nobody hears the ack
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+# ---------------------------------------------------------------------------
+# Async Audio Jobs
+# ---------------------------------------------------------------------------
+@router.get("/api/v1/audio/{job_id}")
+def get_audio(job_id: str, request: Request, wait: bool = True):
+    services: AppServices = request.app.state.services
+    job = services.audio_jobs.wait(job_id, services.settings.audio_job_wait_s if wait else 0.0)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown or expired audio job")
+
+    if job.status == "pending":
+        return NegotiatedResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": "pending", "audioJobId": job_id},
+        )
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail="Failed to generate audio file")
+
+    # The file stays until the job expires so clients can retry the download
+    return FileResponse(
+        path=job.path,
+        media_type="audio/wav",
+        filename=f"{job_id}.wav",
+        headers={"X-Response-Text": job.text.replace("\n", " ")},
+    )
+
+
 # ---------------------------------------------------------------------------
 # Agent Query
 # ---------------------------------------------------------------------------
 @router.post("/api/v1/agent/query")
 def agent_query(payload: AgentQueryRequest, request: Request):
     services: AppServices = request.app.state.services
-    top_k = payload.topK or services.settings.default_top_k
+    # Someone is waiting on this answer: jump ahead of queued ingest work
+    with priority_class(INTERACTIVE):
+        return answer_agent_query(services, payload)
+
+
+def answer_agent_query(services: AppServices, payload: AgentQueryRequest):
+    settings = services.settings
+    top_k = payload.topK or settings.default_top_k
+    collection = collection_for(services, payload.userId)
 
-    query_embedding = embed_text(
-        services=services,
-        text=payload.query,
-        task_type="RETRIEVAL_QUERY",
+    filters: list[dict[str, Any]] = []
+    importance_floor = None
+    min_importance = payload.minImportance if payload.minImportance is not None else settings.importance_min
+    if services.importance is not None and min_importance > 0:
+        importance_floor = min_importance
+        filters.append({"importance": {"$gte": min_importance}})
+
+    # Lower time bound: the caller's window and/or the "since last asked" watermark
+    since_ms = None
+    if payload.withinMinutes is not None:
+        since_ms = int(time.time() * 1000) - payload.withinMinutes * 60_000
+    # Watermarks are per user: an anonymous caller has nobody to catch up
+    catching_up = payload.sinceLastAsked and bool(payload.userId)
+    if catching_up:
+        since_ms = max(since_ms or 0, services.watermarks.get(payload.userId) + 1)
+    if since_ms is not None:
+        filters.append({"time": {"$gte": since_ms}})
+
+    hot_tier = services.hot_tier
+    hot_filters = dict(
+        user_id=payload.userId if settings.chroma_shard_by_user else ALL_USERS,
+        min_time_ms=since_ms,
+        min_importance=importance_floor,
     )
 
-    try:
-        result = services.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=["documents", "metadatas", "distances"],
+    where = None
+    if filters:
+        where = filters[0] if len(filters) == 1 else {"$and": filters}
+        if hot_tier is not None and hot_tier.covers(since_ms):
+            found = hot_tier.has_matches(**hot_filters)
+        else:
+            found = has_matches(services, collection, where)
+        # Nothing new / important stored: answer without touching Gemini at all
+        if not found:
+            return build_agent_response(services, payload, FALLBACK_RESPONSE, matched=0)
+
+    if not gemini_available(services):
+        # Gemini is unhealthy: skip retrieval entirely and answer locally.
+        logger.warning("Gemini circuit open — serving fallback agent response")
+        return build_agent_response(services, payload, FALLBACK_RESPONSE, matched=0)
+
+    next_time = None
+    if catching_up:
+        # The oldest unheard notifications first, so the watermark can move past them
+        retrieved, next_time = backlog_rows(services, collection, where, top_k)
+    else:
+        retrieved = search_rows(services, collection, payload.query, where, top_k, hot_filters)
+        if services.importance is not None and settings.importance_boost > 0:
+            retrieved = boost_by_importance(retrieved, settings.importance_boost)
+    if settings.context_packing:
+        context_rows, included = pack_context(
+            retrieved,
+            token_budget=settings.context_token_budget,
+            similarity_threshold=settings.context_dedup_similarity,
+            mmr_lambda=settings.context_mmr_lambda,
         )
+    else:
+        context_rows, included = [format_row(row) for row in retrieved], retrieved
+
+    # 1. Generate the text
+    response_text, answered = generate_voice_response(services, payload.query, context_rows)
+
+    if catching_up and answered:
+        heard = heard_through(retrieved, included, next_time)
+        if heard is not None:
+            services.watermarks.advance(payload.userId, heard)
+
+    # 2. Synthesize the .wav (inline, or as an async job in "json" mode)
+    return build_agent_response(services, payload, response_text, matched=len(retrieved))
+
+
+def search_rows(
+    services: AppServices,
+    collection: Any,
+    query: str,
+    where: dict[str, Any] | None,
+    top_k: int,
+    hot_filters: dict[str, Any],
+) -> list[RetrievedRow]:
+    """The *top_k* rows most similar to *query*, most relevant first."""
+    query_embedding = embed_text(services=services, text=query, task_type="RETRIEVAL_QUERY")
+
+    include = ["documents", "metadatas", "distances"]
+    if services.settings.context_packing:
+        include.append("embeddings")
+
+    hot_tier = services.hot_tier
+    result = hot_tier.search(query_embedding, top_k, **hot_filters) if hot_tier is not None else None
+    if result is None:
+        try:
+            result = services.vector_scheduler.run(
+                collection.query,
+                query_embeddings=[query_embedding.tolist()],
+                n_results=top_k,
+                where=where,
+                include=include,
+            )
+        except Exception as exc:
+            logger.exception("Vector DB query failed")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Vector search failed: {exc}",
+            ) from exc
+    return rows_from_query_result(result)
+
+
+def backlog_rows(
+    services: AppServices,
+    collection: Any,
+    where: dict[str, Any] | None,
+    top_k: int,
+) -> tuple[list[RetrievedRow], int | None]:
+    """
+    The *top_k* oldest rows matching *where*, oldest first, and the ``time``
+    of the oldest row left out (None when the whole backlog fit).
+    """
+    include = ["documents", "metadatas"]
+    if services.settings.context_packing:
+        include.append("embeddings")
+    try:
+        index = services.vector_scheduler.run(collection.get, where=where, include=["metadatas"])
+        times = [int((meta or {}).get("time", 0)) for meta in index["metadatas"]]
+        order = sorted(range(len(times)), key=times.__getitem__)
+        page = services.vector_scheduler.run(
+            collection.get, ids=[index["ids"][i] for i in order[:top_k]], include=include
+        ) if order else {}
     except Exception as exc:
-        logger.exception("Vector DB query failed")
+        logger.exception("Vector DB lookup failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Vector search failed: {exc}",
         ) from exc
 
-    docs_outer = result.get("documents") or [[]]
-    metas_outer = result.get("metadatas") or [[]]
-    docs = docs_outer[0] if docs_outer else []
-    metas = metas_outer[0] if metas_outer else []
-
-    context_rows: list[str] = []
-    for i, doc in enumerate(docs):
-        if not doc:
-            continue
-        meta = metas[i] if i < len(metas) and metas[i] else {}
-        app_name = str(meta.get("appName", "Unknown App"))
-        title = str(meta.get("title", "")).strip()
-        time_utc = str(meta.get("timeUtc", "Unknown time"))
-        sender_part = f" from {title}" if title else ""
-        context_rows.append(f"{app_name}{sender_part} at {time_utc}: {doc}")
+    rows = sorted(rows_from_get_result(page), key=row_time)
+    # Older reads as more relevant, so the context budget trims the newest end
+    for rank, row in enumerate(rows):
+        row.relevance = 1.0 - rank / len(rows)
+    next_time = times[order[top_k]] if len(order) > top_k else None
+    return rows, next_time
 
-    # 1. Generate the text
-    response_text = generate_voice_response(services, payload.query, context_rows)
 
-    # 2. Generate and save the .wav file locally
+def heard_through(backlog: list[RetrievedRow], included: list[RetrievedRow], next_time: int | None) -> int | None:
+    """
+    Newest ``time`` up to which every *backlog* row (oldest first) reached
+    the prompt, or None if the oldest one didn't.
+    """
+    reached = {id(row) for row in included}
+    heard = None
+    for row in backlog:
+        if id(row) not in reached:
+            next_time = row_time(row)
+            break
+        heard = row_time(row)
+    if heard is not None and next_time is not None and heard >= next_time:
+        # A row left out shares this timestamp: stop just short of it
+        heard = next_time - 1
+    return heard
+
+
+def has_matches(services: AppServices, collection: Any, where: dict[str, Any]) -> bool:
+    try:
+        result = services.vector_scheduler.run(collection.get, where=where, limit=1, include=[])
+    except Exception as exc:
+        logger.exception("Vector DB lookup failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Vector search failed: {exc}",
+        ) from exc
+    return bool(result["ids"])
+
+
+def build_agent_response(
+    services: AppServices,
+    payload: AgentQueryRequest,
+    response_text: str,
+    matched: int,
+):
+    # Two-phase mode: return the text now, audio is fetched from /api/v1/audio/{id}
+    if payload.responseMode == "json":
+        job = services.audio_jobs.submit(response_text)
+        return AgentQueryResponse(
+            response=response_text,
+            matchedNotifications=matched,
+            audioJobId=job.job_id,
+            audioUrl=f"/api/v1/audio/{job.job_id}",
+        )
+
+    # Generate and save the .wav file locally
     wav_filepath = generate_and_save_wav(response_text, services)
 
     if not wav_filepath or not os.path.exists(wav_filepath):
         raise HTTPException(status_code=500, detail="Failed to generate audio file")
 
-    # 3. Send the file back, and delete it from the server once finished
+    # Send the file back, and delete it from the server once finished
     return FileResponse(
         path=wav_filepath,
         media_type="audio/wav",
@@ -196,6 +572,6 @@ def agent_query(payload: AgentQueryRequest, request: Request):
         background=BackgroundTask(os.remove, wav_filepath),
         headers={
             "X-Response-Text": response_text.replace('\n', ' '),
-            "X-Matched-Notifications": str(len(context_rows)),
+            "X-Matched-Notifications": str(matched),
         },
     )
@@ -0,0 +1,162 @@
+"""
+Priority-aware executor for work shared between ingest and agent queries.
+
+Ingest embedding/upserts and interactive agent queries compete for the
+same Gemini quota and Chroma handle. ``PriorityScheduler`` is a drop-in
+for ``ThreadPoolExecutor.submit`` that keeps one FIFO per priority class
+and dispatches between them by weight (stride scheduling), so an agent
+query queued behind an ingest burst runs next instead of last. A class
+whose oldest item has waited longer than ``max_wait_s`` is served first
+regardless of weight, so ingest cannot starve.
+
+The class of a submission comes from the caller's context::
+
+    with priority_class(INTERACTIVE):
+        embed_text(...)   # every Gemini / Chroma call inside is interactive
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from resilience import LatencyTracker
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+INTERACTIVE = "interactive"
+INGEST = "ingest"
+PRIORITY_CLASSES = (INTERACTIVE, INGEST)
+
+_current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("priority_class", default=INGEST)
+
+
+@contextmanager
+def priority_class(name: str) -> Iterator[None]:
+    """Tag every scheduler submission made inside the block with *name*."""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {name}")
+    token = _current_priority.set(name)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _ClassQueue:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.items: deque[tuple[float, Future, Callable[[], Any]]] = deque()
+        self.pass_value = 0.0
+        self.dispatched = 0
+        self.promoted = 0
+        self.wait = LatencyTracker()
+
+
+class PriorityScheduler(Executor):
+    def __init__(
+        self,
+        name: str,
+        *,
+        workers: int,
+        weights: dict[str, float],
+        max_wait_s: float = 2.0,
+    ):
+        self.name = name
+        self.max_wait_s = max_wait_s
+        self._queues = {cls: _ClassQueue(weights[cls]) for cls in PRIORITY_CLASSES}
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        queue = self._queues[_current_priority.get()]
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError(f"{self.name} scheduler is shut down")
+            if not queue.items:
+                # A class returning from idle must not bank credit from while it was idle
+                queue.pass_value = max(queue.pass_value, self._min_active_pass())
+            queue.items.append((time.monotonic(), future, lambda: fn(*args, **kwargs)))
+            self._cond.notify()
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit and block for the result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _min_active_pass(self) -> float:
+        active = [q.pass_value for q in self._queues.values() if q.items]
+        return min(active) if active else max(q.pass_value for q in self._queues.values())
+
+    def _next(self) -> tuple[_ClassQueue, float, Future, Callable[[], Any]]:
+        now = time.monotonic()
+        active = [q for q in self._queues.values() if q.items]
+        starved = [q for q in active if now - q.items[0][0] >= self.max_wait_s]
+        if starved:
+            queue = min(starved, key=lambda q: q.items[0][0])
+            queue.promoted += 1
+        else:
+            queue = min(active, key=lambda q: q.pass_value)
+        queue.pass_value += 1.0 / queue.weight
+        enqueued_at, future, call = queue.items.popleft()
+        return queue, enqueued_at, future, call
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._shutdown and not any(q.items for q in self._queues.values()):
+                    self._cond.wait()
+                if self._shutdown and not any(q.items for q in self._queues.values()):
+                    return
+                queue, enqueued_at, future, call = self._next()
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            queue.wait.record(time.monotonic() - enqueued_at)
+            queue.dispatched += 1
+            try:
+                future.set_result(call())
+            except BaseException as exc:
+                future.set_exception(exc)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    while queue.items:
+                        queue.items.popleft()[1].cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                cls: {
+                    "queued": len(q.items),
+                    "dispatched": q.dispatched,
+                    "starvationPromotions": q.promoted,
+                    "queueWaitP50Ms": _ms(q.wait.quantile(0.5)),
+                    "queueWaitP95Ms": _ms(q.wait.quantile(0.95)),
+                }
+                for cls, q in self._queues.items()
+            }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
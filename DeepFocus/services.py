@@ -7,18 +7,42 @@ and Pocket TTS audio generation.
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from typing import Any
 
-import scipy.io.wavfile
+import chromadb
+import numpy as np
 from fastapi import HTTPException, status
 
-from config import Settings, FALLBACK_RESPONSE, SYSTEM_PROMPT, normalize_model_name
+from config import (
+    Settings,
+    COMPLEX_INTENT_PATTERN,
+    FALLBACK_RESPONSE,
+    LLM_TIERS,
+    MISSED_CALL_PATTERN,
+    SIMPLE_INTENT_PATTERN,
+    SYSTEM_PROMPT,
+    normalize_model_name,
+)
+from admission import AdmissionController
+from audio_jobs import AudioJobStore
+from hot_tier import HotTier
+from importance import ImportanceScorer
+from ingest_queue import IngestWorker
 from models import NotificationIngestRequest
+from resilience import CircuitOpenError, ResilientCaller
+from scheduler import PriorityScheduler
+from thread_coalescing import ConversationThread, ThreadCoalescer
+from tts_server import TTSClient, synthesize_wav_bytes
+from watermarks import WatermarkStore
 
 logger = logging.getLogger("chronoforge-screenless-focus")
 
@@ -34,6 +58,38 @@ class AppServices:
     collection: Any
     tts_model: Any
     tts_voice_state: Any
+    embed_caller: ResilientCaller
+    llm_caller: ResilientCaller
+    gemini_scheduler: PriorityScheduler
+    vector_scheduler: PriorityScheduler
+    ingest_worker: IngestWorker | None = None
+    admission: AdmissionController | None = None
+    deferred_worker: IngestWorker | None = None
+    tts_client: TTSClient | None = None
+    audio_jobs: AudioJobStore | None = None
+    warmup_report: dict[str, Any] | None = None
+    threads: ThreadCoalescer | None = None
+    importance: ImportanceScorer | None = None
+    watermarks: WatermarkStore | None = None
+    hot_tier: HotTier | None = None
+    # Optional cheaper model for small agent-query contexts (see choose_llm_tier)
+    llm_light_caller: ResilientCaller | None = None
+    llm_tier_stats: dict[str, dict[str, int]] = field(
+        default_factory=lambda: {tier: {"calls": 0, "escalated": 0, "fallbacks": 0} for tier in LLM_TIERS}
+    )
+    llm_tier_stats_lock: threading.Lock = field(default_factory=threading.Lock)
+    # Per-user collections, cached so each shard is resolved once per process
+    shard_collections: dict[str, Any] = field(default_factory=dict)
+    shard_lock: threading.Lock = field(default_factory=threading.Lock)
+    # The in-process TTS model is not re-entrant (tts_server.py serializes the same way)
+    tts_lock: threading.Lock = field(default_factory=threading.Lock)
+    # In-process re-embedding (migrate_embeddings.EmbeddingMigrationJob), persistent mode
+    embedding_migration: Any = None
+
+
+def gemini_available(services: AppServices) -> bool:
+    """False while the shared Gemini breaker is open (fail fast, don't queue)."""
+    return services.llm_caller.breaker.state != "open"
 
 
 # ---------------------------------------------------------------------------
@@ -51,47 +107,80 @@ def format_notification_document(payload: NotificationIngestRequest) -> str:
     return f"{payload.appName} message from {sender}: {message} at {ts}."
 
 
+def format_thread_document(thread: ConversationThread) -> str:
+    sender = thread.title or "Unknown sender"
+    lines = [
+        f"[{epoch_ms_to_utc_string(m['time'])}] {m['text'].strip() or 'No message body'}"
+        for m in thread.messages
+    ]
+    return f"{thread.app_name} conversation with {sender} ({len(lines)} recent messages):\n" + "\n".join(lines)
+
+
 # ---------------------------------------------------------------------------
 # Embedding Helpers
 # ---------------------------------------------------------------------------
-def extract_embedding_vector(embed_response: Any) -> list[float]:
+def extract_embedding_vectors(embed_response: Any) -> np.ndarray:
+    """Return a ``(n, dim)`` float32 matrix; conversion happens in NumPy, not per element."""
     embeddings = getattr(embed_response, "embeddings", None)
-    if embeddings and len(embeddings) > 0:
-        values = getattr(embeddings[0], "values", None)
-        if values is not None:
-            return [float(v) for v in values]
+    if embeddings:
+        vectors = [getattr(e, "values", None) for e in embeddings]
+        if all(v is not None for v in vectors):
+            return np.asarray(vectors, dtype=np.float32)
 
     if isinstance(embed_response, dict):
         embs = embed_response.get("embeddings")
         if isinstance(embs, list) and embs:
-            first = embs[0]
-            if isinstance(first, dict) and isinstance(first.get("values"), list):
-                return [float(v) for v in first["values"]]
+            if all(isinstance(e, dict) and isinstance(e.get("values"), list) for e in embs):
+                return np.asarray([e["values"] for e in embs], dtype=np.float32)
 
         single = embed_response.get("embedding")
         if isinstance(single, list):
-            return [float(v) for v in single]
+            return np.asarray([single], dtype=np.float32)
 
     raise ValueError("No embedding vector found in Gemini response")
 
 
-def embed_text(
-    services: AppServices,
-    text: str,
-    task_type: str,
-    title: str | None = None,
-) -> list[float]:
+def extract_embedding_vector(embed_response: Any) -> np.ndarray:
+    return extract_embedding_vectors(embed_response)[0]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise each row (Gemini only normalises full-size embeddings)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    return matrix / norms
+
+
+def embedding_config(settings: Settings, task_type: str, title: str | None = None) -> dict[str, Any]:
     config: dict[str, Any] = {"task_type": task_type}
     if task_type == "RETRIEVAL_DOCUMENT" and title:
         config["title"] = title
+    if settings.embedding_dimensionality is not None:
+        config["output_dimensionality"] = settings.embedding_dimensionality
+    return config
+
 
+def embed_texts(
+    services: AppServices,
+    texts: list[str],
+    task_type: str,
+    title: str | None = None,
+) -> np.ndarray:
+    """Embed several texts in one Gemini call (they share *task_type* and *title*)."""
+    dimensionality = services.settings.embedding_dimensionality
     try:
-        response = services.genai_client.models.embed_content(
+        response = services.embed_caller.call(
+            services.genai_client.models.embed_content,
             model=normalize_model_name(services.settings.gemini_embedding_model),
-            contents=[text],
-            config=config,
+            contents=texts,
+            config=embedding_config(services.settings, task_type, title),
         )
-        return extract_embedding_vector(response)
+        vectors = extract_embedding_vectors(response)
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Embedding service temporarily unavailable",
+        ) from exc
     except Exception as exc:
         logger.exception("Embedding generation failed")
         raise HTTPException(
@@ -99,6 +188,446 @@ def embed_text(
             detail=f"Embedding generation failed: {exc}",
         ) from exc
 
+    if len(vectors) != len(texts):
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Embedding generation failed: expected {len(texts)} vectors, got {len(vectors)}",
+        )
+    if dimensionality is not None:
+        vectors = normalize_rows(vectors)
+    return vectors
+
+
+def embed_text(
+    services: AppServices,
+    text: str,
+    task_type: str,
+    title: str | None = None,
+) -> np.ndarray:
+    return embed_texts(services, [text], task_type, title=title)[0]
+
+
+# ---------------------------------------------------------------------------
+# Vector Store Collections
+# ---------------------------------------------------------------------------
+def collection_metadata(settings: Settings) -> dict[str, Any]:
+    """
+    Chroma collection metadata: cosine space plus HNSW graph parameters.
+
+    ``M`` and ``construction_ef`` only apply when a collection is created;
+    existing collections keep the values they were built with.
+    """
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": settings.hnsw_m,
+        "hnsw:construction_ef": settings.hnsw_construction_ef,
+        "hnsw:search_ef": settings.hnsw_search_ef,
+        # Vectors written from now on use these settings (see migrate_embeddings.py)
+        "embedding": embedding_fingerprint(settings),
+    }
+
+
+def embedding_fingerprint(settings: Settings) -> str:
+    """Identifies the vector space a collection was embedded into (model + width)."""
+    dimensionality = settings.embedding_dimensionality or "default"
+    return f"{normalize_model_name(settings.gemini_embedding_model)}@{dimensionality}"
+
+
+# Stamped on pre-fingerprint collections whose vectors visibly don't match the settings
+UNKNOWN_FINGERPRINT = "unknown"
+
+
+def stamp_embedding_fingerprint(collection: Any, settings: Settings) -> str:
+    """
+    Fingerprint *collection* was built with, backfilling it on collections
+    created before fingerprints were stamped.
+
+    A legacy collection is assumed to match the current settings unless a
+    stored vector has the wrong width for ``EMBEDDING_DIMENSIONALITY``.
+    """
+    built_with = dict(collection.metadata or {})
+    if "embedding" in built_with:
+        return str(built_with["embedding"])
+
+    fingerprint = embedding_fingerprint(settings)
+    sample = collection.get(limit=1, include=["embeddings"])
+    if (
+        sample["ids"]
+        and settings.embedding_dimensionality is not None
+        and len(sample["embeddings"][0]) != settings.embedding_dimensionality
+    ):
+        fingerprint = UNKNOWN_FINGERPRINT
+
+    # Chroma refuses to re-set the distance function; the index keeps its own copy
+    built_with.pop("hnsw:space", None)
+    try:
+        collection.modify(metadata={**built_with, "embedding": fingerprint})
+        logger.info("Stamped legacy collection %s with embedding=%s", collection.name, fingerprint)
+    except Exception:
+        logger.warning("Could not stamp collection %s with its embedding fingerprint", collection.name, exc_info=True)
+    return fingerprint
+
+
+def create_chroma_client(settings: Settings) -> Any:
+    """Chroma client for ``VECTOR_STORE_MODE`` (snapshot mode is in-process only)."""
+    if settings.vector_store_mode == "snapshot":
+        return chromadb.EphemeralClient()
+    if settings.vector_store_mode == "server":
+        # One HTTP client per worker; its connection pool is reused by every request
+        logger.info("Using Chroma server at %s:%d", settings.chroma_host, settings.chroma_port)
+        return chromadb.HttpClient(
+            host=settings.chroma_host,
+            port=settings.chroma_port,
+            ssl=settings.chroma_ssl,
+        )
+    return chromadb.PersistentClient(path=settings.chroma_persist_dir)
+
+
+def alias_collection_name(name: str) -> str:
+    return f"{name}__alias"
+
+
+def read_collection_alias(chroma_client: Any, name: str) -> dict[str, Any]:
+    """
+    The ``{name}__alias`` record for the logical collection *name*, or ``{}``.
+
+    ``migrate_embeddings.py`` re-embeds into a shadow collection and then
+    repoints this tiny collection at it with one metadata write:
+    ``active`` is the physical collection now serving *name* and
+    ``embedding`` the fingerprint its vectors (and queries) use.
+    """
+    try:
+        alias = chroma_client.get_collection(alias_collection_name(name))
+    except Exception:
+        return {}
+    return dict(alias.metadata or {})
+
+
+def resolve_collection_name(chroma_client: Any, name: str) -> str:
+    """Physical collection currently serving *name* (the name itself without an alias)."""
+    return str(read_collection_alias(chroma_client, name).get("active") or name)
+
+
+def set_collection_alias(chroma_client: Any, name: str, physical_name: str, fingerprint: str) -> None:
+    metadata = {"active": physical_name, "embedding": fingerprint}
+    alias = chroma_client.get_or_create_collection(name=alias_collection_name(name), metadata=metadata)
+    alias.modify(metadata=metadata)
+
+
+def settings_for_fingerprint(settings: Settings, fingerprint: str | None) -> Settings:
+    """*settings* embedding with the model and width *fingerprint* names (unchanged if it names none)."""
+    model, sep, dimensionality = (fingerprint or "").rpartition("@")
+    if not sep or not model:
+        return settings
+    if dimensionality == "default":
+        return replace(settings, gemini_embedding_model=model, embedding_dimensionality=None)
+    try:
+        return replace(settings, gemini_embedding_model=model, embedding_dimensionality=int(dimensionality))
+    except ValueError:
+        return settings
+
+
+def follow_collection_alias(services: AppServices) -> bool:
+    """
+    Move this worker onto the collection the alias points at now, embedding
+    with the fingerprint recorded next to it, so a migration's switch-over
+    needs no restart. Returns True if it moved.
+    """
+    name = services.settings.chroma_collection_name
+    alias = read_collection_alias(services.chroma_client, name)
+    active = str(alias.get("active") or name)
+    if active == services.collection.name:
+        return False
+
+    collection = services.chroma_client.get_collection(active)
+    fingerprint = alias.get("embedding") or (collection.metadata or {}).get("embedding")
+    with services.shard_lock:
+        services.settings = settings_for_fingerprint(services.settings, fingerprint)
+        services.collection = collection
+        # Shards are re-resolved through their own aliases on next use
+        services.shard_collections.clear()
+    if services.hot_tier is not None:
+        # Its vectors belong to the old embedding space
+        services.hot_tier.clear()
+    logger.info("Collection %s now served by %s (%s)", name, active, fingerprint)
+    return True
+
+
+def preload_hot_tier(services: AppServices) -> None:
+    """Seed the hot tier with the last ``HOT_TIER_PRELOAD_MINUTES`` of the shared collection."""
+    since_ms = int(time.time() * 1000) - services.settings.hot_tier_preload_minutes * 60_000
+    rows = services.collection.get(
+        where={"time": {"$gte": since_ms}},
+        include=["documents", "metadatas", "embeddings"],
+    )
+    services.hot_tier.preload(rows, since_ms)
+
+
+def shard_collection_name(base_name: str, user_id: str) -> str:
+    """Chroma-safe per-user collection name (user IDs may contain any characters)."""
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16]
+    return f"{base_name}_u_{digest}"
+
+
+def collection_for(services: AppServices, user_id: str | None) -> Any:
+    """The collection holding *user_id*'s notifications; the shared one when unsharded."""
+    if not services.settings.chroma_shard_by_user or not user_id:
+        return services.collection
+
+    name = shard_collection_name(services.settings.chroma_collection_name, user_id)
+    collection = services.shard_collections.get(name)
+    if collection is not None:
+        return collection
+    # Ingest and query threads can race on a new user's first request
+    with services.shard_lock:
+        collection = services.shard_collections.get(name)
+        if collection is None:
+            collection = services.chroma_client.get_or_create_collection(
+                name=resolve_collection_name(services.chroma_client, name),
+                metadata=collection_metadata(services.settings),
+            )
+            stamp_embedding_fingerprint(collection, services.settings)
+            services.shard_collections[name] = collection
+    return collection
+
+
+# ---------------------------------------------------------------------------
+# Notification Ingest
+# ---------------------------------------------------------------------------
+def missed_call_announcement(payload: NotificationIngestRequest) -> str | None:
+    """Return the spoken missed-call line, or ``None`` for ordinary notifications."""
+    if MISSED_CALL_PATTERN.search(payload.title):
+        caller = payload.text.strip() or "an unknown caller"
+    elif MISSED_CALL_PATTERN.search(payload.text):
+        # WhatsApp puts the caller in the title and "Missed voice call" in the body
+        caller = payload.title.strip() or "an unknown caller"
+    else:
+        return None
+
+    logger.info(
+        "Missed call detected — generating TTS instead of ingesting. Caller: %s",
+        caller,
+    )
+    return f"You received a missed call from {caller}"
+
+
+def build_notification_metadata(
+    payload: NotificationIngestRequest,
+    importance: float | None = None,
+) -> dict[str, Any]:
+    metadata: dict[str, Any] = {
+        "notificationId": payload.notificationId,
+        "packageName": payload.packageName,
+        "appName": payload.appName,
+        "title": payload.title,
+        "time": payload.time,
+        "timeUtc": epoch_ms_to_utc_string(payload.time),
+        "isOngoing": payload.isOngoing,
+    }
+    # Chroma metadata values cannot be None
+    if payload.userId:
+        metadata["userId"] = payload.userId
+    if importance is not None:
+        metadata["importance"] = importance
+    return metadata
+
+
+def score_notification(services: AppServices, payload: NotificationIngestRequest) -> float | None:
+    if services.importance is None:
+        return None
+    return services.importance.score(payload.packageName, payload.title, payload.text, payload.isOngoing)
+
+
+def store_notifications(
+    services: AppServices,
+    payloads: list[NotificationIngestRequest],
+) -> list[str]:
+    """Embed *payloads* and upsert them in one write; returns the stored documents."""
+    requested = payloads
+    if services.threads is not None:
+        # Coalescing: chat messages are journaled now (so callers may ack) and
+        # embedded once the conversation goes quiet; the rest is stored below
+        threaded = [p for p in payloads if services.threads.coalesces(p)]
+        if threaded:
+            services.threads.append(threaded)
+            payloads = [p for p in payloads if not services.threads.coalesces(p)]
+            if not payloads:
+                return [format_notification_document(p) for p in requested]
+
+    # Android re-posts updated notifications under the same ID; Chroma rejects
+    # duplicate IDs within one upsert, so the latest version wins.
+    payloads = list({p.notificationId: p for p in payloads}.values())
+    documents = [format_notification_document(p) for p in payloads]
+
+    # The embedding title is per call, so batch by app name.
+    by_app: dict[str, list[int]] = {}
+    for idx, payload in enumerate(payloads):
+        by_app.setdefault(payload.appName, []).append(idx)
+
+    embeddings: np.ndarray | None = None
+    for app_name, indices in by_app.items():
+        vectors = embed_texts(
+            services=services,
+            texts=[documents[i] for i in indices],
+            task_type="RETRIEVAL_DOCUMENT",
+            title=app_name,
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(payloads), vectors.shape[1]), dtype=np.float32)
+        embeddings[indices] = vectors
+
+    by_user: dict[str | None, list[int]] = {}
+    for idx, payload in enumerate(payloads):
+        by_user.setdefault(payload.userId, []).append(idx)
+    if not services.settings.chroma_shard_by_user:
+        by_user = {None: list(range(len(payloads)))}
+
+    ids = [p.notificationId for p in payloads]
+    metadatas = [build_notification_metadata(p, score_notification(services, p)) for p in payloads]
+    try:
+        for user_id, indices in by_user.items():
+            services.vector_scheduler.run(
+                collection_for(services, user_id).upsert,
+                ids=[ids[i] for i in indices],
+                embeddings=embeddings[indices].tolist(),
+                documents=[documents[i] for i in indices],
+                metadatas=[metadatas[i] for i in indices],
+            )
+    except Exception as exc:
+        logger.exception("Vector DB upsert failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to persist notification: {exc}",
+        ) from exc
+
+    # Only once durable in Chroma, so the hot tier never holds what the cold tier lacks
+    if services.hot_tier is not None:
+        services.hot_tier.add(ids, documents, metadatas, embeddings)
+
+    stored = dict(zip((p.notificationId for p in payloads), documents))
+    return [stored.get(p.notificationId) or format_notification_document(p) for p in requested]
+
+
+def store_notification(services: AppServices, payload: NotificationIngestRequest) -> str:
+    """Embed *payload* and upsert it into the collection; returns the stored document."""
+    return store_notifications(services, [payload])[0]
+
+
+def enqueue_notification(services: AppServices, payload: NotificationIngestRequest) -> str | None:
+    """
+    Route *payload* off the synchronous path when possible.
+
+    Returns ``"deferred"`` when admission control downgraded it to the
+    slow-drain queue, ``"queued"`` when write-behind accepted it,
+    ``"coalesced"`` when it was appended to a conversation thread, or
+    ``None`` when the caller should embed and store it inline.
+    """
+    if services.admission is not None and not services.admission.admit(payload.packageName, payload.userId):
+        services.deferred_worker.queue.append(payload)
+        return "deferred"
+    if services.ingest_worker is not None:
+        services.ingest_worker.queue.append(payload)
+        return "queued"
+    if services.threads is not None and services.threads.coalesces(payload):
+        services.threads.append([payload])
+        return "coalesced"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Conversation Threads
+# ---------------------------------------------------------------------------
+def build_thread_metadata(thread: ConversationThread, importance: float | None = None) -> dict[str, Any]:
+    latest = thread.latest_time
+    metadata: dict[str, Any] = {
+        "notificationId": thread.thread_id,
+        "packageName": thread.package_name,
+        "appName": thread.app_name,
+        "title": thread.title,
+        "time": latest,
+        "timeUtc": epoch_ms_to_utc_string(latest),
+        "isOngoing": False,
+        "messageCount": len(thread.messages),
+        # The window itself, so a restarted worker can keep appending to it
+        "messages": json.dumps(list(thread.messages)),
+    }
+    if thread.user_id:
+        metadata["userId"] = thread.user_id
+    if importance is not None:
+        metadata["importance"] = importance
+    return metadata
+
+
+def score_thread(services: AppServices, thread: ConversationThread) -> float | None:
+    """A thread is as important as its most important message in the window."""
+    if services.importance is None:
+        return None
+    return max(
+        (services.importance.score(thread.package_name, thread.title, m["text"]) for m in thread.messages),
+        default=0.0,
+    )
+
+
+def load_thread_history(
+    services: AppServices,
+    threads: list[ConversationThread],
+) -> dict[str, list[dict[str, Any]]]:
+    """Stored message windows for *threads* that already have a document."""
+    by_user: dict[str | None, list[str]] = {}
+    for thread in threads:
+        by_user.setdefault(thread.user_id, []).append(thread.thread_id)
+
+    history: dict[str, list[dict[str, Any]]] = {}
+    for user_id, ids in by_user.items():
+        result = services.vector_scheduler.run(
+            collection_for(services, user_id).get,
+            ids=ids,
+            include=["metadatas"],
+        )
+        for thread_id, metadata in zip(result["ids"], result["metadatas"]):
+            if metadata and metadata.get("messages"):
+                history[thread_id] = json.loads(metadata["messages"])
+    return history
+
+
+def store_threads(services: AppServices, threads: list[ConversationThread]) -> None:
+    """Re-embed and upsert one document per thread."""
+    documents = [format_thread_document(t) for t in threads]
+
+    by_app: dict[str, list[int]] = {}
+    for idx, thread in enumerate(threads):
+        by_app.setdefault(thread.app_name, []).append(idx)
+
+    embeddings: np.ndarray | None = None
+    for app_name, indices in by_app.items():
+        vectors = embed_texts(
+            services=services,
+            texts=[documents[i] for i in indices],
+            task_type="RETRIEVAL_DOCUMENT",
+            title=app_name,
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(threads), vectors.shape[1]), dtype=np.float32)
+        embeddings[indices] = vectors
+
+    by_user: dict[str | None, list[int]] = {}
+    for idx, thread in enumerate(threads):
+        by_user.setdefault(thread.user_id, []).append(idx)
+
+    ids = [t.thread_id for t in threads]
+    metadatas = [build_thread_metadata(t, score_thread(services, t)) for t in threads]
+    for user_id, indices in by_user.items():
+        services.vector_scheduler.run(
+            collection_for(services, user_id).upsert,
+            ids=[ids[i] for i in indices],
+            embeddings=embeddings[indices].tolist(),
+            documents=[documents[i] for i in indices],
+            metadatas=[metadatas[i] for i in indices],
+        )
+
+    if services.hot_tier is not None:
+        services.hot_tier.add(ids, documents, metadatas, embeddings)
+
 
 # ---------------------------------------------------------------------------
 # LLM Generation Helpers
@@ -135,26 +664,98 @@ Speak the best concise response now.
 """.strip()
 
 
+def choose_llm_tier(services: AppServices, user_query: str, context_rows: list[str]) -> str:
+    """
+    ``"light"`` for a few rows or an "anything new?" style query,
+    ``"full"`` for larger contexts or questions that need reasoning.
+    """
+    if services.llm_light_caller is None or COMPLEX_INTENT_PATTERN.search(user_query):
+        return "full"
+    max_rows = services.settings.llm_light_max_rows
+    if len(context_rows) <= max_rows:
+        return "light"
+    if SIMPLE_INTENT_PATTERN.search(user_query) and len(context_rows) <= 2 * max_rows:
+        return "light"
+    return "full"
+
+
+def generation_config(settings: Settings, tier: str = "full") -> dict[str, Any]:
+    config: dict[str, Any] = {
+        "system_instruction": SYSTEM_PROMPT,
+        "temperature": 0.2,
+        # Sized for the 1-2 sentence contract, not a long-form answer
+        "max_output_tokens": settings.llm_max_output_tokens,
+    }
+    # Thinking tokens count against max_output_tokens. Unless configured, only
+    # the light tier turns thinking off: Pro-class full models reject a 0 budget.
+    budget = settings.llm_thinking_budget
+    if budget is None and tier == "light":
+        budget = 0
+    if budget is not None and budget >= 0:
+        config["thinking_config"] = {"thinking_budget": budget}
+    return config
+
+
+def count_llm_call(services: AppServices, tier: str, counter: str) -> None:
+    # Incremented from threadpool threads
+    with services.llm_tier_stats_lock:
+        services.llm_tier_stats[tier][counter] += 1
+
+
+def llm_tier_stats_snapshot(services: AppServices) -> dict[str, dict[str, int]]:
+    with services.llm_tier_stats_lock:
+        return {tier: dict(counts) for tier, counts in services.llm_tier_stats.items()}
+
+
+def _generate(services: AppServices, tier: str, prompt: str) -> str:
+    settings = services.settings
+    caller, model = (
+        (services.llm_light_caller, settings.gemini_llm_light_model)
+        if tier == "light"
+        else (services.llm_caller, settings.gemini_llm_model)
+    )
+    count_llm_call(services, tier, "calls")
+    response = caller.call(
+        services.genai_client.models.generate_content,
+        model=normalize_model_name(model),
+        contents=prompt,
+        config=generation_config(settings, tier),
+    )
+    return extract_generation_text(response)
+
+
 def generate_voice_response(
     services: AppServices,
     user_query: str,
     context_rows: list[str],
-) -> str:
+) -> tuple[str, bool]:
+    """
+    The spoken answer, and whether Gemini actually produced it (False when
+    the fallback line stands in for an open breaker or an empty reply).
+    """
     if not context_rows:
-        return FALLBACK_RESPONSE
+        return FALLBACK_RESPONSE, False
 
     prompt = build_query_prompt(user_query, context_rows)
+    tier = choose_llm_tier(services, user_query, context_rows)
     try:
-        response = services.genai_client.models.generate_content(
-            model=normalize_model_name(services.settings.gemini_llm_model),
-            contents=prompt,
-            config={
-                "system_instruction": SYSTEM_PROMPT,
-                "temperature": 0.2,
-                "max_output_tokens": 1200,
-            },
-        )
-        answer = extract_generation_text(response)
+        answer = ""
+        if tier == "light":
+            try:
+                answer = _generate(services, "light", prompt)
+            except CircuitOpenError:
+                raise
+            except Exception as exc:
+                logger.warning("Light LLM tier failed (%s); escalating to full model", exc)
+            if not answer:
+                count_llm_call(services, "light", "escalated")
+                tier = "full"
+        if tier == "full":
+            answer = _generate(services, "full", prompt)
+    except CircuitOpenError:
+        logger.warning("LLM circuit open — answering with fallback response")
+        count_llm_call(services, tier, "fallbacks")
+        return FALLBACK_RESPONSE, False
     except Exception as exc:
         logger.exception("LLM response generation failed")
         raise HTTPException(
@@ -162,26 +763,40 @@ def generate_voice_response(
             detail=f"LLM generation failed: {exc}",
         ) from exc
 
-    if not answer:
-        return FALLBACK_RESPONSE
-    if "nothing urgent" in answer.lower():
-        return FALLBACK_RESPONSE
-    return answer
+    if not answer or "nothing urgent" in answer.lower():
+        count_llm_call(services, tier, "fallbacks")
+        # "Nothing urgent" is Gemini's verdict on the context; an empty reply is not
+        return FALLBACK_RESPONSE, bool(answer)
+    return answer, True
 
 
 # ---------------------------------------------------------------------------
 # TTS Audio Generation
 # ---------------------------------------------------------------------------
-def generate_and_save_wav(text: str, services: AppServices) -> str:
-    """Uses Pocket TTS to generate a ``.wav`` file from *text*."""
+def synthesize_wav(services: AppServices, text: str) -> bytes:
+    """Render *text* to ``.wav`` bytes with the in-process model or the shared model server."""
+    if services.tts_client is not None:
+        return services.tts_client.synthesize(text)
+    with services.tts_lock:
+        return synthesize_wav_bytes(
+            services.tts_model,
+            services.tts_voice_state,
+            text,
+            inference_mode=services.settings.tts_inference_mode,
+        )
+
+
+def generate_and_save_wav(text: str, services: AppServices, output_filepath: str | None = None) -> str:
+    """Uses Pocket TTS (in-process or via the shared model server) to write a ``.wav`` for *text*."""
     try:
         logger.info("Generating Pocket TTS audio for: %s", text)
 
-        audio = services.tts_model.generate_audio(services.tts_voice_state, text)
+        wav_bytes = synthesize_wav(services, text)
 
-        output_filepath = f"voice_response_{uuid.uuid4().hex[:8]}.wav"
+        output_filepath = output_filepath or f"voice_response_{uuid.uuid4().hex[:8]}.wav"
 
-        scipy.io.wavfile.write(output_filepath, services.tts_model.sample_rate, audio.numpy())
+        with open(output_filepath, "wb") as f:
+            f.write(wav_bytes)
 
         logger.info("Successfully saved TTS audio to %s", output_filepath)
         return output_filepath
@@ -0,0 +1,405 @@
+"""
+Conversation-thread coalescing for notification ingest.
+
+A busy group chat posts one notification per message; stored one vector
+per message, a single conversation can fill every ``topK`` slot. With
+coalescing, messages are appended to a rolling per-thread window keyed by
+(userId, packageName, title) and the thread is stored as one document
+under a stable ID. Re-embedding is debounced: a thread is flushed once it
+has been quiet for ``debounce_s``, or at most ``max_delay_s`` after its
+first unflushed message, so a burst of N messages costs one embedding.
+
+Appended messages are journaled to SQLite before ``append`` returns and
+released once their thread has been stored, so the ingest queues can ack
+them right away; whatever is still in the journal on the next start is
+replayed into dirty threads. Flushed windows are stored alongside the
+thread document and reloaded the first time a thread is flushed again.
+
+Only chat / messaging packages are coalesced (``THREAD_PACKAGES``); other
+notifications are stored one document each, as usual. A batch that fails
+is retried thread by thread, like the ingest queue bisects its batches: a
+thread that fails on its own while others go through backs off, and after
+``max_attempts`` its journaled messages move to a dead-letter table so
+one bad conversation cannot stall the rest.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable
+
+from ingest_queue import is_transient
+from models import NotificationIngestRequest
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+# Clean threads idle for longer than this are dropped from memory
+IDLE_EVICT_S = 3600.0
+# Longest a thread that keeps failing on its own waits before its next try
+MAX_RETRY_DELAY_S = 300.0
+
+
+def thread_id_for(payload: NotificationIngestRequest) -> str:
+    key = "\x1f".join((payload.userId or "", payload.packageName, payload.title.strip()))
+    return "thread-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+@dataclass
+class ConversationThread:
+    thread_id: str
+    user_id: str | None
+    package_name: str
+    app_name: str
+    title: str
+    # Oldest first; each {"id": notificationId, "time": epoch ms, "text": ...}
+    messages: deque[dict[str, Any]]
+    loaded: bool = False
+    dirty_since: float | None = None
+    last_append_at: float = 0.0
+    version: int = 0
+    # Highest journal seq merged into ``messages``
+    journal_seq: int = 0
+    # Failed flushes of this thread on its own, and when it may be tried again
+    attempts: int = 0
+    retry_at: float = 0.0
+
+    @property
+    def latest_time(self) -> int:
+        return max((m["time"] for m in self.messages), default=0)
+
+    def merge(self, messages: list[dict[str, Any]]) -> None:
+        """Add *messages*, skipping re-posts of an identical (id, text) pair."""
+        combined = list(self.messages)
+        seen = {(m["id"], m["text"]) for m in combined}
+        for message in messages:
+            if (message["id"], message["text"]) not in seen:
+                seen.add((message["id"], message["text"]))
+                combined.append(message)
+        # Keep the newest messages when the window overflows
+        combined.sort(key=lambda m: m["time"])
+        self.messages = deque(combined, maxlen=self.messages.maxlen)
+
+
+class ThreadJournal:
+    """Appended-but-unflushed messages, so a crash before the flush loses nothing."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending_messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                thread_id TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                seq INTEGER PRIMARY KEY,
+                thread_id TEXT NOT NULL,
+                failed_at REAL NOT NULL,
+                error TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._lock = threading.Lock()
+
+    def append(self, payloads: list[NotificationIngestRequest]) -> list[int]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                seqs = [
+                    int(self._conn.execute(
+                        "INSERT INTO pending_messages (thread_id, payload) VALUES (?, ?)",
+                        (thread_id_for(p), p.model_dump_json()),
+                    ).lastrowid)
+                    for p in payloads
+                ]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return seqs
+
+    def pending(self) -> list[tuple[int, NotificationIngestRequest]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, payload FROM pending_messages ORDER BY seq").fetchall()
+        return [(seq, NotificationIngestRequest.model_validate_json(payload)) for seq, payload in rows]
+
+    def release(self, threads: list[ConversationThread]) -> None:
+        """Drop the journaled messages the stored *threads* already contain."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM pending_messages WHERE thread_id = ? AND seq <= ?",
+                [(t.thread_id, t.journal_seq) for t in threads],
+            )
+
+    def dead_letter(self, thread_id: str, error: str) -> None:
+        """Move every journaled message of *thread_id* out of the replay set."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO dead_letter (seq, thread_id, failed_at, error, payload)
+                    SELECT seq, thread_id, ?, ?, payload FROM pending_messages WHERE thread_id = ?
+                    """,
+                    (time.time(), error, thread_id),
+                )
+                self._conn.execute("DELETE FROM pending_messages WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def depth(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM pending_messages").fetchone()[0])
+
+    def dead_letter_depth(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ThreadCoalescer:
+    def __init__(
+        self,
+        load_history: Callable[[list[ConversationThread]], dict[str, list[dict[str, Any]]]],
+        store_threads: Callable[[list[ConversationThread]], None],
+        *,
+        journal: ThreadJournal | None = None,
+        packages: tuple[str, ...] = (),
+        window: int = 20,
+        debounce_s: float = 5.0,
+        max_delay_s: float = 30.0,
+        batch_size: int = 32,
+        max_attempts: int = 5,
+    ):
+        # load_history(threads) -> {thread_id: stored window}; store_threads(threads) embeds + upserts
+        self._load_history = load_history
+        self._store_threads = store_threads
+        self.window = window
+        self.debounce_s = debounce_s
+        self.max_delay_s = max_delay_s
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.journal = journal
+        # Chat / messaging apps; everything else is stored per notification
+        self.packages = frozenset(packages)
+        self._threads: dict[str, ConversationThread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="thread-coalescer", daemon=True)
+        self.messages_appended = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    def coalesces(self, payload: NotificationIngestRequest) -> bool:
+        return payload.packageName in self.packages
+
+    def start(self) -> None:
+        if self.journal is not None:
+            replayed = self.journal.pending()
+            if replayed:
+                with self._lock:
+                    for seq, payload in replayed:
+                        self._append_locked(payload, time.monotonic(), seq)
+                logger.info("Replayed %d unflushed thread messages from the journal", len(replayed))
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=30)
+        # Final drain so a clean shutdown leaves the journal empty
+        try:
+            while self._flush_due(force=True):
+                pass
+        except Exception:
+            logger.exception("Final thread flush failed; unflushed messages stay journaled")
+        if self.journal is not None:
+            self.journal.close()
+
+    def append(self, payloads: list[NotificationIngestRequest]) -> None:
+        """Durably accept *payloads*; raises if they could not be journaled."""
+        now = time.monotonic()
+        with self._lock:
+            # Journal first (under the lock, so seqs follow merge order)
+            seqs = self.journal.append(payloads) if self.journal is not None else [0] * len(payloads)
+            for payload, seq in zip(payloads, seqs):
+                self._append_locked(payload, now, seq)
+
+    def _append_locked(self, payload: NotificationIngestRequest, now: float, seq: int) -> None:
+        thread_id = thread_id_for(payload)
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            thread = ConversationThread(
+                thread_id=thread_id,
+                user_id=payload.userId,
+                package_name=payload.packageName,
+                app_name=payload.appName,
+                title=payload.title.strip(),
+                messages=deque(maxlen=self.window),
+            )
+            self._threads[thread_id] = thread
+        thread.merge([{"id": payload.notificationId, "time": payload.time, "text": payload.text}])
+        thread.last_append_at = now
+        thread.dirty_since = thread.dirty_since or now
+        thread.version += 1
+        thread.journal_seq = max(thread.journal_seq, seq)
+        self.messages_appended += 1
+
+    def _due(self, now: float, force: bool) -> list[ConversationThread]:
+        due = [
+            t for t in self._threads.values()
+            # A thread backing off waits even on shutdown; it stays journaled
+            if t.dirty_since is not None and t.retry_at <= now and (
+                force
+                or now - t.last_append_at >= self.debounce_s
+                or now - t.dirty_since >= self.max_delay_s
+            )
+        ]
+        due.sort(key=lambda t: t.dirty_since)
+        return due[: self.batch_size]
+
+    def _flush_due(self, force: bool = False) -> bool:
+        """Flush one batch of due threads; returns whether anything was flushed."""
+        with self._lock:
+            due = self._due(time.monotonic(), force)
+        if not due:
+            return False
+
+        unloaded = [t for t in due if not t.loaded]
+        history = self._load_history(unloaded) if unloaded else {}
+
+        with self._lock:
+            for thread in unloaded:
+                thread.merge(history.get(thread.thread_id, []))
+                thread.loaded = True
+            batch = [replace(t, messages=deque(t.messages, maxlen=self.window)) for t in due]
+
+        try:
+            self._store_threads(batch)
+            stored, failed = batch, []
+        except Exception as exc:
+            if is_transient(exc):
+                raise
+            if len(batch) == 1:
+                stored, failed = [], [(batch[0], exc)]
+            else:
+                stored, failed = self._store_each(batch)
+                # Every thread failing on its own is an outage, not bad threads
+                if not stored:
+                    raise
+        if self.journal is not None and stored:
+            self.journal.release(stored)
+
+        with self._lock:
+            for flushed in stored:
+                thread = self._threads.get(flushed.thread_id)
+                if thread is None:
+                    continue
+                thread.attempts = 0
+                # Appends that raced the flush keep the thread dirty
+                if thread.version == flushed.version:
+                    thread.dirty_since = None
+            if stored:
+                self.flushes += 1
+            if failed:
+                self.failed_flushes += 1
+        for flushed, exc in failed:
+            self._charge(flushed, exc)
+        return True
+
+    def _store_each(self, batch: list[ConversationThread]) -> tuple[list[ConversationThread], list[tuple[ConversationThread, Exception]]]:
+        """Store *batch* one thread at a time: the stored threads and those that failed on their own."""
+        stored: list[ConversationThread] = []
+        failed: list[tuple[ConversationThread, Exception]] = []
+        for thread in batch:
+            try:
+                self._store_threads([thread])
+            except Exception as exc:
+                if is_transient(exc):
+                    break  # the rest waits for the next round
+                failed.append((thread, exc))
+            else:
+                stored.append(thread)
+        return stored, failed
+
+    def _charge(self, flushed: ConversationThread, exc: Exception) -> None:
+        """Back a failing thread off; after ``max_attempts`` dead-letter its messages."""
+        with self._lock:
+            thread = self._threads.get(flushed.thread_id)
+            if thread is None:
+                return
+            thread.attempts += 1
+            if thread.attempts < self.max_attempts:
+                delay = min(MAX_RETRY_DELAY_S, self.debounce_s * (2 ** thread.attempts))
+                thread.retry_at = time.monotonic() + delay
+                logger.warning(
+                    "Thread %s failed to store (%s); retrying in %.0fs", thread.thread_id, exc, delay
+                )
+                return
+            logger.error(
+                "Dead-lettering thread %s after %d failed attempts: %s", thread.thread_id, thread.attempts, exc
+            )
+            # Under the lock, so no append can journal a message for it in between;
+            # the next message starts over from what is stored
+            if self.journal is not None:
+                self.journal.dead_letter(thread.thread_id, repr(exc))
+            del self._threads[thread.thread_id]
+            self.dead_lettered += 1
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - IDLE_EVICT_S
+        with self._lock:
+            idle = [k for k, t in self._threads.items() if t.dirty_since is None and t.last_append_at < cutoff]
+            for key in idle:
+                del self._threads[key]
+
+    def _run(self) -> None:
+        poll_s = min(1.0, self.debounce_s)
+        backoff_s = poll_s
+        while not self._stop.wait(backoff_s):
+            try:
+                while self._flush_due() and not self._stop.is_set():
+                    pass
+                self._evict_idle()
+                backoff_s = poll_s
+            except Exception:
+                self.failed_flushes += 1
+                backoff_s = min(backoff_s * 2, 30.0)
+                logger.exception("Thread flush failed; retrying in %.1fs", backoff_s)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            dirty = sum(1 for t in self._threads.values() if t.dirty_since is not None)
+            snapshot = {
+                "threads": len(self._threads),
+                "dirtyThreads": dirty,
+                "messagesAppended": self.messages_appended,
+                "flushes": self.flushes,
+                "failedFlushes": self.failed_flushes,
+                "deadLetteredThreads": self.dead_lettered,
+            }
+        if self.journal is not None:
+            snapshot["journaled"] = self.journal.depth()
+            snapshot["deadLettered"] = self.journal.dead_letter_depth()
+        return snapshot
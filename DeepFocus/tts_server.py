@@ -0,0 +1,193 @@
+"""
+Shared Pocket TTS model server for multi-worker deployments.
+
+Loading Pocket TTS in every uvicorn worker multiplies model RAM and
+startup time by the worker count. Instead, run one model server per box:
+
+    python tts_server.py                      # loads the model once
+    TTS_MODE=remote WORKERS=4 python main.py  # API workers synthesize over the socket
+
+Wire format (both directions over a Unix stream socket):
+  request  = 4-byte big-endian length + UTF-8 JSON ``{"text": ...}``
+  response = 1-byte status (0 ok, 1 error) + 4-byte length + payload
+             (``.wav`` bytes on success, UTF-8 error message otherwise)
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any
+
+import scipy.io.wavfile
+
+from config import Settings, load_settings
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+_HEADER = struct.Struct(">I")
+_STATUS_OK = 0
+_STATUS_ERROR = 1
+
+
+# ---------------------------------------------------------------------------
+# Model Loading / Synthesis
+# ---------------------------------------------------------------------------
+def apply_torch_threads(settings: Settings) -> None:
+    """Pin torch's intra/inter-op pools so they don't oversubscribe cores shared with uvicorn."""
+    import torch
+
+    if settings.tts_torch_threads:
+        torch.set_num_threads(settings.tts_torch_threads)
+    if settings.tts_interop_threads:
+        try:
+            torch.set_num_interop_threads(settings.tts_interop_threads)
+        except RuntimeError:
+            # Only settable before the first parallel op runs in this process
+            logger.warning("Could not set torch inter-op threads; pool already started")
+
+
+def quantize_linear_layers(tts_model: Any) -> Any:
+    """Dynamic int8 quantisation of every ``nn.Linear`` (weights int8, activations float)."""
+    import torch
+
+    if not isinstance(tts_model, torch.nn.Module):
+        logger.warning("Pocket TTS model is not an nn.Module; skipping int8 quantisation")
+        return tts_model
+    return torch.ao.quantization.quantize_dynamic(tts_model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_tts_model(settings: Settings) -> tuple[Any, Any]:
+    """Load Pocket TTS and its voice prompt; returns ``(model, voice_state)``."""
+    from pocket_tts import TTSModel
+
+    apply_torch_threads(settings)
+
+    logger.info("Loading Pocket TTS model into memory... (This happens only once)")
+    tts_model = TTSModel.load_model()
+    if settings.tts_quantize:
+        logger.info("Applying dynamic int8 quantisation to Pocket TTS linear layers")
+        tts_model = quantize_linear_layers(tts_model)
+
+    logger.info("Loading Pocket TTS voice profile: %s...", settings.tts_voice)
+    tts_voice_state = tts_model.get_state_for_audio_prompt("azelma")
+    return tts_model, tts_voice_state
+
+
+def synthesize_wav_bytes(
+    tts_model: Any,
+    tts_voice_state: Any,
+    text: str,
+    inference_mode: bool = True,
+) -> bytes:
+    import torch
+
+    # inference_mode skips autograd bookkeeping (version counters, grad tracking)
+    with torch.inference_mode(inference_mode):
+        audio = tts_model.generate_audio(tts_voice_state, text)
+    buffer = io.BytesIO()
+    scipy.io.wavfile.write(buffer, tts_model.sample_rate, audio.numpy())
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Framing Helpers
+# ---------------------------------------------------------------------------
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(size - len(chunks))
+        if not chunk:
+            raise ConnectionError("TTS socket closed mid-message")
+        chunks.extend(chunk)
+    return bytes(chunks)
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+class _TTSRequestHandler(socketserver.BaseRequestHandler):
+    server: "TTSServer"
+
+    def handle(self) -> None:
+        try:
+            (length,) = _HEADER.unpack(_recv_exact(self.request, _HEADER.size))
+            request = json.loads(_recv_exact(self.request, length))
+            # Inference is CPU-bound and the model is not re-entrant; one at a time.
+            with self.server.inference_lock:
+                payload = synthesize_wav_bytes(
+                    self.server.tts_model,
+                    self.server.tts_voice_state,
+                    request["text"],
+                    inference_mode=self.server.inference_mode,
+                )
+            status_byte = _STATUS_OK
+        except Exception as exc:
+            logger.exception("TTS server request failed")
+            payload = str(exc).encode("utf-8")
+            status_byte = _STATUS_ERROR
+
+        self.request.sendall(bytes([status_byte]) + _HEADER.pack(len(payload)) + payload)
+
+
+class TTSServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, tts_model: Any, tts_voice_state: Any, inference_mode: bool = True):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _TTSRequestHandler)
+        self.tts_model = tts_model
+        self.tts_voice_state = tts_voice_state
+        self.inference_mode = inference_mode
+        self.inference_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+class TTSClient:
+    """Talks to a ``TTSServer``; one short-lived Unix-socket connection per request."""
+
+    def __init__(self, socket_path: str, timeout_s: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+
+    def synthesize(self, text: str) -> bytes:
+        body = json.dumps({"text": text}).encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout_s)
+            sock.connect(self.socket_path)
+            sock.sendall(_HEADER.pack(len(body)) + body)
+            status_byte = _recv_exact(sock, 1)[0]
+            (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+            payload = _recv_exact(sock, length)
+
+        if status_byte != _STATUS_OK:
+            raise RuntimeError(f"TTS server error: {payload.decode('utf-8', 'replace')}")
+        return payload
+
+
+# ---------------------------------------------------------------------------
+# Entrypoint
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    settings = load_settings()
+    model, voice_state = load_tts_model(settings)
+
+    with TTSServer(settings.tts_socket_path, model, voice_state, settings.tts_inference_mode) as server:
+        logger.info("TTS model server listening on %s", settings.tts_socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(settings.tts_socket_path)
@@ -0,0 +1,330 @@
+"""
+Snapshot-backed in-memory vector store.
+
+``SnapshottingCollection`` wraps an in-memory (``EphemeralClient``) Chroma
+collection so upserts skip SQLite and disk entirely. A background thread
+persists it every N writes or every T seconds, whichever comes first, and
+the files are restored on the next startup. Writes made after the last
+flush are lost on a crash; that window is bounded by the two thresholds.
+
+A flush normally writes only a small delta segment (the rows written and
+the ids deleted since the previous flush), so its cost follows the write
+rate rather than the collection size. Once the deltas add up to a
+quarter of the base snapshot they are compacted into a new full
+``.npz``. The base records the embedding fingerprint of the collection
+and the last delta it covers, so ``restore()`` skips stale segments and
+puts the fingerprint back before the caller checks it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+PAGE_SIZE = 1000
+# Compact once the delta segments hold this fraction of the base snapshot's rows
+COMPACT_RATIO = 0.25
+
+INCLUDE = ["embeddings", "documents", "metadatas"]
+
+
+class SnapshottingCollection:
+    """Delegates to *collection*; mutations are tracked toward the next flush."""
+
+    def __init__(
+        self,
+        collection: Any,
+        snapshot_path: str,
+        *,
+        every_writes: int = 500,
+        every_seconds: float = 10.0,
+    ):
+        self._collection = collection
+        self.snapshot_path = Path(snapshot_path)
+        self.every_writes = every_writes
+        self.every_seconds = every_seconds
+        self.dirty_writes = 0
+        self.last_snapshot_at: float | None = None
+        self.last_snapshot_ms: float | None = None
+        # Changes since the last flush; a delete by filter can only be captured by a full dump
+        self._dirty_ids: set[str] = set()
+        self._deleted_ids: set[str] = set()
+        self._needs_full = True
+        # On-disk state: base snapshot size, delta segments written since it
+        self._base_rows = 0
+        self._delta_rows = 0
+        self._delta_seq = 0
+        self._dirty_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="vector-snapshot", daemon=True)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._collection, name)
+
+    # Mutations
+
+    def _mark_dirty(self, ids: list[str] | None = None, *, deleted: bool = False) -> None:
+        with self._dirty_lock:
+            if ids is None:
+                self._needs_full = True
+                self.dirty_writes += 1
+            else:
+                self.dirty_writes += len(ids)
+                if deleted:
+                    self._dirty_ids.difference_update(ids)
+                    self._deleted_ids.update(ids)
+                else:
+                    self._deleted_ids.difference_update(ids)
+                    self._dirty_ids.update(ids)
+            due = self.dirty_writes >= self.every_writes
+        if due:
+            self._wakeup.set()
+
+    def upsert(self, ids: list[str], **kwargs: Any) -> Any:
+        result = self._collection.upsert(ids=ids, **kwargs)
+        self._mark_dirty(ids)
+        return result
+
+    def add(self, ids: list[str], **kwargs: Any) -> Any:
+        result = self._collection.add(ids=ids, **kwargs)
+        self._mark_dirty(ids)
+        return result
+
+    def update(self, ids: list[str], **kwargs: Any) -> Any:
+        result = self._collection.update(ids=ids, **kwargs)
+        self._mark_dirty(ids)
+        return result
+
+    def delete(self, ids: list[str] | None = None, *args: Any, **kwargs: Any) -> Any:
+        result = self._collection.delete(ids, *args, **kwargs)
+        if ids is not None and not args and not kwargs.get("where") and not kwargs.get("where_document"):
+            self._mark_dirty(list(ids), deleted=True)
+        else:
+            self._mark_dirty()
+        return result
+
+    # Snapshot / restore
+
+    def _delta_path(self, seq: int) -> Path:
+        return self.snapshot_path.with_name(f"{self.snapshot_path.stem}.delta-{seq:06d}.npz")
+
+    def _delta_segments(self) -> list[tuple[int, Path]]:
+        pattern = re.compile(re.escape(self.snapshot_path.stem) + r"\.delta-(\d+)\.npz$")
+        segments = []
+        for path in self.snapshot_path.parent.glob(f"{self.snapshot_path.stem}.delta-*.npz"):
+            match = pattern.match(path.name)
+            if match:
+                segments.append((int(match.group(1)), path))
+        return sorted(segments)
+
+    def snapshot(self) -> None:
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            with self._dirty_lock:
+                pending, self.dirty_writes = self.dirty_writes, 0
+                dirty_ids, self._dirty_ids = self._dirty_ids, set()
+                deleted_ids, self._deleted_ids = self._deleted_ids, set()
+                full, self._needs_full = self._needs_full, False
+
+            full = full or self._delta_rows + len(dirty_ids) > max(self.every_writes, self._base_rows * COMPACT_RATIO)
+            try:
+                if full:
+                    rows = self._write_full()
+                else:
+                    rows = self._write_delta(sorted(dirty_ids), sorted(deleted_ids))
+            except Exception:
+                # Keep the changes tracked so the next attempt retries them
+                with self._dirty_lock:
+                    self.dirty_writes += pending
+                    self._dirty_ids |= dirty_ids - self._deleted_ids
+                    self._deleted_ids |= deleted_ids - self._dirty_ids
+                    self._needs_full = self._needs_full or full
+                raise
+
+            self.last_snapshot_at = time.time()
+            self.last_snapshot_ms = round((time.perf_counter() - started) * 1000, 1)
+            logger.debug(
+                "Vector %s: %d rows in %.1fms", "snapshot" if full else "delta", rows, self.last_snapshot_ms
+            )
+
+    def _write_full(self) -> int:
+        ids: list[str] = []
+        documents: list[str | None] = []
+        metadatas: list[dict | None] = []
+        embeddings: list[np.ndarray] = []
+        offset = 0
+        while True:
+            page = self._collection.get(include=INCLUDE, limit=PAGE_SIZE, offset=offset)
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+            embeddings.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+
+        matrix = np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+        records = json.dumps({
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "fingerprint": (self._collection.metadata or {}).get("embedding"),
+            # Every delta up to here is folded in; restore skips them if deleting them below fails
+            "covers": self._delta_seq,
+        })
+        _write_atomic(self.snapshot_path, embeddings=matrix, records=np.array(records))
+
+        for seq, path in self._delta_segments():
+            if seq <= self._delta_seq:
+                path.unlink(missing_ok=True)
+        self._base_rows, self._delta_rows = len(ids), 0
+        return len(ids)
+
+    def _write_delta(self, dirty_ids: list[str], deleted_ids: list[str]) -> int:
+        ids: list[str] = []
+        documents: list[str | None] = []
+        metadatas: list[dict | None] = []
+        embeddings: list[np.ndarray] = []
+        for start in range(0, len(dirty_ids), PAGE_SIZE):
+            # Rows deleted since they were marked are simply absent here
+            page = self._collection.get(ids=dirty_ids[start:start + PAGE_SIZE], include=INCLUDE)
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+            if page["ids"]:
+                embeddings.append(np.asarray(page["embeddings"], dtype=np.float32))
+
+        matrix = np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+        records = json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas, "deleted": deleted_ids})
+        seq = self._delta_seq + 1
+        _write_atomic(self._delta_path(seq), embeddings=matrix, records=np.array(records))
+        self._delta_seq = seq
+        self._delta_rows += len(ids) + len(deleted_ids)
+        return len(ids) + len(deleted_ids)
+
+    def restore(self) -> int:
+        """
+        Load the base snapshot and any newer delta segments.
+
+        The collection's ``embedding`` metadata is set to the fingerprint the
+        snapshot was taken with (or cleared, for snapshots from before it was
+        recorded) so ``stamp_embedding_fingerprint`` judges the restored
+        vectors, not the empty collection they were loaded into.
+        """
+        covers = 0
+        fingerprint = None
+        if self.snapshot_path.exists():
+            with np.load(self.snapshot_path) as data:
+                matrix = data["embeddings"]
+                records = json.loads(str(data["records"]))
+            self._upsert_records(matrix, records)
+            self._base_rows = len(records["ids"])
+            covers = int(records.get("covers", 0))
+            fingerprint = records.get("fingerprint")
+
+        applied = 0
+        self._delta_seq = covers
+        for seq, path in self._delta_segments():
+            if seq <= covers:
+                continue
+            with np.load(path) as data:
+                matrix = data["embeddings"]
+                records = json.loads(str(data["records"]))
+            self._upsert_records(matrix, records)
+            if records["deleted"]:
+                self._collection.delete(ids=records["deleted"])
+            self._delta_seq = seq
+            applied += 1
+
+        if self.snapshot_path.exists():
+            built_with = dict(self._collection.metadata or {})
+            # Chroma refuses to re-set the distance function
+            built_with.pop("hnsw:space", None)
+            if fingerprint:
+                built_with["embedding"] = fingerprint
+            else:
+                built_with.pop("embedding", None)
+            self._collection.modify(metadata=built_with)
+
+        # Fold what was replayed into a fresh base on the next flush
+        self._needs_full = applied > 0 or not self.snapshot_path.exists()
+        count = self._collection.count()
+        logger.info(
+            "Restored %d vectors from snapshot %s (+%d delta segments)", count, self.snapshot_path, applied
+        )
+        return count
+
+    def _upsert_records(self, matrix: np.ndarray, records: dict[str, Any]) -> None:
+        ids = records["ids"]
+        for start in range(0, len(ids), PAGE_SIZE):
+            end = start + PAGE_SIZE
+            self._collection.upsert(
+                ids=ids[start:end],
+                embeddings=matrix[start:end].tolist(),
+                documents=records["documents"][start:end],
+                metadatas=records["metadatas"][start:end],
+            )
+
+    # Background loop
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=30)
+        if self.dirty_writes:
+            self.snapshot()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.every_seconds)
+            self._wakeup.clear()
+            if self._stop.is_set() or not self.dirty_writes:
+                continue
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("Vector snapshot failed; will retry")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "unsnapshottedWrites": self.dirty_writes,
+            "lastSnapshotAt": self.last_snapshot_at,
+            "lastSnapshotMs": self.last_snapshot_ms,
+            "baseRows": self._base_rows,
+            "deltaRows": self._delta_rows,
+        }
+
+
+def _write_atomic(path: Path, **arrays: np.ndarray) -> None:
+    """Write an ``.npz`` so a crash leaves either the old file or the complete new one."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Make the rename itself durable
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
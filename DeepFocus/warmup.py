@@ -0,0 +1,81 @@
+"""
+Startup warm-up for Gemini connections and Pocket TTS.
+
+The first request after a deploy pays for TLS setup with Gemini, lazy
+client initialisation, and first-run TTS inference. ``run_warmup`` makes
+two tiny Gemini calls per model (each one is billed) and renders the TTS
+phrase twice — the first ("cold") run absorbs the one-off cost, the
+second ("warm") shows steady-state latency, so the report tells how much
+the warm-up actually saved. Off by default (``WARMUP_MODE``).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable
+
+from config import normalize_model_name
+from resilience import ResilientCaller
+from services import AppServices, synthesize_wav
+
+logger = logging.getLogger("chronoforge-screenless-focus")
+
+WARMUP_TEXT = "Nothing urgent right now. Keep focusing."
+# Cold pays for TLS + lazy init; warm is the steady-state round trip to compare it with
+GEMINI_PHASES = ("coldMs", "warmMs")
+
+
+def _time_runs(name: str, fn: Callable[[], Any], phases: tuple[str, ...]) -> dict[str, Any]:
+    timings: dict[str, Any] = {}
+    for phase in phases:
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as exc:
+            logger.warning("Warm-up step %s failed: %s", name, exc)
+            timings["error"] = str(exc)
+            break
+        timings[phase] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+
+def run_warmup(services: AppServices) -> dict[str, Any]:
+    """
+    Prime Gemini and TTS; returns per-step timings.
+
+    Gemini calls go through the resilience callers so each one is bounded
+    by ``GEMINI_TIMEOUT_SECONDS`` and respects an open breaker.
+    """
+    settings = services.settings
+    models = services.genai_client.models
+    started = time.perf_counter()
+
+    def generate(caller: ResilientCaller, model: str) -> Any:
+        return caller.call(
+            models.generate_content,
+            model=normalize_model_name(model),
+            contents="Reply with OK.",
+            config={"max_output_tokens": 8, "temperature": 0.0},
+        )
+
+    report: dict[str, Any] = {
+        "embed": _time_runs("embed", lambda: services.embed_caller.call(
+            models.embed_content,
+            model=normalize_model_name(settings.gemini_embedding_model),
+            contents=[WARMUP_TEXT],
+            config={"task_type": "RETRIEVAL_QUERY"},
+        ), GEMINI_PHASES),
+        "llm": _time_runs("llm", lambda: generate(services.llm_caller, settings.gemini_llm_model), GEMINI_PHASES),
+        "llmLight": _time_runs("llmLight", lambda: generate(
+            services.llm_light_caller or services.llm_caller, settings.gemini_llm_light_model,
+        ), GEMINI_PHASES) if settings.gemini_llm_light_model else {},
+        "tts": _time_runs("tts", lambda: synthesize_wav(services, WARMUP_TEXT), ("coldMs", "warmMs")),
+    }
+    report["totalMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+    logger.info(
+        "Warm-up complete in %.0fms | embed=%s | llm=%s | llmLight=%s | tts=%s",
+        report["totalMs"], report["embed"], report["llm"], report["llmLight"], report["tts"],
+    )
+    return report
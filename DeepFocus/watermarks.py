@@ -0,0 +1,64 @@
+"""
+Per-user "last answered" watermarks for incremental agent queries.
+
+In ``sinceLastAsked`` mode an agent query takes the user's oldest
+notifications after their watermark (up to ``topK``), and the watermark
+advances to the newest one of the unbroken oldest-first run that went
+into a successful answer, so a backlog larger than ``topK`` or the
+context budget drains over several questions and nothing is marked
+heard that Gemini never saw. Callers without a ``userId`` have no
+watermark. Repeated "anything new?" questions then pay only for the
+delta — and when there is none, they are answered without retrieval or
+Gemini at all.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class WatermarkStore:
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                user_id TEXT PRIMARY KEY,
+                watermark_ms INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> int:
+        """Epoch ms of the newest notification already answered (0 if never asked)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark_ms FROM watermarks WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def advance(self, user_id: str, watermark_ms: int) -> None:
+        """Move the watermark forward; never backwards, even across racing workers."""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO watermarks (user_id, watermark_ms, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    watermark_ms = MAX(watermark_ms, excluded.watermark_ms),
+                    updated_at = excluded.updated_at
+                """,
+                (user_id, watermark_ms, time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,116 @@
+"""
+Wire-format negotiation for DeepFocus HTTP routes.
+
+JSON bodies are encoded with orjson (``ORJSONResponse`` is the app-wide
+default response class). Clients that send ``Content-Type:
+application/msgpack`` have their body unpacked straight into the
+endpoint's model, and clients that send ``Accept: application/msgpack``
+get the endpoint's return value packed directly — neither direction goes
+through JSON. Endpoints that build their own response use
+``NegotiatedResponse`` so it can be packed too. Error responses from the
+global exception handlers stay JSON.
+
+``Prefer: return=minimal`` (RFC 7240) — or ``INGEST_RESPONSE_MODE=minimal``
+— trims ingest responses to ``status`` + ``notificationId``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Coroutine
+
+import msgpack
+import orjson
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _media_type(header: str) -> str:
+    return header.split(";", 1)[0].strip().lower()
+
+
+def accepts_msgpack(request: Request) -> bool:
+    return any(_media_type(part) in MSGPACK_MEDIA_TYPES for part in request.headers.get("accept", "").split(","))
+
+
+def prefers_minimal(request: Request) -> bool:
+    prefer = request.headers.get("prefer", "").replace(" ", "").lower()
+    return "return=minimal" in prefer.split(",")
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content)
+
+
+class NegotiatedResponse(ORJSONResponse):
+    """An ``ORJSONResponse`` that keeps its content, so msgpack clients get it packed instead."""
+
+    def __init__(self, content: Any, *args: Any, **kwargs: Any):
+        self.content = content
+        super().__init__(content, *args, **kwargs)
+
+
+class MsgPackRequest(Request):
+    """Hands a msgpack body to FastAPI as the already-decoded document."""
+
+    def __init__(self, request: Request):
+        scope = request.scope
+        self.is_msgpack = _media_type(request.headers.get("content-type", "")) in MSGPACK_MEDIA_TYPES
+        if self.is_msgpack:
+            # FastAPI only asks for .json() on bodies it believes are JSON
+            headers = [(k, v) for k, v in scope["headers"] if k != b"content-type"]
+            scope = {**scope, "headers": [*headers, (b"content-type", b"application/json")]}
+        super().__init__(scope, request.receive)
+
+    async def json(self) -> Any:
+        if not self.is_msgpack:
+            return await super().json()
+        if not hasattr(self, "_json"):
+            try:
+                self._json = msgpack.unpackb(await self.body())
+            except Exception as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Malformed msgpack body: {exc}",
+                ) from exc
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """Route class that accepts msgpack request bodies and can answer in msgpack."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        as_json = super().get_route_handler()
+        # A second handler whose serialized return value is packed, not JSON-encoded
+        response_class, self.response_class = self.response_class, MsgPackResponse
+        try:
+            as_msgpack = super().get_route_handler()
+        finally:
+            self.response_class = response_class
+
+        async def handler(request: Request) -> Response:
+            if not accepts_msgpack(request):
+                return await as_json(MsgPackRequest(request))
+
+            response = await as_msgpack(MsgPackRequest(request))
+            if isinstance(response, NegotiatedResponse):
+                response = MsgPackResponse(
+                    response.content,
+                    status_code=response.status_code,
+                    headers={
+                        k: v for k, v in response.headers.items()
+                        if k.lower() not in ("content-length", "content-type")
+                    },
+                    background=response.background,
+                )
+            if isinstance(response, MsgPackResponse):
+                response.headers["Vary"] = "Accept"
+            return response
+
+        return handler
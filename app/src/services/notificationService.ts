@@ -1,4 +1,5 @@
 import { API_CONFIG } from '../config/apiConfig';
+import { useOnboardingStore } from '../store/useOnboardingStore';
 
 interface NotificationData {
     packageName: string;
@@ -8,15 +9,22 @@ interface NotificationData {
     time: number;
     notificationId: number;
     isOngoing: boolean;
+    userId?: string;
 }
 
+// Same id the planner uses (ProfilingFlow): the email's local part
+export const currentUserId = (): string | undefined => {
+    const { userEmail } = useOnboardingStore.getState();
+    return userEmail ? userEmail.split('@')[0] : undefined;
+};
+
 class NotificationService {
     async ingest(notification: NotificationData): Promise<void> {
         try {
             const response = await fetch(`${API_CONFIG.BASE_URL}/notifications/ingest`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(notification),
+                body: JSON.stringify({ userId: currentUserId(), ...notification }),
             });
 
             const data = await response.json();
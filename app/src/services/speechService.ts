@@ -2,6 +2,7 @@ import { NativeModules, DeviceEventEmitter, PermissionsAndroid, Platform } from
 import type { EmitterSubscription } from 'react-native';
 import { audioPlayerService } from './audioPlayerService';
 import { API_CONFIG } from '../config/apiConfig';
+import { currentUserId } from './notificationService';
 
 const { SpeechToTextModule } = NativeModules;
 
@@ -136,7 +137,7 @@ class SpeechService {
             const response = await fetch(`${API_CONFIG.BASE_URL}/api/agent/query`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ query }),
+                body: JSON.stringify({ query, userId: currentUserId() }),
             });
 
             const data = await response.json();
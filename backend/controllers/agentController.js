@@ -1,7 +1,7 @@
 const { queryAgent, saveWavToTemp } = require("../services/aiServerService");
 
 const handleQuery = async (req, res) => {
-    const { query } = req.body;
+    const { query, userId } = req.body;
 
     if (!query || typeof query !== "string") {
         return res.status(400).json({ status: "error", message: "Missing 'query' field" });
@@ -11,7 +11,7 @@ const handleQuery = async (req, res) => {
 
     try {
         // Get response from AI server
-        const result = await queryAgent(query);
+        const result = await queryAgent(query, userId);
 
         console.log(result)
 
@@ -22,6 +22,13 @@ const handleQuery = async (req, res) => {
             console.log(`   🔊 Audio URL: ${audioUrl}`);
             console.log("   ─────────────────────────────────");
             res.json({ status: "ok", audioUrl });
+        } else if (result.type === "json") {
+            // Two-phase reply: text now, audio fetched from the job when the app plays it
+            const audioUrl = `http://${req.headers.host}/api/audio/jobs/${result.data.audioJobId}`;
+            console.log(`   💬 AI responded: ${result.data.response}`);
+            console.log(`   🔊 Audio job URL: ${audioUrl}`);
+            console.log("   ─────────────────────────────────");
+            res.json({ status: "ok", text: result.data.response, audioUrl });
         } else {
             // AI server returned text/JSON instead of audio
             console.log(`   💬 AI responded with text: ${result.text}`);
@@ -66,6 +66,14 @@ const ingestNotification = async (req, res) => {
             console.log(`   🔊 Audio URL: ${audioUrl}`);
             console.log("   ─────────────────────────────────");
             return res.json({ status: "ok", audioUrl });
+        } else if (result.type === "json" && result.data && result.data.audioJobId) {
+            // Missed call — audio renders asynchronously on the AI server
+            const host = req.headers.host || `localhost:${process.env.PORT || 5000}`;
+            const audioUrl = `http://${host}/api/audio/jobs/${result.data.audioJobId}`;
+
+            console.log(`   🔊 AI queued audio: ${audioUrl}`);
+            console.log("   ─────────────────────────────────");
+            return res.json({ status: "ok", audioUrl });
         } else {
             console.log("   ✅ Forwarded to AI server");
             console.log("   ─────────────────────────────────");
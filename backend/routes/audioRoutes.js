@@ -1,7 +1,23 @@
 const express = require("express");
 const path = require("path");
+const { Readable } = require("stream");
+const { fetchAudioJob } = require("../services/aiServerService");
 const router = express.Router();
 
+// GET — proxy an async DeepFocus audio job (agent replies, missed calls)
+router.get("/jobs/:jobId", async (req, res) => {
+    try {
+        const upstream = await fetchAudioJob(req.params.jobId);
+        res.status(upstream.status);
+        res.set("Content-Type", upstream.headers.get("content-type") || "application/octet-stream");
+        if (!upstream.body) return res.end();
+        Readable.fromWeb(upstream.body).pipe(res);
+    } catch (err) {
+        console.error(`   ❌ Audio job fetch failed: ${err.message}`);
+        res.status(502).json({ status: "error", message: "Audio job unavailable" });
+    }
+});
+
 // GET — serve saved WAV files
 router.get("/:filename", (req, res) => {
     const { filename } = req.params;
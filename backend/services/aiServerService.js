@@ -1,9 +1,134 @@
 const path = require("path");
 const fs = require("fs");
+const WebSocket = require("ws");
 
 const AI_BASE_URL = () =>
     `http://${process.env.AI_SERVER_HOST}:${process.env.AI_SERVER_PORT}`;
 
+const AI_STREAM_URL = () =>
+    `ws://${process.env.AI_SERVER_HOST}:${process.env.AI_SERVER_PORT}/api/v1/notifications/stream`;
+
+const ACK_TIMEOUT_MS = 30 * 1000;
+
+// DeepFocus buckets, shards and watermarks by userId. The app sends it;
+// AI_DEFAULT_USER_ID covers single-user installs whose senders (the native
+// notification listener) don't know it.
+const resolveUserId = (userId) => {
+    const resolved = userId || process.env.AI_DEFAULT_USER_ID;
+    return resolved ? String(resolved) : undefined;
+};
+
+// ── Persistent ingest stream (AI_INGEST_TRANSPORT=ws) ────────────────
+let ingestStream = null; // Promise<WebSocket> while connecting / connected
+let streamCredits = 0;
+const sendQueue = []; // serialized payloads waiting for a credit
+const pendingAcks = new Map(); // notificationId → [{ resolve, reject, timer }]
+
+function takePending(notificationId) {
+    const waiters = pendingAcks.get(notificationId);
+    if (!waiters || waiters.length === 0) return null;
+    const waiter = waiters.shift();
+    if (waiters.length === 0) pendingAcks.delete(notificationId);
+    clearTimeout(waiter.timer);
+    return waiter;
+}
+
+// Used for nacks that carry no notificationId (e.g. a line that wasn't JSON)
+function takeOldestPending() {
+    for (const notificationId of pendingAcks.keys()) {
+        return takePending(notificationId);
+    }
+    return null;
+}
+
+function flushSendQueue(ws) {
+    while (streamCredits > 0 && sendQueue.length > 0) {
+        streamCredits -= 1;
+        ws.send(sendQueue.shift());
+    }
+}
+
+function failAllPending(err) {
+    for (const waiters of pendingAcks.values()) {
+        for (const waiter of waiters) {
+            clearTimeout(waiter.timer);
+            waiter.reject(err);
+        }
+    }
+    pendingAcks.clear();
+    sendQueue.length = 0;
+}
+
+function handleStreamMessage(ws, data) {
+    const message = JSON.parse(data.toString());
+    streamCredits += message.credits || 0;
+
+    if (message.type === "ack") {
+        const waiter = takePending(message.notificationId);
+        if (waiter) waiter.resolve({ type: "json", data: message });
+    } else if (message.type === "nack") {
+        const waiter = message.notificationId ? takePending(message.notificationId) : takeOldestPending();
+        const detail = typeof message.error === "string" ? message.error : JSON.stringify(message.error);
+        const err = new Error(`AI server error: ${message.status} ${detail}`);
+        err.fromServer = true;
+        if (waiter) waiter.reject(err);
+        else console.error(`   ⚠️  AI stream nack: ${message.status} ${detail}`);
+    }
+
+    flushSendQueue(ws);
+}
+
+const connectIngestStream = () => {
+    if (ingestStream) return ingestStream;
+
+    ingestStream = new Promise((resolve, reject) => {
+        const ws = new WebSocket(AI_STREAM_URL());
+        let ready = false;
+
+        ws.on("message", (data) => {
+            if (!ready) {
+                ready = true;
+                streamCredits = JSON.parse(data.toString()).credits || 1;
+                console.log(`   🔌 AI ingest stream connected (${streamCredits} credits)`);
+                return resolve(ws);
+            }
+            handleStreamMessage(ws, data);
+        });
+
+        const teardown = (err) => {
+            ingestStream = null;
+            streamCredits = 0;
+            failAllPending(err);
+            if (!ready) reject(err);
+        };
+        ws.on("close", () => teardown(new Error("AI ingest stream closed")));
+        ws.on("error", (err) => teardown(err));
+    });
+
+    return ingestStream;
+};
+
+const forwardNotificationStream = async (payload) => {
+    const ws = await connectIngestStream();
+
+    return new Promise((resolve, reject) => {
+        const waiter = { resolve, reject };
+        waiter.timer = setTimeout(() => {
+            const waiters = pendingAcks.get(payload.notificationId) || [];
+            const idx = waiters.indexOf(waiter);
+            if (idx !== -1) waiters.splice(idx, 1);
+            reject(new Error("AI stream ack timed out"));
+        }, ACK_TIMEOUT_MS);
+
+        const waiters = pendingAcks.get(payload.notificationId) || [];
+        waiters.push(waiter);
+        pendingAcks.set(payload.notificationId, waiters);
+
+        sendQueue.push(JSON.stringify(payload));
+        flushSendQueue(ws);
+    });
+};
+
 /**
  * Forward notification data to the external AI server.
  * Only sends the fields the AI server expects.
@@ -23,10 +148,23 @@ const forwardNotification = async (notification) => {
         notificationId: String(notification.notificationId || ""),
         isOngoing: notification.isOngoing || false,
     };
+    const userId = resolveUserId(notification.userId || notification.user_id);
+    if (userId) payload.userId = userId;
+
+    if (process.env.AI_INGEST_TRANSPORT === "ws") {
+        try {
+            return await forwardNotificationStream(payload);
+        } catch (err) {
+            if (err.fromServer) throw err;
+            // Stream unavailable — fall back to a one-off HTTP request
+            console.error(`   ⚠️  AI stream failed, using HTTP: ${err.message}`);
+        }
+    }
 
     const response = await fetch(url, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        // storedDocument is never used here; skip echoing it back
+        headers: { "Content-Type": "application/json", Prefer: "return=minimal" },
         body: JSON.stringify(payload),
     });
 
@@ -53,14 +191,15 @@ const forwardNotification = async (notification) => {
  * Send speech query to AI server.
  * Returns { type: 'audio', buffer } or { type: 'text', text }.
  */
-const queryAgent = async (query) => {
+const queryAgent = async (query, userId) => {
     const url = `${AI_BASE_URL()}/api/v1/agent/query`;
     console.log(`   ➡️  Querying AI: ${url}`);
 
     const response = await fetch(url, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ query }),
+        // Two-phase: text comes back as soon as the LLM finishes, audio is a job
+        body: JSON.stringify({ query, userId: resolveUserId(userId), responseMode: "json" }),
     });
 
     if (!response.ok) {
@@ -80,6 +219,7 @@ const queryAgent = async (query) => {
         const text = await response.text();
         try {
             const json = JSON.parse(text);
+            if (json.audioJobId) return { type: "json", data: json };
             return { type: "text", text: json.response || json.text || json.message || text };
         } catch {
             return { type: "text", text };
@@ -87,6 +227,15 @@ const queryAgent = async (query) => {
     }
 };
 
+/**
+ * Fetch a DeepFocus audio job (waits server-side until it is rendered).
+ * Returns the upstream fetch Response so callers can stream the body.
+ */
+const fetchAudioJob = async (jobId) => {
+    const url = `${AI_BASE_URL()}/api/v1/audio/${encodeURIComponent(jobId)}`;
+    return fetch(url);
+};
+
 /**
  * Save WAV buffer to temp file — returns filename.
  */
@@ -113,5 +262,6 @@ const saveWavToTemp = (wavBuffer) => {
 module.exports = {
     forwardNotification,
     queryAgent,
+    fetchAudioJob,
     saveWavToTemp,
 };
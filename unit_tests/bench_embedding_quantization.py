@@ -0,0 +1,146 @@
+"""
+Recall-vs-size benchmark for DeepFocus embedding storage.
+
+Compares truncated (Matryoshka) dimensionalities and float32 / float16 /
+int8 encodings against full-size float32 brute-force search.
+
+    python bench_embedding_quantization.py                # synthetic corpus
+    python bench_embedding_quantization.py --gemini       # real Gemini embeddings (needs GEMINI_API_KEY)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "DeepFocus"))
+from embedding_codec import STORAGE_DTYPES, decode, encode, truncate  # noqa: E402
+
+FULL_DIM = 3072
+DIMS = [3072, 1536, 768, 256, 128]
+
+APPS = ["WhatsApp", "Gmail", "Slack", "Instagram", "Amazon", "Google Classroom", "Phone"]
+SENDERS = ["Mom", "Aradhya", "Prof. Sharma", "CS301 Group", "HR Team", "Rahul", "Delivery"]
+MESSAGES = [
+    "Call me when you're free, it's urgent",
+    "Assignment 3 deadline moved to Friday",
+    "Your OTP is 482913, do not share it",
+    "Lab is cancelled today",
+    "Your order has been shipped",
+    "Can you send the notes from today's lecture?",
+    "Meeting moved to 5pm",
+    "Happy birthday!!",
+    "Quiz tomorrow covers chapters 4 and 5",
+    "Rent is due on the 1st",
+]
+QUERIES = [
+    "Is there anything urgent?",
+    "Did anyone message me about assignments?",
+    "Any messages from my family?",
+    "Did my professor say anything?",
+    "Any updates on deliveries?",
+]
+
+
+def synthetic_corpus(n: int, n_queries: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered vectors whose variance decays with dimension, like MRL embeddings."""
+    rng = np.random.default_rng(seed)
+    decay = np.exp(-np.arange(FULL_DIM) / 600.0).astype(np.float32)
+    centers = rng.standard_normal((max(8, n // 20), FULL_DIM)).astype(np.float32) * decay
+    labels = rng.integers(0, len(centers), n)
+    corpus = centers[labels] + 0.35 * rng.standard_normal((n, FULL_DIM)).astype(np.float32) * decay
+    picks = rng.integers(0, n, n_queries)
+    queries = corpus[picks] + 0.25 * rng.standard_normal((n_queries, FULL_DIM)).astype(np.float32) * decay
+    return truncate(corpus, FULL_DIM), truncate(queries, FULL_DIM)
+
+
+def gemini_corpus(n: int, n_queries: int) -> tuple[np.ndarray, np.ndarray]:
+    from google import genai
+
+    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    model = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+    rnd = random.Random(7)
+    docs = [
+        f"{rnd.choice(APPS)} message from {rnd.choice(SENDERS)}: {rnd.choice(MESSAGES)}"
+        for _ in range(n)
+    ]
+
+    def embed(texts: list[str], task_type: str) -> np.ndarray:
+        rows = []
+        for i in range(0, len(texts), 100):
+            response = client.models.embed_content(
+                model=model, contents=texts[i:i + 100], config={"task_type": task_type}
+            )
+            rows.extend(e.values for e in response.embeddings)
+        return truncate(np.asarray(rows, dtype=np.float32), FULL_DIM)
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(n_queries)]
+    return embed(docs, "RETRIEVAL_DOCUMENT"), embed(queries, "RETRIEVAL_QUERY")
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    idx = np.argpartition(-scores, kth=min(k, scores.shape[1] - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def run(corpus: np.ndarray, queries: np.ndarray, k: int) -> list[dict]:
+    truth = top_k(corpus, queries, k)
+    results = []
+    for dim in DIMS:
+        docs_d = truncate(corpus, dim)
+        queries_d = truncate(queries, dim)
+        for dtype in STORAGE_DTYPES:
+            encoded = encode(docs_d, dtype)
+            started = time.perf_counter()
+            found = top_k(decode(encoded), queries_d, k)
+            elapsed = time.perf_counter() - started
+            results.append({
+                "dim": dim,
+                "dtype": dtype,
+                "bytesPerVector": encoded.nbytes / len(corpus),
+                "recallAtK": round(recall_at_k(truth, found), 4),
+                "queryMsPerQuery": round(elapsed * 1000 / len(queries), 3),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--gemini", action="store_true", help="embed a synthetic notification corpus with Gemini")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.gemini:
+        corpus, queries = gemini_corpus(args.corpus_size, args.queries)
+    else:
+        corpus, queries = synthetic_corpus(args.corpus_size, args.queries)
+
+    results = run(corpus, queries, args.k)
+
+    print(f"📦 corpus={len(corpus)} queries={len(queries)} k={args.k}\n")
+    print(f"{'dim':>5} {'dtype':>8} {'bytes/vec':>10} {'recall@k':>9} {'ms/query':>9}")
+    for r in results:
+        print(f"{r['dim']:>5} {r['dtype']:>8} {r['bytesPerVector']:>10.0f} {r['recallAtK']:>9.4f} {r['queryMsPerQuery']:>9.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
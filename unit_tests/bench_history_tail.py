@@ -0,0 +1,99 @@
+"""
+DayPlanner ``get_recent_history`` latency and memory vs. history length.
+
+Writes a synthetic history_<user>.jsonl per size and compares the original
+full-file read (``get_recent_history_full_scan``) with the backwards
+block read, both cold and with the cached tail offset, and with the
+SQLite store. Peak Python allocations come from tracemalloc.
+
+    python bench_history_tail.py --sizes 30 365 3650 36500 --json history_tail.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "DayPlanner"))
+from history_manager import HistoryManager, SqliteHistoryManager  # noqa: E402
+
+
+def make_plan(day: int) -> dict:
+    """Roughly the size of a real generated routine (~2 KB of JSON)."""
+    return {
+        "date": f"day-{day:06d}",
+        "blocks": [
+            {"start": f"{h:02d}:00", "end": f"{h:02d}:50", "task": f"Task {h} for day {day}", "category": "study"}
+            for h in range(7, 22)
+        ],
+        "notes": "Focus on the hardest subject first; keep breaks short.",
+    }
+
+
+def measure(fn, days: int, repeats: int) -> dict:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(days)
+        latencies.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(days)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50Ms": round(statistics.median(latencies) * 1000, 3),
+        "peakKb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 365, 3650, 36500])
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    results = []
+    print(f"{'entries':>8} {'method':<12} {'p50 ms':>9} {'peak KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for size in args.sizes:
+            user_id = f"bench{size}"
+            jsonl = HistoryManager(user_id)
+            with open(jsonl.file_path, "w") as f:
+                for day in range(size):
+                    f.write(json.dumps({"date": f"day-{day:06d}", "generated_plan": make_plan(day), "completion": None}) + "\n")
+            sqlite = SqliteHistoryManager(user_id, db_path=os.path.join(tmp, "history.sqlite3"))
+            sqlite.import_jsonl(jsonl.file_path)
+
+            def tail_cold(days):
+                HistoryManager._tail_offsets.clear()
+                return jsonl.get_recent_history(days)
+
+            methods = {
+                "full_scan": jsonl.get_recent_history_full_scan,
+                "tail_cold": tail_cold,
+                "tail_cached": jsonl.get_recent_history,
+                "sqlite": sqlite.get_recent_history,
+            }
+            expected = jsonl.get_recent_history_full_scan(args.days)
+            for name, fn in methods.items():
+                assert fn(args.days) == expected, name
+                row = {"entries": size, "method": name, **measure(fn, args.days, args.repeats)}
+                results.append(row)
+                print(f"{size:>8} {name:<12} {row['p50Ms']:>9.3f} {row['peakKb']:>9.1f}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+HNSW recall / latency benchmark for the DeepFocus Chroma collection.
+
+Builds an in-memory Chroma collection from a synthetic notification
+corpus at several sizes, for each (M, construction_ef, search_ef)
+combination, and reports recall@k against exact brute-force cosine
+search together with insert and query latency. Use the results to pick
+HNSW_M / HNSW_CONSTRUCTION_EF / HNSW_SEARCH_EF for your data volume.
+
+    python bench_hnsw.py --sizes 1000 10000 50000 --json hnsw.json
+    python bench_hnsw.py --m 16 32 --construction-ef 100 --search-ef 10 50 100
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_embedding_quantization import recall_at_k, top_k  # noqa: E402
+
+INSERT_BATCH = 500
+
+
+def synthetic_corpus(n: int, n_queries: int, dim: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    """Unit vectors clustered like notifications: many near-duplicates per sender/topic."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 20), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), n)
+    corpus = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    picks = rng.integers(0, n, n_queries)
+    queries = corpus[picks] + 0.25 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return corpus, queries
+
+
+def run_config(client, corpus, queries, truth, k: int, m: int, construction_ef: int, search_ef: int) -> dict:
+    collection = client.create_collection(
+        name=f"bench-{uuid.uuid4().hex[:12]}",
+        metadata={
+            "hnsw:space": "cosine",
+            "hnsw:M": m,
+            "hnsw:construction_ef": construction_ef,
+            "hnsw:search_ef": search_ef,
+        },
+    )
+    try:
+        started = time.perf_counter()
+        for start in range(0, len(corpus), INSERT_BATCH):
+            batch = corpus[start:start + INSERT_BATCH]
+            collection.add(
+                ids=[str(i) for i in range(start, start + len(batch))],
+                embeddings=batch.tolist(),
+            )
+        insert_s = time.perf_counter() - started
+
+        latencies = []
+        found = []
+        for query in queries:
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - started)
+            ids = [int(i) for i in result["ids"][0]]
+            found.append(ids + [-1] * (k - len(ids)))
+    finally:
+        client.delete_collection(collection.name)
+
+    return {
+        "size": len(corpus),
+        "M": m,
+        "constructionEf": construction_ef,
+        "searchEf": search_ef,
+        "recallAtK": round(recall_at_k(truth, np.asarray(found)), 4),
+        "insertMsPer1k": round(insert_s * 1000 * 1000 / len(corpus), 1),
+        "queryP50Ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "queryP95Ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=768, help="embedding width (EMBEDDING_DIMENSIONALITY)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    client = chromadb.EphemeralClient()
+    results = []
+    print(f"{'size':>7} {'M':>3} {'c_ef':>5} {'s_ef':>5} {'recall@k':>9} {'ins ms/1k':>10} {'q p50':>8} {'q p95':>8}")
+    for size in args.sizes:
+        corpus, queries = synthetic_corpus(size, args.queries, args.dim)
+        truth = top_k(corpus, queries, args.k)
+        for m, construction_ef, search_ef in itertools.product(args.m, args.construction_ef, args.search_ef):
+            row = run_config(client, corpus, queries, truth, args.k, m, construction_ef, search_ef)
+            results.append(row)
+            print(
+                f"{size:>7} {m:>3} {construction_ef:>5} {search_ef:>5} {row['recallAtK']:>9.4f} "
+                f"{row['insertMsPer1k']:>10.1f} {row['queryP50Ms']:>8.3f} {row['queryP95Ms']:>8.3f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Non-interactive TTS real-time-factor regression benchmark.
+
+Synthesises a fixed corpus of the responses DeepFocus actually speaks
+(fallback lines, missed-call announcements, 2-sentence summaries) for
+every (torch threads, voice, quantization, inference mode) combination and
+reports, per combination:
+
+  * RTF            synthesis time / audio duration (< 1 = faster than real time)
+  * TTFC           time to the first audio chunk, i.e. when playback could start
+  * peak RSS       high-water mark of the process, model load included
+  * Δspectrum      spectral distance to the fp32 / inference-mode run of the
+                   same voice, a quality proxy for the faster profiles
+
+Each combination runs in a fresh process so thread pools and RSS do not
+leak between runs. Pass ``--baseline`` with an earlier ``--json`` output
+to exit non-zero when RTF or TTFC regresses beyond ``--max-regression``.
+
+    python bench_tts_rtf.py --threads 1 2 4 --voices azelma alba --json tts_rtf.json
+    python bench_tts_rtf.py --baseline tts_rtf.json --max-regression 0.15
+    python bench_tts_rtf.py --profiles --threads 1 2 4   # TTS_QUANTIZE / TTS_INFERENCE_MODE sweep
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+CORPUS = {
+    "fallback": [
+        "Nothing urgent right now. Keep focusing.",
+    ],
+    "missed_call": [
+        "You received a missed call from Mom",
+        "You received a missed call from an unknown caller",
+    ],
+    "summary": [
+        "Prof. Sharma moved the quiz to Friday. Your lab partner also asked for yesterday's notes.",
+        "The Family group is planning dinner at eight, and Rahul asked if you can pick up the cake.",
+        "Your Amazon order was delivered. The bank sent a one-time password that expires in ten minutes.",
+    ],
+}
+
+
+def spectral_envelope_db(audio, n_fft: int = 1024):
+    """Time-averaged log power spectrum; length-independent so sampled outputs compare."""
+    import numpy as np
+
+    frames = np.lib.stride_tricks.sliding_window_view(audio, n_fft)[:: n_fft // 2]
+    power = np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1)) ** 2
+    return 10 * np.log10(power.mean(axis=0) + 1e-10)
+
+
+def timed_synthesis(model, voice_state, text: str) -> tuple[float, float, list]:
+    """Return (time to first chunk, total time, audio chunks); falls back to one-shot synthesis."""
+    started = time.perf_counter()
+    stream = getattr(model, "generate_audio_stream", None)
+    if stream is None:
+        audio = model.generate_audio(voice_state, text)
+        elapsed = time.perf_counter() - started
+        return elapsed, elapsed, [audio]
+
+    ttfc = None
+    chunks = []
+    for chunk in stream(voice_state, text):
+        if ttfc is None:
+            ttfc = time.perf_counter() - started
+        chunks.append(chunk)
+    return ttfc or 0.0, time.perf_counter() - started, chunks
+
+
+def run_combination(threads: int, voice: str, quantization: str, inference_mode: bool, repeats: int) -> dict:
+    """Runs in a spawned worker: load, warm up once, then time the corpus."""
+    import numpy as np
+    import torch
+    from pocket_tts import TTSModel
+
+    torch.set_num_threads(threads)
+    model = TTSModel.load_model()
+    if quantization == "int8":
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DeepFocus"))
+        from tts_server import quantize_linear_layers
+
+        model = quantize_linear_layers(model)
+    voice_state = model.get_state_for_audio_prompt(voice)
+
+    with torch.inference_mode() if inference_mode else contextlib.nullcontext():
+        timed_synthesis(model, voice_state, CORPUS["fallback"][0])  # discard first-run cost
+
+        categories = {}
+        envelopes = {}
+        for category, texts in CORPUS.items():
+            synth_s = audio_s = 0.0
+            ttfcs = []
+            for _ in range(repeats):
+                for text in texts:
+                    torch.manual_seed(0)  # same sampling across profiles, so spectra compare
+                    ttfc, elapsed, chunks = timed_synthesis(model, voice_state, text)
+                    audio = np.concatenate([c.numpy().astype(np.float32).reshape(-1) for c in chunks])
+                    synth_s += elapsed
+                    audio_s += len(audio) / model.sample_rate
+                    ttfcs.append(ttfc)
+                    envelopes[text] = spectral_envelope_db(audio).tolist()
+            categories[category] = {
+                "rtf": round(synth_s / audio_s, 3),
+                "ttfcP50Ms": round(statistics.median(ttfcs) * 1000, 1),
+                "ttfcMaxMs": round(max(ttfcs) * 1000, 1),
+            }
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "threads": threads,
+        "voice": voice,
+        "quantization": quantization,
+        "inferenceMode": inference_mode,
+        "streaming": hasattr(model, "generate_audio_stream"),
+        "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / rss_scale, 1),
+        "categories": categories,
+        "_envelopes": envelopes,
+    }
+
+
+def spectral_distance_db(envelopes: dict, reference: dict) -> float:
+    import numpy as np
+
+    distances = [
+        float(np.sqrt(np.mean((np.asarray(envelopes[text]) - np.asarray(reference[text])) ** 2)))
+        for text in envelopes
+    ]
+    return round(float(np.mean(distances)), 2)
+
+
+def combination_key(row: dict) -> tuple:
+    # Baselines written before the profile axes existed were fp32 + inference mode
+    return row["threads"], row["voice"], row.get("quantization", "fp32"), row.get("inferenceMode", True)
+
+
+def describe(row: dict) -> str:
+    return (
+        f"threads={row['threads']} voice={row['voice']} quant={row['quantization']} "
+        f"inference_mode={row['inferenceMode']}"
+    )
+
+
+def find_regressions(results: list[dict], baseline: list[dict], max_regression: float) -> list[str]:
+    previous = {combination_key(r): r for r in baseline}
+    failures = []
+    for row in results:
+        before = previous.get(combination_key(row))
+        if before is None:
+            continue
+        for category, stats in row["categories"].items():
+            old = before["categories"].get(category)
+            if old is None:
+                continue
+            for metric in ("rtf", "ttfcP50Ms"):
+                if stats[metric] > old[metric] * (1 + max_regression):
+                    failures.append(f"{describe(row)} {category} {metric}: {old[metric]} -> {stats[metric]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--voices", nargs="+", default=["azelma"])
+    parser.add_argument("--quantization", nargs="+", choices=["fp32", "int8"], default=["fp32"])
+    parser.add_argument("--inference-mode", nargs="+", choices=["on", "off"], default=["on"])
+    parser.add_argument(
+        "--profiles",
+        action="store_true",
+        help="sweep every quantization x inference-mode profile (TTS_QUANTIZE / TTS_INFERENCE_MODE)",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args()
+    if args.profiles:
+        args.quantization = ["fp32", "int8"]
+        args.inference_mode = ["on", "off"]
+    profiles = [
+        (quant, mode == "on")
+        for quant in dict.fromkeys(args.quantization)
+        for mode in dict.fromkeys(args.inference_mode)
+    ]
+
+    results = []
+    references = {}  # voice -> envelopes of its fp32 / inference-mode run
+    spawn = multiprocessing.get_context("spawn")
+    for threads in args.threads:
+        for voice in args.voices:
+            for quant, inference_mode in profiles:
+                label = f"threads={threads} voice={voice} quant={quant} inference_mode={inference_mode}"
+                print(f"⏳ {label} ...")
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    row = pool.submit(run_combination, threads, voice, quant, inference_mode, args.repeats).result()
+                envelopes = row.pop("_envelopes")
+                if (quant, inference_mode) == ("fp32", True):
+                    references.setdefault(voice, envelopes)
+                if voice in references:
+                    row["spectralDistanceDb"] = spectral_distance_db(envelopes, references[voice])
+                results.append(row)
+                for category, stats in row["categories"].items():
+                    print(
+                        f"🔊 {label} {category:<12} RTF={stats['rtf']:.3f} "
+                        f"TTFC p50={stats['ttfcP50Ms']:.0f}ms max={stats['ttfcMaxMs']:.0f}ms"
+                    )
+                spectrum = f", Δspectrum={row['spectralDistanceDb']:.2f} dB" if "spectralDistanceDb" in row else ""
+                print(f"   peak RSS {row['peakRssMb']:.0f} MB (streaming={row['streaming']}){spectrum}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = find_regressions(results, json.load(f), args.max_regression)
+        if failures:
+            print(f"\n❌ {len(failures)} regression(s) beyond {args.max_regression:.0%}:")
+            for failure in failures:
+                print(f"   {failure}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-notification serialization cost for the DeepFocus ingest wire formats.
+
+Encodes and decodes realistic ingest requests and responses with stdlib
+json, orjson and msgpack, and compares the full response (echoing
+``storedDocument``) with the ``Prefer: return=minimal`` one. Reports
+bytes on the wire and microseconds per notification.
+
+    python bench_wire_formats.py --n 20000 --json wire_formats.json
+"""
+
+import argparse
+import json
+import random
+import time
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # msgpack rows are skipped when it is not installed
+    msgpack = None
+
+APPS = [("com.whatsapp", "WhatsApp"), ("com.google.android.gm", "Gmail"), ("com.Slack", "Slack")]
+SENDERS = ["Mom", "Aradhya", "Prof. Sharma", "CS301 Group", "HR Team"]
+MESSAGES = [
+    "Call me when you're free, it's urgent",
+    "Assignment 3 deadline moved to Friday",
+    "Can you send the notes from today's lecture?",
+    "Meeting moved to 5pm, same room as last week. Bring the printed report please.",
+]
+
+
+def make_requests(n: int, seed: int = 7) -> list[dict]:
+    rnd = random.Random(seed)
+    requests = []
+    for i in range(n):
+        package, app = rnd.choice(APPS)
+        requests.append({
+            "packageName": package,
+            "appName": app,
+            "title": rnd.choice(SENDERS),
+            "text": rnd.choice(MESSAGES),
+            "time": 1767225600000 + i * 1000,
+            "notificationId": f"{package}:{i}",
+            "isOngoing": False,
+        })
+    return requests
+
+
+def full_response(req: dict) -> dict:
+    return {
+        "status": "ingested",
+        "notificationId": req["notificationId"],
+        "storedDocument": f"{req['appName']} message from {req['title']}: {req['text']} at 2026-01-01 00:00:00 UTC.",
+    }
+
+
+def minimal_response(req: dict) -> dict:
+    return {"status": "ingested", "notificationId": req["notificationId"]}
+
+
+def codecs() -> dict:
+    table = {
+        "json": (lambda o: json.dumps(o).encode("utf-8"), json.loads),
+        "orjson": (orjson.dumps, orjson.loads),
+    }
+    if msgpack is not None:
+        table["msgpack"] = (msgpack.packb, msgpack.unpackb)
+    return table
+
+
+def measure(docs: list[dict], encode, decode) -> dict:
+    started = time.perf_counter()
+    encoded = [encode(d) for d in docs]
+    encode_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for blob in encoded:
+        decode(blob)
+    decode_s = time.perf_counter() - started
+
+    return {
+        "bytesPerMessage": round(sum(len(b) for b in encoded) / len(docs), 1),
+        "encodeUs": round(encode_s * 1e6 / len(docs), 3),
+        "decodeUs": round(decode_s * 1e6 / len(docs), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    requests = make_requests(args.n)
+    bodies = {
+        "request": requests,
+        "response_full": [full_response(r) for r in requests],
+        "response_minimal": [minimal_response(r) for r in requests],
+    }
+
+    results = []
+    print(f"{'body':<17} {'codec':<8} {'bytes':>7} {'enc µs':>8} {'dec µs':>8}")
+    for body, docs in bodies.items():
+        for codec, (encode, decode) in codecs().items():
+            row = {"body": body, "codec": codec, **measure(docs, encode, decode)}
+            results.append(row)
+            print(f"{body:<17} {codec:<8} {row['bytesPerMessage']:>7.1f} {row['encodeUs']:>8.3f} {row['decodeUs']:>8.3f}")
+    if msgpack is None:
+        print("\n⚠️  msgpack not installed; msgpack rows skipped")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()